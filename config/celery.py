@@ -83,6 +83,18 @@ def setup_periodic_tasks(sender, **kwargs):
         app.signature("core.tasks.clear_static_content_cache"),
     )
 
+    # Rebuild the docs path index of the latest version. Executes daily at 4:35 AM.
+    sender.add_periodic_task(
+        crontab(hour=4, minute=35),
+        app.signature("core.tasks.build_latest_docs_path_index"),
+    )
+
+    # Resolve latest docs paths not determined yet. Executes daily at 4:50 AM.
+    sender.add_periodic_task(
+        crontab(hour=4, minute=50),
+        app.signature("core.tasks.resolve_latest_docs_paths"),
+    )
+
     # Fetch Slack activity. Executes daily at 3:07 AM.
     sender.add_periodic_task(
         crontab(hour=3, minute=7),
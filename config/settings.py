@@ -2,6 +2,7 @@ import logging
 import os
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
 import environs
@@ -354,10 +355,46 @@ CACHES = {
         "TIMEOUT": env(
             "STATIC_CACHE_TIMEOUT", default="60"
         ),  # Cache timeout in seconds: 1 minute
+        "OPTIONS": {"COMPRESSOR": "core.compression.ZstdCompressor"},
     },
 }
 
+# Static content pages are served from the cache for STATIC_CONTENT_SOFT_TIMEOUT
+# seconds, then served stale while one background refresh runs, until they are
+# dropped after STATIC_CONTENT_HARD_TIMEOUT seconds.
+STATIC_CONTENT_SOFT_TIMEOUT = env.int("STATIC_CACHE_TIMEOUT", default=60)
+STATIC_CONTENT_HARD_TIMEOUT = env.int("STATIC_CACHE_HARD_TIMEOUT", default=86400)
+# How long a scheduled refresh blocks further refreshes of the same stale entry
+STATIC_CONTENT_REVALIDATE_TIMEOUT = env.int(
+    "STATIC_CACHE_REVALIDATE_TIMEOUT", default=60
+)
+
 ENABLE_DB_CACHE = env.bool("ENABLE_DB_CACHE", default=False)
+# RenderedContent bodies are stored compressed with this encoding, "" stores
+# them as text. Existing rows are read either way.
+RENDERED_CONTENT_COMPRESSION = env("RENDERED_CONTENT_COMPRESSION", default="zstd")
+RENDERED_CONTENT_COMPRESSION_LEVEL = env.int(
+    "RENDERED_CONTENT_COMPRESSION_LEVEL", default=3
+)
+
+# Cache timeout in seconds for post-processed docs HTML. Entries are invalidated
+# explicitly when their source content is refreshed, so this can be long.
+PROCESSED_CONTENT_CACHE_TIMEOUT = env.int(
+    "PROCESSED_CONTENT_CACHE_TIMEOUT", default=86400
+)
+# Cache timeout in seconds for the pages of ModernizedDocsView. They are read from
+# S3 directly, nothing invalidates them when it changes, so this must be short.
+MODERNIZED_DOCS_CACHE_TIMEOUT = env.int("MODERNIZED_DOCS_CACHE_TIMEOUT", default=300)
+
+# How long, in seconds, to remember that an S3 key doesn't exist so repeated
+# requests for missing content skip S3. 0 disables the negative cache.
+MISSING_S3_KEY_CACHE_TIMEOUT = env.int("MISSING_S3_KEY_CACHE_TIMEOUT", default=600)
+
+# Request coalescing for static content cache misses, all values in seconds.
+# The lock timeout bounds how long a crashed leader can hold up other requests.
+SINGLE_FLIGHT_LOCK_TIMEOUT = env.int("SINGLE_FLIGHT_LOCK_TIMEOUT", default=30)
+SINGLE_FLIGHT_WAIT_TIMEOUT = env.float("SINGLE_FLIGHT_WAIT_TIMEOUT", default=10)
+SINGLE_FLIGHT_POLL_INTERVAL = env.float("SINGLE_FLIGHT_POLL_INTERVAL", default=0.05)
 
 # Default interval by which to clear the static content cache
 # New method: "never" clear, just overwrite, so that the id
@@ -536,6 +573,42 @@ STATIC_CONTENT_AWS_S3_ENDPOINT_URL = env(
     default="https://s3.dualstack.us-east-2.amazonaws.com",
 )
 
+# The static content S3 client is shared by all requests in a worker process, so
+# size its connection pool for the number of concurrent greenlets hitting S3.
+STATIC_CONTENT_S3_MAX_POOL_CONNECTIONS = env.int(
+    "STATIC_CONTENT_S3_MAX_POOL_CONNECTIONS", default=50
+)
+STATIC_CONTENT_S3_CONNECT_TIMEOUT = env.float(
+    "STATIC_CONTENT_S3_CONNECT_TIMEOUT", default=5
+)
+STATIC_CONTENT_S3_READ_TIMEOUT = env.float("STATIC_CONTENT_S3_READ_TIMEOUT", default=15)
+STATIC_CONTENT_S3_MAX_RETRIES = env.int("STATIC_CONTENT_S3_MAX_RETRIES", default=3)
+
+# Local disk LRU cache for images served from the static content bucket through
+# ImageView. Set IMAGE_CACHE_MAX_SIZE to 0 to disable it. Sizes are in bytes.
+IMAGE_CACHE_DIR = env(
+    "IMAGE_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "boost-image-cache"),
+)
+IMAGE_CACHE_MAX_SIZE = env.int("IMAGE_CACHE_MAX_SIZE", default=256 * 1024 * 1024)
+IMAGE_CACHE_MAX_ITEM_SIZE = env.int(
+    "IMAGE_CACHE_MAX_ITEM_SIZE", default=5 * 1024 * 1024
+)
+# Seconds a cached image is served before it is revalidated against S3
+IMAGE_CACHE_MAX_AGE = env.int("IMAGE_CACHE_MAX_AGE", default=3600)
+# Cache-Control max-age in seconds for images served through ImageView
+IMAGE_CACHE_CONTROL_MAX_AGE = env.int("IMAGE_CACHE_CONTROL_MAX_AGE", default=86400)
+
+# Bare clones of the library repositories, kept between commit imports so they
+# only need a fetch. This needs to be on a persistent volume, or every import
+# clones them again: data/ is the celery worker's data volume in kube, and part
+# of the /code mount in docker compose.
+GIT_MIRROR_DIR = env(
+    "GIT_MIRROR_DIR", default=str(BASE_DIR.joinpath("data", "git-mirrors"))
+)
+# How many libraries' repositories are fetched and read at once by update_commits
+COMMIT_IMPORT_WORKERS = env.int("COMMIT_IMPORT_WORKERS", default=8)
+
 # LinkPreview API Key
 # LINK_PREVIEW_API_KEY = env(
 #     "LINK_PREVIEW_API_KEY", default="changeme"
@@ -545,6 +618,43 @@ STATIC_CONTENT_AWS_S3_ENDPOINT_URL = env(
 STATIC_CONTENT_MAPPING = env(
     "STATIC_CONTENT_MAPPING", default="stage_static_config.json"
 )
+# How often, in seconds, to check the mapping file's mtime for changes
+STATIC_CONTENT_MAPPING_CHECK_INTERVAL = env.int(
+    "STATIC_CONTENT_MAPPING_CHECK_INTERVAL", default=10
+)
+# How often, in seconds, to check whether a docs path index has been rebuilt
+DOCS_PATH_INDEX_CHECK_INTERVAL = env.int("DOCS_PATH_INDEX_CHECK_INTERVAL", default=60)
+# Threads used to run the path matchers when resolving latest docs paths in bulk
+LATEST_DOCS_PATH_RESOLVE_WORKERS = env.int(
+    "LATEST_DOCS_PATH_RESOLVE_WORKERS", default=8
+)
+# Warming the docs cache of a new release: how many pages to process at once, and the
+# site url the processed html is cached for (its host must be in ALLOWED_HOSTS)
+DOCS_CACHE_WARM_WORKERS = env.int("DOCS_CACHE_WARM_WORKERS", default=4)
+DOCS_CACHE_WARM_BASE_URI = env(
+    "DOCS_CACHE_WARM_BASE_URI", default="https://www.boost.org"
+)
+
+# AsciiDoc conversion: long-running asciidoctor processes per Python process (0 runs
+# the asciidoctor command per document instead), how many conversions may wait for
+# one, the timeout in seconds, and how many documents a process converts before it's
+# replaced
+ASCIIDOCTOR_POOL_SIZE = env.int("ASCIIDOCTOR_POOL_SIZE", default=2)
+ASCIIDOCTOR_POOL_MAX_QUEUE = env.int("ASCIIDOCTOR_POOL_MAX_QUEUE", default=32)
+ASCIIDOCTOR_TIMEOUT = env.int("ASCIIDOCTOR_TIMEOUT", default=30)
+ASCIIDOCTOR_WORKER_MAX_CONVERSIONS = env.int(
+    "ASCIIDOCTOR_WORKER_MAX_CONVERSIONS", default=1000
+)
+ASCIIDOCTOR_WORKER_COMMAND = ["ruby", str(BASE_DIR / "core" / "asciidoctor_worker.rb")]
+# How long, in seconds, converted AsciiDoc is kept in redis. 0 disables caching.
+ASCIIDOC_CACHE_TIMEOUT = env.int("ASCIIDOC_CACHE_TIMEOUT", default=604800)
+
+# Bearer token Prometheus uses to scrape /internal/metrics/, staff members can
+# always view them. Set PROMETHEUS_MULTIPROC_DIR when running several processes.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# Add a Server-Timing header with the cache tier and stage durations to static
+# content responses. Off by default, the CDN caches it with the page for everyone.
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=False)
 
 # Markdown content
 BASE_CONTENT = env("BOOST_CONTENT_DIRECTORY", "/website")
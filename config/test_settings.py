@@ -36,6 +36,14 @@ GITHUB_TOKEN = "changeme"
 # Make content relative to the project root
 BASE_CONTENT = BASE_DIR / "core/tests/content"  # noqa
 
+# Don't remember missing S3 keys between tests, tests that need it enable it
+MISSING_S3_KEY_CACHE_TIMEOUT = 0
+
+# Run asciidoctor per document, tests that need the worker pool enable it
+ASCIIDOCTOR_POOL_SIZE = 0
+# Don't cache AsciiDoc conversions between tests, tests that need it enable it
+ASCIIDOC_CACHE_TIMEOUT = 0
+
 # Don't use S3 in tests
 STORAGES = {
     "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
@@ -28,6 +28,7 @@ from core.views import (
     DocLibsTemplateView,
     ImageView,
     MarkdownTemplateView,
+    MetricsView,
     TermsOfUseView,
     PrivacyPolicyView,
     ModernizedDocsView,
@@ -411,6 +412,7 @@ urlpatterns = (
         ),
         # Internal functions
         path("internal/clear-cache/", ClearCacheView.as_view(), name="clear-cache"),
+        path("internal/metrics/", MetricsView.as_view(), name="metrics"),
         path(
             "internal/modernized-docs/<path:content_path>",
             ModernizedDocsView.as_view(),
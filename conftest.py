@@ -33,6 +33,7 @@ def pytest_collection_modifyitems(config, items):
     """
     Adds support for skipping tests based on the presence of markers:
      - asciidoctor
+     - benchmark
     """
     keywordexpr = config.option.keyword
     markexpr = config.option.markexpr
@@ -40,9 +41,12 @@ def pytest_collection_modifyitems(config, items):
         return  # let pytest handle this
 
     skip_asciidoctor = pytest.mark.skip(reason="asciidoctor not selected")
+    skip_benchmark = pytest.mark.skip(reason="benchmark not selected")
     for item in items:
         if "asciidoctor" in item.keywords:
             item.add_marker(skip_asciidoctor)
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -1,4 +1,30 @@
+import atexit
+import hashlib
+import os
+import select
 import subprocess
+import threading
+import time
+
+import structlog
+from django.conf import settings
+
+from .caching import (
+    get_converted_asciidoc,
+    get_converted_asciidoc_cache_key,
+    set_converted_asciidoc,
+)
+from .constants import ASCIIDOCTOR_VERSION_RETRY_INTERVAL
+
+logger = structlog.get_logger()
+
+
+class AsciidoctorError(Exception):
+    """Asciidoctor failed to convert a document."""
+
+
+class AsciidoctorPoolFull(AsciidoctorError):
+    """Too many conversions are already waiting for an asciidoctor worker."""
 
 
 def convert_adoc_to_html(input):
@@ -8,12 +34,73 @@ def convert_adoc_to_html(input):
     Note: This returns an html fragment, not the full <html> document with the
     <head> and <body> tags.
 
-    The asciidoctor package is a Ruby gem, which is why we're using subprocess
-    to run the command.
+    The asciidoctor package is a Ruby gem. Documents are converted by a pool of
+    long-running Ruby processes (see AsciidoctorWorkerPool), or by running the
+    asciidoctor command for each document if ASCIIDOCTOR_POOL_SIZE is 0.
     https://docs.asciidoctor.org/asciidoctor/latest/
 
+    Conversions are cached by a hash of the input and the installed asciidoctor
+    gem versions, since the same sources are converted again for every release.
+
     :param input: The contents of the AsciiDoc file
     """
+    cache_key = None
+    if settings.ASCIIDOC_CACHE_TIMEOUT and (version := get_asciidoctor_version()):
+        cache_key = get_converted_asciidoc_cache_key(
+            hashlib.sha256(input.encode("utf-8")).hexdigest(),
+            hashlib.sha256(version.encode("utf-8")).hexdigest()[:16],
+        )
+        if (html := get_converted_asciidoc(cache_key)) is not None:
+            return html
+
+    html = run_asciidoctor(input)
+    if cache_key:
+        set_converted_asciidoc(cache_key, html)
+    return html
+
+
+# (looked up at, gem versions or None), see get_asciidoctor_version()
+_asciidoctor_version = (None, None)
+
+
+def get_asciidoctor_version() -> str | None:
+    """Return the installed asciidoctor gems and their versions, or None if they
+    can't be determined.
+
+    The versions are looked up once per process. A failed lookup is retried after
+    ASCIIDOCTOR_VERSION_RETRY_INTERVAL seconds, so a passing failure doesn't turn
+    the conversion cache off for good.
+    """
+    global _asciidoctor_version
+    looked_up_at, version = _asciidoctor_version
+    if version or (
+        looked_up_at is not None
+        and time.monotonic() - looked_up_at < ASCIIDOCTOR_VERSION_RETRY_INTERVAL
+    ):
+        return version
+    try:
+        result = subprocess.run(
+            ["gem", "list", "--local", "^asciidoctor"],
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("asciidoctor_version_unknown", error=str(e))
+        version = None
+    else:
+        # e.g. "asciidoctor (2.0.23) asciidoctor-boost (0.1.1)"
+        version = " ".join(result.stdout.split()) or None
+    _asciidoctor_version = (time.monotonic(), version)
+    return version
+
+
+def run_asciidoctor(input: str) -> str:
+    """Convert input with asciidoctor, bypassing the conversion cache."""
+    if pool := get_asciidoctor_pool():
+        return pool.convert(input)
+
     result = subprocess.run(
         ["asciidoctor", "-r", "asciidoctor_boost", "-e", "-o", "-", "-"],
         check=True,
@@ -24,3 +111,179 @@ def convert_adoc_to_html(input):
 
     # Get the output from the command
     return result.stdout
+
+
+class AsciidoctorWorker:
+    """A long-running asciidoctor process, speaking the length prefixed protocol
+    described in asciidoctor_worker.rb. Not thread safe, the pool hands each
+    worker to one caller at a time."""
+
+    read_size = 64 * 1024
+
+    def __init__(self, command: list[str]):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # warnings go to stderr, asciidoctor's own output was ignored before too
+            stderr=subprocess.DEVNULL,
+        )
+        # stdout is read from its fd directly, so select() sees all unread output
+        self.stdout_fd = self.process.stdout.fileno()
+        self.buffer = b""
+        self.conversions = 0
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def convert(self, input: str, timeout: float) -> str:
+        """Return the html for input, raising AsciidoctorError if asciidoctor
+        reported an error and OSError if the worker is unusable.
+
+        The whole reply must arrive within timeout seconds, a worker that stalls
+        partway through it raises TimeoutError.
+        """
+        deadline = time.monotonic() + timeout
+        source = input.encode("utf-8")
+        self.process.stdin.write(f"{len(source)}\n".encode() + source)
+        self.process.stdin.flush()
+
+        while b"\n" not in self.buffer:
+            self._read(deadline, timeout)
+        header, _, self.buffer = self.buffer.partition(b"\n")
+        status, _, length = header.decode().partition(" ")
+        if status not in ("ok", "error") or not length.strip().isdigit():
+            raise OSError(f"unexpected asciidoctor worker response {header!r}")
+        while len(self.buffer) < int(length):
+            self._read(deadline, timeout)
+        body = self.buffer[: int(length)].decode("utf-8")
+        self.buffer = self.buffer[int(length) :]
+        self.conversions += 1
+        if status == "error":
+            raise AsciidoctorError(body)
+        return body
+
+    def _read(self, deadline: float, timeout: float):
+        """Read what the worker has written so far into the buffer, waiting until
+        deadline at the most."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([self.stdout_fd], [], [], remaining)[0]:
+            raise TimeoutError(f"asciidoctor took longer than {timeout} seconds")
+        chunk = os.read(self.stdout_fd, self.read_size)
+        if not chunk:
+            raise OSError("asciidoctor worker exited")
+        self.buffer += chunk
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            pipe.close()
+
+
+class AsciidoctorWorkerPool:
+    """A bounded pool of AsciidoctorWorkers.
+
+    Workers are started on demand up to `size` and reused. A worker that died,
+    timed out or broke the protocol is replaced, and workers are recycled after
+    `max_conversions` documents to keep Ruby's memory use in check. At most
+    `max_queue` callers wait for a free worker; beyond that convert() raises
+    AsciidoctorPoolFull rather than letting the backlog grow.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        size: int,
+        max_queue: int,
+        timeout: float,
+        max_conversions: int,
+    ):
+        self.command = command
+        self.timeout = timeout
+        self.max_conversions = max_conversions
+        self.idle: list[AsciidoctorWorker] = []
+        self.lock = threading.Lock()
+        self.workers = threading.BoundedSemaphore(size)
+        self.callers = threading.BoundedSemaphore(size + max_queue)
+
+    def convert(self, input: str) -> str:
+        if not self.callers.acquire(blocking=False):
+            raise AsciidoctorPoolFull("too many conversions waiting for asciidoctor")
+        try:
+            if not self.workers.acquire(timeout=self.timeout):
+                raise AsciidoctorPoolFull("timed out waiting for an asciidoctor worker")
+            try:
+                return self._convert(input)
+            finally:
+                self.workers.release()
+        finally:
+            self.callers.release()
+
+    def _convert(self, input: str) -> str:
+        # One retry, on a fresh worker, if the worker fails rather than the document
+        for attempt in range(2):
+            worker = self._get_worker()
+            start = time.monotonic()
+            try:
+                html = worker.convert(input, self.timeout)
+            except AsciidoctorError:
+                self._put_worker(worker)
+                raise
+            except (OSError, ValueError) as e:
+                logger.warning("asciidoctor_worker_failed", error=str(e))
+                worker.stop()
+                if attempt or isinstance(e, TimeoutError):
+                    raise AsciidoctorError(str(e)) from e
+                continue
+            self._put_worker(worker)
+            logger.debug(
+                "asciidoctor_converted", duration=round(time.monotonic() - start, 4)
+            )
+            return html
+
+    def _get_worker(self) -> AsciidoctorWorker:
+        with self.lock:
+            while self.idle:
+                worker = self.idle.pop()
+                if worker.is_alive():
+                    return worker
+                logger.info("asciidoctor_worker_died")
+                worker.stop()
+        return AsciidoctorWorker(self.command)
+
+    def _put_worker(self, worker: AsciidoctorWorker):
+        if worker.conversions >= self.max_conversions:
+            worker.stop()
+            return
+        with self.lock:
+            self.idle.append(worker)
+
+    def close(self):
+        with self.lock:
+            while self.idle:
+                self.idle.pop().stop()
+
+
+# pid -> pool, workers must not be shared with forked processes
+_asciidoctor_pool = (None, None)
+
+
+def get_asciidoctor_pool() -> AsciidoctorWorkerPool | None:
+    """Return this process' asciidoctor worker pool, or None if it's disabled."""
+    global _asciidoctor_pool
+    if not settings.ASCIIDOCTOR_POOL_SIZE:
+        return None
+    pid, pool = _asciidoctor_pool
+    if pid != os.getpid():
+        pool = AsciidoctorWorkerPool(
+            settings.ASCIIDOCTOR_WORKER_COMMAND,
+            size=settings.ASCIIDOCTOR_POOL_SIZE,
+            max_queue=settings.ASCIIDOCTOR_POOL_MAX_QUEUE,
+            timeout=settings.ASCIIDOCTOR_TIMEOUT,
+            max_conversions=settings.ASCIIDOCTOR_WORKER_MAX_CONVERSIONS,
+        )
+        atexit.register(pool.close)
+        _asciidoctor_pool = (os.getpid(), pool)
+    return pool
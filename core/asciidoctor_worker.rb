@@ -0,0 +1,25 @@
+# Converts AsciiDoc documents read from stdin, one after another, for the
+# AsciidoctorWorkerPool in core/asciidoc.py. Keeping this process running saves
+# the Ruby startup and gem loading cost of running `asciidoctor` per document.
+#
+# Each request is "<length>\n" followed by <length> bytes of UTF-8 AsciiDoc.
+# Each response is "ok <length>\n" followed by <length> bytes of html, or
+# "error <length>\n" followed by the error message.
+require "asciidoctor"
+require "asciidoctor_boost"
+
+$stdin.binmode
+$stdout.binmode
+
+while (header = $stdin.gets)
+  source = $stdin.read(Integer(header)).force_encoding(Encoding::UTF_8)
+  begin
+    # Same options and output as `asciidoctor -e -o - -`
+    html = Asciidoctor.convert(source, safe: :unsafe, standalone: false)
+    response = ["ok", "#{html.chomp}\n".b]
+  rescue StandardError => e
+    response = ["error", e.full_message(highlight: false).b]
+  end
+  $stdout.write("#{response[0]} #{response[1].bytesize}\n", response[1])
+  $stdout.flush
+end
@@ -2,9 +2,11 @@ import html
 import json
 import os
 import re
+import time
 
 import boto3
 import structlog
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from bs4 import BeautifulSoup, Tag
 import chardet
@@ -17,24 +19,28 @@ from pygments.lexers import get_lexer_by_name as get_lexer
 from pygments.lexers import guess_lexer
 from pygments.util import get_bool_opt
 
+from .caching import get_missing_s3_keys, set_missing_s3_key
+
 logger = structlog.get_logger()
 
 
 def extract_file_data(response, s3_key):
     """Extracts the file content, content type, and last modified date from an S3
-    response object."""
+    response object.
+
+    Content is re-encoded to UTF-8 when it can be decoded, and "charset" is
+    "utf-8" then, so callers don't need to detect it again.
+    """
     file_content = response["Body"].read()
-    # Try UTF-8 first, falling back to chardet detection if that fails. This prevents
-    # double-encoding issues where UTF-8 content is misdetected as Windows-1252
-    try:
-        file_content.decode("utf-8")
-        # Content is valid UTF-8, use as-is
-    except UnicodeDecodeError:
-        # Content is not UTF-8, detect encoding and re-encode
+    # Try UTF-8 first, falling back to the declared charset and chardet detection if
+    # that fails. This prevents double-encoding issues where UTF-8 content is
+    # misdetected as Windows-1252
+    charset = detect_charset(file_content, response["ContentType"])
+    if charset and charset != "utf-8":
+        # Content is not UTF-8, re-encode it
         # decoding here stops django debug toolbar erroring on non-utf-8, e.g.
         #  the preprocessor library
-        if detected_encoding := chardet.detect(file_content)["encoding"]:
-            file_content = file_content.decode(detected_encoding).encode("utf-8")
+        file_content = file_content.decode(charset).encode("utf-8")
 
     content_type = get_content_type(s3_key, response["ContentType"])
     last_modified = response["LastModified"]
@@ -42,10 +48,39 @@ def extract_file_data(response, s3_key):
         "content": file_content,
         "content_key": s3_key,
         "content_type": content_type,
+        "charset": "utf-8" if charset else None,
         "last_modified": last_modified,
     }
 
 
+CONTENT_TYPE_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+# Matches both <meta charset="..."> and <meta http-equiv="Content-Type"
+# content="text/html; charset=...">
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def detect_charset(content: bytes, content_type: str = "") -> str | None:
+    """Return the charset content decodes with, or None if it can't be determined.
+
+    The cheap checks come first: UTF-8, then the charset declared in the
+    Content-Type or in a <meta> tag near the top of the html. chardet is slow on
+    large pages, so it's only used when none of those decode the content.
+    """
+    candidates = ["utf-8"]
+    if match := CONTENT_TYPE_CHARSET_RE.search(content_type or ""):
+        candidates.append(match.group(1).lower())
+    if match := META_CHARSET_RE.search(content[:2048]):
+        candidates.append(match.group(1).decode("ascii").lower())
+
+    for charset in dict.fromkeys(candidates):
+        try:
+            content.decode(charset)
+        except (LookupError, UnicodeDecodeError):
+            continue
+        return charset
+    return chardet.detect(content)["encoding"]
+
+
 def get_meta_redirect_from_html(html_string: str) -> str | None:
     """Use BeautifulSoup to get the meta redirect from an HTML document, if it exists.
 
@@ -105,24 +140,19 @@ def get_content_from_s3(key=None, bucket_name=None):
         raise ValueError("No key provided.")
 
     bucket_name = bucket_name or settings.STATIC_CONTENT_BUCKET_NAME
-    # s3_keys = get_s3_keys(key) or [key]
-    # Force a successful lookup from get_s3_keys, otherwise no match at all.
-    # That removes any random default "/" lookups.
-    s3_keys = get_s3_keys(key) or []
+    candidate_keys = get_candidate_s3_keys(key)
     client = get_s3_client()
 
-    for s3_key in s3_keys:
+    # Skip keys we recently found don't exist, saving a round trip to S3 each
+    missing_keys = get_missing_s3_keys(bucket_name, candidate_keys)
+    for s3_key in candidate_keys:
+        if s3_key in missing_keys:
+            logger.debug(f"get_content_from_s3_skipped_missing_key {s3_key=}")
+            continue
         file_data = get_file_data(client, bucket_name, s3_key)
         if file_data:
             return file_data
 
-        # Handle URLs that are directories looking for `index.html` files
-        if s3_key.endswith("/"):
-            index_html_key = f"{s3_key}index.html"
-            file_data = get_file_data(client, bucket_name, index_html_key)
-            if file_data:
-                return file_data
-
     logger.info(
         "get_content_from_s3_no_valid_object",
         key=key,
@@ -132,6 +162,21 @@ def get_content_from_s3(key=None, bucket_name=None):
     return {}
 
 
+def get_candidate_s3_keys(key):
+    """Return the S3 keys to try, in order, when looking up content for key."""
+    # s3_keys = get_s3_keys(key) or [key]
+    # Force a successful lookup from get_s3_keys, otherwise no match at all.
+    # That removes any random default "/" lookups.
+    candidate_keys = []
+    for s3_key in get_s3_keys(key) or []:
+        candidate_keys.append(s3_key)
+        # Handle URLs that are directories looking for `index.html` files
+        if s3_key.endswith("/"):
+            candidate_keys.append(f"{s3_key}index.html")
+    # Overlapping site paths can map to the same key, only try each key once
+    return list(dict.fromkeys(candidate_keys))
+
+
 def get_content_type(s3_key, content_type):
     """In some cases, manually set the content-type for a given S3 key based on the
     file extension. This is useful for files types that are not recognized by S3, or for
@@ -159,17 +204,51 @@ def get_file_data(client, bucket_name, s3_key):
     except ClientError as e:
         if e.response["Error"]["Code"] == "NoSuchKey":
             logger.warning(f"NoSuchKey {s3_key=}")
+            set_missing_s3_key(bucket_name, s3_key)
         else:
             logger.exception(f"get_content_from_s3_client_error {s3_key=}, {str(e)=}")
 
 
+# (pid, client) for the process-wide S3 client, see get_s3_client()
+_s3_client = None
+
+
 def get_s3_client():
-    """Get an S3 client."""
-    return boto3.client(
+    """Get the S3 client shared by every request in this worker process.
+
+    boto3 clients are thread safe once created, so we build one per process and
+    reuse its connection pool instead of paying for session setup, credential
+    resolution and TLS handshakes on every call. The client is keyed on the pid so
+    a worker forked from a process that already built one gets its own.
+    """
+    global _s3_client
+    pid = os.getpid()
+    if _s3_client is None or _s3_client[0] != pid:
+        # No lock needed: nothing between the check and the assignment yields to
+        # another greenlet, and a duplicate client from a thread race is harmless.
+        _s3_client = (pid, create_s3_client())
+    return _s3_client[1]
+
+
+def create_s3_client():
+    """Create a new S3 client with the configured pool size, timeouts and retries."""
+    # Use a dedicated session, the default boto3 session isn't thread safe.
+    session = boto3.session.Session()
+    return session.client(
         "s3",
         aws_access_key_id=settings.STATIC_CONTENT_AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.STATIC_CONTENT_AWS_SECRET_ACCESS_KEY,
         region_name=settings.STATIC_CONTENT_REGION,
+        config=Config(
+            max_pool_connections=settings.STATIC_CONTENT_S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.STATIC_CONTENT_S3_CONNECT_TIMEOUT,
+            read_timeout=settings.STATIC_CONTENT_S3_READ_TIMEOUT,
+            retries={
+                "max_attempts": settings.STATIC_CONTENT_S3_MAX_RETRIES,
+                "mode": "standard",
+            },
+            tcp_keepalive=True,
+        ),
     )
 
 
@@ -182,6 +261,81 @@ def does_s3_key_exist(client, bucket_name, s3_key):
         return False
 
 
+class StaticContentMapping:
+    """The site_path -> s3_path entries of a static content mapping file, indexed
+    in a prefix trie so a content path can be resolved in O(path length).
+
+    Entries are returned in file order, matching a linear walk of the file.
+    """
+
+    # trie node key holding the entries whose site_path ends at that node
+    ENTRIES = None
+
+    def __init__(self, config_data: list[dict]):
+        self.trie = {}
+        for index, item in enumerate(config_data):
+            node = self.trie
+            for char in item["site_path"]:
+                node = node.setdefault(char, {})
+            node.setdefault(self.ENTRIES, []).append(
+                (index, item["site_path"], item["s3_path"])
+            )
+
+    @classmethod
+    def from_file(cls, config_file_path: str) -> "StaticContentMapping":
+        with open(config_file_path, "r") as f:
+            return cls(json.load(f))
+
+    def get_matching_entries(self, content_path: str) -> list[tuple[int, str, str]]:
+        """Return the (index, site_path, s3_path) entries whose site_path is a
+        prefix of content_path, in file order."""
+        matches = self.trie.get(self.ENTRIES, [])[:]
+        node = self.trie
+        for char in content_path:
+            node = node.get(char)
+            if node is None:
+                break
+            matches.extend(node.get(self.ENTRIES, []))
+        return sorted(matches)
+
+    def get_s3_keys(self, content_path: str) -> list[str]:
+        s3_keys = []
+        for _, site_path, s3_path in self.get_matching_entries(content_path):
+            if site_path == "/":
+                if s3_path in content_path:
+                    s3_keys.append(content_path)
+                else:
+                    s3_keys.append(os.path.join(s3_path, content_path.lstrip("/")))
+            else:
+                s3_keys.append(content_path.replace(site_path, s3_path))
+        return s3_keys
+
+
+# config_file_path -> (mtime, last mtime check, StaticContentMapping)
+_static_content_mappings = {}
+
+
+def get_static_content_mapping(config_file_path: str) -> StaticContentMapping:
+    """Return the parsed mapping for the config file, reloading it only when the
+    file's mtime changes. The mtime is checked at most once every
+    STATIC_CONTENT_MAPPING_CHECK_INTERVAL seconds."""
+    now = time.monotonic()
+    cached = _static_content_mappings.get(config_file_path)
+    if cached:
+        mtime, checked_at, mapping = cached
+        if now - checked_at < settings.STATIC_CONTENT_MAPPING_CHECK_INTERVAL:
+            return mapping
+        if os.path.getmtime(config_file_path) == mtime:
+            _static_content_mappings[config_file_path] = (mtime, now, mapping)
+            return mapping
+
+    mtime = os.path.getmtime(config_file_path)
+    mapping = StaticContentMapping.from_file(config_file_path)
+    _static_content_mappings[config_file_path] = (mtime, now, mapping)
+    logger.info("static_content_mapping_loaded", config_file_path=config_file_path)
+    return mapping
+
+
 def get_s3_keys(content_path, config_filename=None):
     """
     Get the S3 key for a given content path
@@ -197,24 +351,7 @@ def get_s3_keys(content_path, config_filename=None):
     if not content_path.startswith("/"):
         content_path = f"/{content_path}"
 
-    with open(config_file_path, "r") as f:
-        config_data = json.load(f)
-
-    s3_keys = []
-    for item in config_data:
-        site_path = item["site_path"]
-        s3_path = item["s3_path"]
-
-        if site_path == "/" and content_path.startswith(site_path):
-            if s3_path in content_path:
-                s3_keys.append(content_path)
-            else:
-                s3_keys.append(os.path.join(s3_path, content_path.lstrip("/")))
-
-        elif content_path.startswith(site_path):
-            s3_keys.append(content_path.replace(site_path, s3_path))
-
-    return s3_keys
+    return get_static_content_mapping(config_file_path).get_s3_keys(content_path)
 
 
 def convert_img_paths(html_content: str, s3_path: str = None):
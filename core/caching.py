@@ -0,0 +1,436 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import BinaryIO
+
+import structlog
+from django.conf import settings
+from django.core.cache import caches
+
+from .compression import get_etag, get_precompressed
+from .constants import (
+    ASCIIDOC_CACHE_PREFIX,
+    MISSING_S3_KEY_CACHE_PREFIX,
+    MISSING_S3_KEYS_CLEARED_AT_KEY,
+    PRECOMPRESSED_CACHE_PREFIX,
+    PROCESSED_CONTENT_CACHE_PREFIX,
+    PROCESSED_CONTENT_TEMPLATE_VERSION,
+    REVALIDATE_LOCK_PREFIX,
+    SINGLE_FLIGHT_LOCK_PREFIX,
+)
+
+logger = structlog.get_logger()
+
+
+def get_processed_content_cache_key(cache_key: str) -> str:
+    """Return the static_content cache key holding the generation of the processed
+    variants of the content stored under the RenderedContent `cache_key`."""
+    return f"{PROCESSED_CONTENT_CACHE_PREFIX}{cache_key}"[:250]
+
+
+def get_processed_content_variant(
+    modernize: str, classification: str, latest_version_slug: str, page_uri: str
+) -> str:
+    """Return the key identifying one processed variant of a page.
+
+    page_uri is the page's absolute uri without the query string, which only
+    changes the output through the modernize level.
+    """
+    uri_hash = hashlib.sha1(page_uri.encode("utf-8")).hexdigest()[:16]
+    return ":".join(
+        [
+            PROCESSED_CONTENT_TEMPLATE_VERSION,
+            modernize,
+            classification,
+            latest_version_slug,
+            uri_hash,
+        ]
+    )
+
+
+def get_processed_variant_cache_key(generation: str, variant: str) -> str:
+    return f"{PROCESSED_CONTENT_CACHE_PREFIX}{generation}:{variant}"
+
+
+def get_processed_content(cache_key: str, variant: str) -> dict | None:
+    """Return the cached processed variant for the given cache key, if any."""
+    cache = caches["static_content"]
+    generation = cache.get(get_processed_content_cache_key(cache_key))
+    if generation is None:
+        return None
+    return cache.get(get_processed_variant_cache_key(generation, variant))
+
+
+def set_processed_content(
+    cache_key: str, variant: str, processed: dict, timeout: int | None = None
+):
+    """Store a processed variant of the page, for timeout seconds or
+    PROCESSED_CONTENT_CACHE_TIMEOUT.
+
+    Each variant has its own cache entry, under the page's current generation, so
+    concurrent renders of different variants don't overwrite each other.
+    """
+    cache = caches["static_content"]
+    generation_key = get_processed_content_cache_key(cache_key)
+    if (generation := cache.get(generation_key)) is None:
+        # another render may be starting the generation at the same time
+        cache.add(generation_key, uuid.uuid4().hex, timeout=None)
+        if (generation := cache.get(generation_key)) is None:
+            return
+    cache.set(
+        get_processed_variant_cache_key(generation, variant),
+        processed,
+        timeout=timeout or settings.PROCESSED_CONTENT_CACHE_TIMEOUT,
+    )
+
+
+def clear_processed_content(cache_key: str):
+    """Remove all processed variants for the given cache key.
+
+    Dropping the page's generation orphans its variants, which expire on their own.
+    """
+    cache = caches["static_content"]
+    cache.delete(get_processed_content_cache_key(cache_key))
+    logger.debug("processed_content_cleared", cache_key=cache_key)
+
+
+def get_precompressed_content(body: bytes) -> tuple[str, dict[str, bytes]]:
+    """Return the ETag of body and its compressed versions by encoding.
+
+    The compressed versions are cached by ETag, so identical responses are only
+    compressed once.
+    """
+    cache = caches["static_content"]
+    etag = get_etag(body)
+    cache_key = PRECOMPRESSED_CACHE_PREFIX + etag.strip('"')
+    precompressed = cache.get(cache_key)
+    if precompressed is None:
+        precompressed = get_precompressed(body)
+        cache.set(
+            cache_key, precompressed, timeout=settings.PROCESSED_CONTENT_CACHE_TIMEOUT
+        )
+    return etag, precompressed
+
+
+def set_with_soft_expiry(cache, cache_key: str, value):
+    """Cache value until its hard expiry, marking it stale after the soft expiry.
+
+    Between the two, get_with_soft_expiry() still returns the value but flags it
+    as stale, so callers can serve it immediately and refresh it in the
+    background instead of making the user wait.
+    """
+    cache.set(
+        cache_key,
+        {
+            "value": value,
+            "soft_expires_at": time.time() + settings.STATIC_CONTENT_SOFT_TIMEOUT,
+        },
+        timeout=settings.STATIC_CONTENT_HARD_TIMEOUT,
+    )
+
+
+def get_with_soft_expiry(cache, cache_key: str) -> tuple[object, bool]:
+    """Return (value, is_stale) for an entry stored by set_with_soft_expiry().
+
+    Values stored directly with cache.set() are returned as never stale.
+    """
+    cached = cache.get(cache_key)
+    if isinstance(cached, dict) and cached.keys() == {"value", "soft_expires_at"}:
+        return cached["value"], time.time() >= cached["soft_expires_at"]
+    return cached, False
+
+
+def claim_revalidation(cache, cache_key: str) -> bool:
+    """Return True for exactly one caller per stale entry, the one that should
+    schedule its refresh. The claim lapses after STATIC_CONTENT_REVALIDATE_TIMEOUT
+    seconds so a failed refresh is retried."""
+    return cache.add(
+        f"{REVALIDATE_LOCK_PREFIX}{cache_key}"[:250],
+        1,
+        timeout=settings.STATIC_CONTENT_REVALIDATE_TIMEOUT,
+    )
+
+
+def get_single_flight(cache, cache_key: str, fetch, get_cached):
+    """Return the result of fetch(), making sure only one caller at a time runs it
+    for a given cache key, across all workers sharing the cache.
+
+    The first caller takes a lock with an atomic cache.add() and runs fetch(),
+    which is expected to store its result in the cache. Other callers poll
+    get_cached() until the result appears or the lock is released, and only run
+    fetch() themselves if the leader didn't produce a result in time. This keeps
+    a popular page dropping out of the cache from sending every concurrent
+    request to the database and S3 at once.
+    """
+    lock_key = f"{SINGLE_FLIGHT_LOCK_PREFIX}{cache_key}"[:250]
+    if cache.add(lock_key, 1, timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        try:
+            return fetch()
+        finally:
+            cache.delete(lock_key)
+
+    logger.debug("single_flight_waiting", cache_key=cache_key)
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        # time.sleep yields to other greenlets under gevent
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        if (result := get_cached()) is not None:
+            return result
+        if cache.get(lock_key) is None:
+            # the leader finished without caching anything, e.g. a 404
+            break
+    return fetch()
+
+
+def _get_missing_s3_key_cache_key(bucket_name: str, s3_key: str) -> str:
+    normalized = f"{bucket_name}/{s3_key.lstrip('/')}"
+    return (
+        MISSING_S3_KEY_CACHE_PREFIX
+        + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    )
+
+
+def get_missing_s3_keys(bucket_name: str, s3_keys: list[str]) -> set[str]:
+    """Return the subset of s3_keys recently found not to exist in the bucket.
+
+    Entries record when the key was found missing, and are ignored if they
+    predate the last clear_all_missing_s3_keys() call. Everything is fetched in
+    a single cache round trip.
+    """
+    if not settings.MISSING_S3_KEY_CACHE_TIMEOUT or not s3_keys:
+        return set()
+    cache = caches["static_content"]
+    cache_keys = {
+        _get_missing_s3_key_cache_key(bucket_name, s3_key): s3_key for s3_key in s3_keys
+    }
+    found = cache.get_many([MISSING_S3_KEYS_CLEARED_AT_KEY, *cache_keys])
+    cleared_at = found.pop(MISSING_S3_KEYS_CLEARED_AT_KEY, 0)
+    return {
+        cache_keys[cache_key]
+        for cache_key, missing_at in found.items()
+        if missing_at >= cleared_at
+    }
+
+
+def set_missing_s3_key(bucket_name: str, s3_key: str):
+    """Record that s3_key doesn't exist, so lookups can skip it for a while."""
+    if not settings.MISSING_S3_KEY_CACHE_TIMEOUT:
+        return
+    cache = caches["static_content"]
+    cache.set(
+        _get_missing_s3_key_cache_key(bucket_name, s3_key),
+        time.time(),
+        timeout=settings.MISSING_S3_KEY_CACHE_TIMEOUT,
+    )
+
+
+def clear_missing_s3_keys(bucket_name: str, s3_keys: list[str]):
+    """Forget that the given keys were missing, e.g. because they were uploaded."""
+    cache = caches["static_content"]
+    cache.delete_many(
+        [_get_missing_s3_key_cache_key(bucket_name, s3_key) for s3_key in s3_keys]
+    )
+
+
+def clear_all_missing_s3_keys():
+    """Invalidate every missing key entry, e.g. after a new release is uploaded."""
+    cache = caches["static_content"]
+    cache.set(
+        MISSING_S3_KEYS_CLEARED_AT_KEY,
+        time.time(),
+        timeout=settings.MISSING_S3_KEY_CACHE_TIMEOUT or None,
+    )
+    logger.info("missing_s3_keys_cleared")
+
+
+class DiskLRUCache:
+    """A size bounded least recently used cache of files on local disk.
+
+    Each entry is a data file plus a json metadata file, named by a hash of the
+    key. Hits bump the data file's mtime, and when the cache grows past
+    `max_size` bytes the entries with the oldest mtimes are removed. Entries
+    older than `max_age` seconds are returned as stale, for the caller to
+    revalidate. Several processes can share a directory; writes are atomic
+    renames, and the size accounting is per process and approximate.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int,
+        max_item_size: int,
+        max_age: int | None = None,
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_item_size = max_item_size
+        self.max_age = max_age
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(
+            self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest()
+        )
+
+    def _entries(self):
+        """Yield (mtime, size, data path) for each data file in the cache."""
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith((".json", ".tmp")):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def get(self, key: str) -> tuple[BinaryIO, dict, bool] | None:
+        """Return (open data file, metadata, is_stale) for key, or None on a miss.
+
+        The data file is opened here so the entry can be read to the end even if
+        it is evicted or replaced meanwhile; the caller must close it.
+        """
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            with open(f"{path}.json", "r") as metadata_file:
+                metadata = json.load(metadata_file)
+            # the metadata must belong to the data opened above, not a newer entry
+            if os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            f.close()
+            return None
+        is_stale = (
+            self.max_age is not None
+            and metadata.get("stored_at", 0) + self.max_age <= time.time()
+        )
+        return f, metadata, is_stale
+
+    def writer(self, key: str, metadata: dict) -> "DiskLRUCacheWriter":
+        """Return a writer that stores a new entry for key once committed."""
+        return DiskLRUCacheWriter(self, self._path(key), metadata)
+
+    def touch(self, key: str, metadata: dict):
+        """Mark the entry for key as fresh again, e.g. after revalidating it."""
+        path = self._path(key)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, suffix=".tmp", delete=False
+        ) as f:
+            json.dump({**metadata, "stored_at": time.time()}, f)
+        os.replace(f.name, f"{path}.json")
+
+    def delete(self, key: str):
+        """Remove the entry for key, if any."""
+        path = self._path(key)
+        for filename in (f"{path}.json", path):
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits."""
+        if self.size <= self.max_size:
+            return
+        entries = sorted(self._entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_size:
+                break
+            for filename in (path, f"{path}.json"):
+                try:
+                    os.remove(filename)
+                except FileNotFoundError:
+                    pass
+            self.size -= size
+        logger.debug("disk_lru_cache_evicted", directory=self.directory)
+
+
+class DiskLRUCacheWriter:
+    """Writes a DiskLRUCache entry to a temporary file, then renames it into place
+    on commit. Entries larger than the cache's max_item_size are dropped."""
+
+    def __init__(self, cache: DiskLRUCache, path: str, metadata: dict):
+        self.cache = cache
+        self.path = path
+        self.metadata = metadata
+        self.size = 0
+        self.file = tempfile.NamedTemporaryFile(
+            dir=cache.directory, suffix=".tmp", delete=False
+        )
+
+    def write(self, chunk: bytes):
+        if self.file is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_item_size:
+            self.abort()
+            return
+        self.file.write(chunk)
+
+    def commit(self):
+        if self.file is None:
+            return
+        self.file.close()
+        with open(f"{self.file.name}.json", "w") as f:
+            json.dump({**self.metadata, "size": self.size, "stored_at": time.time()}, f)
+        # Drop the old metadata before replacing the data, so readers never pair
+        # new data with stale metadata; an entry without metadata is a miss.
+        try:
+            os.remove(f"{self.path}.json")
+        except FileNotFoundError:
+            pass
+        os.replace(self.file.name, self.path)
+        os.replace(f"{self.file.name}.json", f"{self.path}.json")
+        self.file = None
+        self.cache.size += self.size
+        self.cache.evict()
+
+    def abort(self):
+        if self.file is None:
+            return
+        self.file.close()
+        os.remove(self.file.name)
+        self.file = None
+
+
+def get_converted_asciidoc_cache_key(source_hash: str, version_hash: str) -> str:
+    return f"{ASCIIDOC_CACHE_PREFIX}{version_hash}_{source_hash}"
+
+
+def get_converted_asciidoc(cache_key: str) -> str | None:
+    """Return previously converted html for cache_key, or None."""
+    return caches["static_content"].get(cache_key)
+
+
+def set_converted_asciidoc(cache_key: str, html: str):
+    """Store converted html for ASCIIDOC_CACHE_TIMEOUT seconds."""
+    cache = caches["static_content"]
+    cache.set(cache_key, html, timeout=settings.ASCIIDOC_CACHE_TIMEOUT)
+
+
+_image_cache = None
+
+
+def get_image_cache() -> DiskLRUCache | None:
+    """Return the local disk cache for static content images, if enabled."""
+    global _image_cache
+    if not settings.IMAGE_CACHE_MAX_SIZE:
+        return None
+    if _image_cache is None:
+        _image_cache = DiskLRUCache(
+            settings.IMAGE_CACHE_DIR,
+            max_size=settings.IMAGE_CACHE_MAX_SIZE,
+            max_item_size=settings.IMAGE_CACHE_MAX_ITEM_SIZE,
+            max_age=settings.IMAGE_CACHE_MAX_AGE,
+        )
+    return _image_cache
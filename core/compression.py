@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import threading
+
+import brotli
+import zstandard
+from django.conf import settings
+from django_redis.compressors.base import BaseCompressor
+
+from .constants import PRECOMPRESSED_MIN_LENGTH, PROCESSED_CONTENT_TEMPLATE_VERSION
+
+BROTLI_ENCODING = "br"
+GZIP_ENCODING = "gzip"
+ZSTD_ENCODING = "zstd"
+# The order encodings are picked in when a client accepts several
+ENCODING_PREFERENCE = [BROTLI_ENCODING, ZSTD_ENCODING, GZIP_ENCODING]
+# Every zstd frame starts with this, see RFC 8878
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# zstandard's (de)compressor objects can't be shared between threads
+_local = threading.local()
+
+
+def zstd_compress(data: bytes) -> bytes:
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(
+            level=settings.RENDERED_CONTENT_COMPRESSION_LEVEL
+        )
+    return _local.compressor.compress(data)
+
+
+def zstd_decompress(data: bytes) -> bytes:
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor.decompress(data)
+
+
+def compress_text(value: str | bytes) -> bytes:
+    """Return text the way CompressedTextField stores it, zstd compressed if
+    RENDERED_CONTENT_COMPRESSION is zstd and utf-8 encoded otherwise."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if settings.RENDERED_CONTENT_COMPRESSION == ZSTD_ENCODING:
+        return zstd_compress(value)
+    return value
+
+
+def decompress_text(stored: bytes | memoryview) -> str:
+    """Return the text stored by compress_text(). Valid utf-8 never starts with
+    the zstd magic number, so either way of storing it can be read."""
+    stored = bytes(stored)
+    if stored.startswith(ZSTD_MAGIC):
+        stored = zstd_decompress(stored)
+    return stored.decode("utf-8")
+
+
+def accepts_encoding(request, encoding: str) -> bool:
+    """Return True if the request's Accept-Encoding allows the given encoding."""
+    for value in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = value.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        quality = params.strip().removeprefix("q=")
+        try:
+            return not params or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def get_precompressed(body: bytes) -> dict[str, bytes]:
+    """Return the brotli and gzip compressed versions of body, by encoding.
+
+    Short bodies aren't worth compressing, so nothing is returned for them.
+    """
+    if len(body) < PRECOMPRESSED_MIN_LENGTH:
+        return {}
+    return {
+        BROTLI_ENCODING: brotli.compress(body, quality=5),
+        # a fixed mtime keeps the output, and so its ETag, stable
+        GZIP_ENCODING: gzip.compress(body, compresslevel=6, mtime=0),
+    }
+
+
+def get_etag(body: bytes) -> str:
+    """Return a strong ETag for body.
+
+    The template version is included so a template change that happens to leave
+    a page's bytes the same still invalidates what clients have cached.
+    """
+    digest = hashlib.sha1(PROCESSED_CONTENT_TEMPLATE_VERSION.encode())
+    digest.update(body)
+    return f'"{digest.hexdigest()}"'
+
+
+def get_encoded_etag(etag: str, encoding: str) -> str:
+    """Return the ETag of an encoded representation of the body tagged etag.
+
+    Each encoding is a different representation, so it needs a different ETag.
+    """
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def choose_encoding(request, encodings) -> str | None:
+    """Return the preferred encoding of encodings that the request accepts."""
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in encodings and accepts_encoding(request, encoding):
+            return encoding
+    return None
+
+
+class ZstdCompressor(BaseCompressor):
+    """django-redis compressor for the static_content cache.
+
+    Values stored before compression was enabled are returned as they are, so
+    the cache doesn't need to be flushed when this is turned on.
+    """
+
+    min_length = 1024
+
+    def compress(self, value: bytes) -> bytes:
+        if len(value) > self.min_length:
+            return zstd_compress(value)
+        return value
+
+    def decompress(self, value: bytes) -> bytes:
+        if value.startswith(ZSTD_MAGIC):
+            return zstd_decompress(value)
+        return value
@@ -71,3 +71,32 @@ FULLY_MODERNIZED_LIB_VERSIONS = [
     "doc/antora/url",
 ]
 RENDERED_CONTENT_BATCH_DELETE_SIZE = 10000
+RENDERED_CONTENT_LATEST_PATH_BATCH_SIZE = 1000
+RENDERED_CONTENT_TRANSFORM_BATCH_SIZE = 200
+# Post-processed docs HTML is stored under this prefix + a generation and variant,
+# and the generation of each page under this prefix + its RenderedContent cache_key.
+# Bump the template version when the docs templates or htmlhelper transforms change
+# in a way that should invalidate previously processed pages.
+PROCESSED_CONTENT_CACHE_PREFIX = "processed_"
+PROCESSED_CONTENT_TEMPLATE_VERSION = "1"
+# Version of the request independent docs transforms stored in RenderedContent at
+# ingest, see core.htmlhelper.transform_docs_content. Bump it when they change,
+# rows transformed by an older version are ignored until they're backfilled with
+# the transform_rendered_content command.
+DOCS_TRANSFORM_VERSION = "1"
+# Processed pages at least this long are also cached brotli and gzip compressed,
+# and sent that way to clients accepting it, see core.compression
+PRECOMPRESSED_MIN_LENGTH = 1024
+# Compressed versions of other static content responses are cached under this
+# prefix + the body's ETag, see core.caching.get_precompressed_content
+PRECOMPRESSED_CACHE_PREFIX = "precompressed_"
+# Cache keys for the record of S3 keys known not to exist, see core.caching
+MISSING_S3_KEY_CACHE_PREFIX = "missing_s3_key_"
+MISSING_S3_KEYS_CLEARED_AT_KEY = "missing_s3_keys_cleared_at"
+SINGLE_FLIGHT_LOCK_PREFIX = "single_flight_lock_"
+REVALIDATE_LOCK_PREFIX = "revalidate_lock_"
+# AsciiDoc conversions are cached in redis under this prefix + a hash of the
+# asciidoctor gem versions + a hash of the source
+ASCIIDOC_CACHE_PREFIX = "asciidoc_"
+# Seconds before looking up the asciidoctor gem versions again after it failed
+ASCIIDOCTOR_VERSION_RETRY_INTERVAL = 300
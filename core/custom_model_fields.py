@@ -1,6 +1,9 @@
+from django import forms
 from django.db import models
 from django.db.models.fields.files import FieldFile
 
+from .compression import compress_text, decompress_text
+
 
 class NullableFileField(models.FileField):
     def get_db_prep_value(self, value, connection, prepared=False):
@@ -9,3 +12,49 @@ class NullableFileField(models.FileField):
                 return None
             value = value.name
         return super().get_db_prep_value(value, connection, prepared)
+
+
+class CompressedTextField(models.BinaryField):
+    """Text stored compressed in a binary column, see compress_text().
+
+    Values are compressed and decompressed by the field, so every ORM path reads
+    and writes text: model instances, values(), values_list(), update() and
+    bulk_update(). Lookups on the text itself, e.g. contains, aren't supported.
+    """
+
+    empty_values = models.Field.empty_values
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("editable", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.editable:
+            del kwargs["editable"]
+        else:
+            kwargs["editable"] = False
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, (str, bytes)):
+            value = compress_text(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return super().formfield(
+            **{"form_class": forms.CharField, "widget": forms.Textarea, **kwargs}
+        )
@@ -0,0 +1,91 @@
+import bisect
+import time
+
+import structlog
+from django.conf import settings
+
+from .boostrenderer import get_s3_client
+
+logger = structlog.get_logger()
+
+
+def get_docs_archive_prefix(version_slug: str) -> str:
+    """Return the S3 prefix holding a version's docs, e.g. archives/boost_1_90_0/"""
+    return f"archives/boost_{version_slug}/"
+
+
+def list_docs_keys(version_slug: str) -> list[str]:
+    """Return every S3 key under the version's docs archive, relative to it."""
+    prefix = get_docs_archive_prefix(version_slug)
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    keys = []
+    for page in paginator.paginate(
+        Bucket=settings.STATIC_CONTENT_BUCKET_NAME, Prefix=prefix
+    ):
+        keys.extend(obj["Key"][len(prefix) :] for obj in page.get("Contents", []))
+    return keys
+
+
+def build_docs_path_index(version_slug: str):
+    """List the version's docs archive and store it as its DocsPathIndex."""
+    from .models import DocsPathIndex
+
+    keys = list_docs_keys(version_slug)
+    index, _ = DocsPathIndex.objects.get_or_create(version_slug=version_slug)
+    index.set_keys(keys)
+    index.save()
+    logger.info(
+        "docs_path_index_built", version_slug=version_slug, key_count=index.key_count
+    )
+    return index
+
+
+class SortedKeyIndex:
+    """Membership lookups over a sorted list of keys."""
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+
+# version slug -> (checked at, index modified at, SortedKeyIndex or None)
+_docs_path_indexes = {}
+
+
+def get_docs_path_index(version_slug: str) -> SortedKeyIndex | None:
+    """Return the docs path index for the version, or None if it hasn't been built.
+
+    Indexes are kept in memory and only reloaded when the stored index changes,
+    which is checked at most every DOCS_PATH_INDEX_CHECK_INTERVAL seconds.
+    """
+    from .models import DocsPathIndex
+
+    now = time.monotonic()
+    cached = _docs_path_indexes.get(version_slug)
+    if cached and now - cached[0] < settings.DOCS_PATH_INDEX_CHECK_INTERVAL:
+        return cached[2]
+
+    modified = (
+        DocsPathIndex.objects.filter(version_slug=version_slug)
+        .values_list("modified", flat=True)
+        .first()
+    )
+    if cached and cached[1] == modified:
+        index = cached[2]
+    elif modified is None:
+        index = None
+    else:
+        stored = DocsPathIndex.objects.get(version_slug=version_slug)
+        index = SortedKeyIndex(stored.get_keys())
+        modified = stored.modified
+        logger.debug(
+            "docs_path_index_loaded", version_slug=version_slug, key_count=len(index)
+        )
+    _docs_path_indexes[version_slug] = (now, modified, index)
+    return index
@@ -0,0 +1,104 @@
+import hashlib
+import re
+
+import requests
+import structlog
+from django.conf import settings
+
+from libraries.constants import (
+    DEVELOP_RELEASE_URL_PATH_STR,
+    LATEST_RELEASE_URL_PATH_STR,
+    MASTER_RELEASE_URL_PATH_STR,
+)
+from libraries.utils import modernize_boost_slug
+
+logger = structlog.get_logger()
+
+FASTLY_API_URL = "https://api.fastly.com"
+# Fastly accepts at most this many keys in one purge request
+FASTLY_PURGE_BATCH_SIZE = 256
+# Release pages, tagged by the Fastly VCL
+RELEASE_SURROGATE_KEY = "release"
+# Pages served through the "latest" alias, which change when a new version is released
+LATEST_SURROGATE_KEY = f"version-{LATEST_RELEASE_URL_PATH_STR}"
+
+DOCS_VERSION_RE = re.compile(r"^(?:boost_)?(\d+_\d+_\d+(?:_beta\d+)?)$")
+
+
+def get_version_surrogate_key(version_slug: str) -> str:
+    """Return the key for pages of a version, given its slug e.g. boost-1-84-0."""
+    return f"version-{version_slug}"
+
+
+def get_library_surrogate_key(library_slug: str) -> str:
+    return f"library-{library_slug}"
+
+
+def get_content_surrogate_key(content_path: str) -> str:
+    """Return the key for a single static content page.
+
+    Paths can be longer than Fastly allows for a key, so they're hashed.
+    """
+    content_path = content_path.strip("/")
+    return f"content-{hashlib.sha1(content_path.encode()).hexdigest()[:16]}"
+
+
+def get_content_surrogate_keys(content_path: str) -> list[str]:
+    """Return the keys for a static content or docs page.
+
+    These are the page itself, the top level directory it's in, and for docs the
+    version and library they belong to.
+    """
+    content_path = content_path.strip("/")
+    first, _, rest = content_path.partition("/")
+    keys = [get_content_surrogate_key(content_path), f"path-{first}"]
+    if first in (DEVELOP_RELEASE_URL_PATH_STR, MASTER_RELEASE_URL_PATH_STR):
+        keys.append(get_version_surrogate_key(first))
+    elif match := DOCS_VERSION_RE.match(first):
+        keys.append(get_version_surrogate_key(modernize_boost_slug(match.group(1))))
+    parts = rest.split("/")
+    if parts[0] == "libs" and len(parts) > 2:
+        keys.append(get_library_surrogate_key(parts[1]))
+    return keys
+
+
+def add_surrogate_keys(response, keys):
+    """Add keys to the response's Surrogate-Key header."""
+    existing = response.get("Surrogate-Key", "").split()
+    keys = [key for key in keys if key and key not in existing]
+    response["Surrogate-Key"] = " ".join([*existing, *dict.fromkeys(keys)])
+    return response
+
+
+def purge_surrogate_keys(keys):
+    """Soft purge the pages tagged with any of keys from the Fastly services."""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    if not settings.FASTLY_API_TOKEN or settings.FASTLY_API_TOKEN == "empty":
+        logger.warning("FASTLY_API_TOKEN not found. Not purging cache.")
+        return
+
+    fastly_services = [settings.FASTLY_SERVICE, settings.FASTLY_SERVICE2]
+    for service in fastly_services:
+        if not service or service == "empty":
+            logger.warning(f"Fastly {service=} not found. Not purging cache.")
+            continue
+        url = f"{FASTLY_API_URL}/service/{service}/purge"
+        for i in range(0, len(keys), FASTLY_PURGE_BATCH_SIZE):
+            batch = keys[i : i + FASTLY_PURGE_BATCH_SIZE]
+            response = requests.post(
+                url,
+                headers={
+                    "Fastly-Key": settings.FASTLY_API_TOKEN,
+                    "Fastly-Soft-Purge": "1",
+                    "Surrogate-Key": " ".join(batch),
+                    "Accept": "application/json",
+                },
+            )
+            logger.info(
+                "fastly_surrogate_keys_purged",
+                service=service,
+                keys=batch,
+                status_code=response.status_code,
+            )
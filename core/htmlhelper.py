@@ -1,6 +1,6 @@
 import re
 
-from bs4 import BeautifulSoup, Comment, Tag
+from bs4 import BeautifulSoup, Comment, SoupStrainer, Tag
 from django.http import HttpHeaders
 from django.template.loader import render_to_string
 from django.templatetags.static import static
@@ -91,6 +91,168 @@ REMOVE_CSS_CLASSES = [
 ]
 
 
+class TagVisitor:
+    """A transform applied by HtmlRewriter.
+
+    visit() is called for every tag, in document order, before any tag is
+    removed; it may change the tag's attributes but must not change the tree.
+    Removals are returned from finish(), which runs once the traversal is done.
+    """
+
+    def visit(self, tag: Tag):
+        pass
+
+    def finish(self) -> list[Tag]:
+        """Return the tags to remove, in the order they should be removed."""
+        return []
+
+
+class TagMatcher:
+    """Matches tags like soup.find(tag_name, tag_attrs) does, looking up the
+    specs by tag name so most tags are rejected with a dict lookup."""
+
+    def __init__(self, tags: list[tuple[str, dict]]):
+        self.strainers: dict[str, list[tuple[int, SoupStrainer]]] = {}
+        for index, (tag_name, tag_attrs) in enumerate(tags):
+            self.strainers.setdefault(tag_name, []).append(
+                (index, SoupStrainer(tag_name, tag_attrs))
+            )
+
+    def matches(self, tag: Tag) -> list[int]:
+        """Return the indexes of the specs matching the tag."""
+        return [
+            index
+            for index, strainer in self.strainers.get(tag.name, [])
+            if strainer.matches_tag(tag)
+        ]
+
+
+class RemoveFirstTags(TagVisitor):
+    """Remove the first occurrence of each of the tags, like remove_first_tag().
+
+    Like running the removals one after another, a tag inside one removed by an
+    earlier spec doesn't count as the first occurrence of a later spec.
+    """
+
+    def __init__(self, tags: list[tuple[str, dict]]):
+        self.matcher = TagMatcher(tags)
+        self.candidates: list[list[Tag]] = [[] for _ in tags]
+
+    def visit(self, tag):
+        for index in self.matcher.matches(tag):
+            self.candidates[index].append(tag)
+
+    def finish(self):
+        removed = []
+        removed_ids = set()
+        for candidates in self.candidates:
+            for tag in candidates:
+                # compare by identity, equal looking tags are distinct elements
+                if id(tag) in removed_ids or any(
+                    id(parent) in removed_ids for parent in tag.parents
+                ):
+                    continue
+                removed.append(tag)
+                removed_ids.add(id(tag))
+                break
+        return removed
+
+
+class RemoveAllTags(TagVisitor):
+    """Remove every occurrence of the tags."""
+
+    def __init__(self, tags: list[tuple[str, dict]]):
+        self.matcher = TagMatcher(tags)
+        self.removed = []
+
+    def visit(self, tag):
+        if self.matcher.matches(tag):
+            self.removed.append(tag)
+
+    def finish(self):
+        return self.removed
+
+
+class RemoveCssClasses(TagVisitor):
+    """Remove the class attribute of the tags, see REMOVE_CSS_CLASSES."""
+
+    def __init__(self, tags: list[tuple[str, dict]]):
+        self.matcher = TagMatcher(tags)
+
+    def visit(self, tag):
+        if self.matcher.matches(tag):
+            tag.attrs.pop("class")
+
+
+class ConvertNameToId(TagVisitor):
+    """Convert all (deprecated) name attributes to id attributes."""
+
+    def visit(self, tag):
+        if tag.attrs.get("name") is not None:
+            tag["id"] = tag["name"]
+            del tag["name"]
+
+
+class RemoveLibraryBoostlook(TagVisitor):
+    """Remove links to a library's own copy of boostlook.css."""
+
+    def __init__(self):
+        self.removed = []
+
+    def visit(self, tag):
+        if tag.name != "link":
+            return
+        href = tag.get("href")
+        if (
+            href
+            and href.endswith("boostlook.css")
+            and href != "/static/css/boostlook.css"
+        ):
+            self.removed.append(tag)
+
+    def finish(self):
+        return self.removed
+
+
+class RemoveEmbeddedBoostlook(TagVisitor):
+    """Remove <style> blocks containing boostlook rules."""
+
+    pattern = re.compile(r"\.boostlook")
+
+    def __init__(self):
+        self.removed = []
+
+    def visit(self, tag):
+        if tag.name == "style" and tag.string and self.pattern.search(tag.string):
+            self.removed.append(tag)
+
+    def finish(self):
+        return self.removed
+
+
+class HtmlRewriter:
+    """Applies several transforms to a soup in a single traversal.
+
+    Running each transform as its own find_all() walks the whole tree once per
+    transform, which adds up on large generated reference pages. The output is
+    the same as applying the visitors' transforms one after another, in order.
+    """
+
+    def __init__(self, *visitors: TagVisitor):
+        self.visitors = visitors
+
+    def rewrite(self, soup: BeautifulSoup) -> BeautifulSoup:
+        for element in soup.descendants:
+            if isinstance(element, Tag):
+                for visitor in self.visitors:
+                    visitor.visit(element)
+        for visitor in self.visitors:
+            for tag in visitor.finish():
+                if not tag.decomposed:
+                    tag.decompose()
+        return soup
+
+
 def _insert_in_doc(target, elements, append=True):
     to_add = [
         BeautifulSoup("<!-- BEGIN Manually appending items -->"),
@@ -182,15 +344,13 @@ def modernize_legacy_page(
         # Not an HTML file we care about
         return str(soup)
 
-    # Remove CSS classes that produce visual harm
-    for tag_name, tag_attrs in REMOVE_CSS_CLASSES:
-        for tag in soup.find_all(tag_name, tag_attrs):
-            tag.attrs.pop("class")
-
-    soup = convert_name_to_id(soup)
+    # Remove CSS classes that produce visual harm, name attributes and library
+    # copies of boostlook, in one pass over the page
+    visitors = [RemoveCssClasses(REMOVE_CSS_CLASSES), ConvertNameToId()]
     if not skip_replace_boostlook:
-        soup = remove_library_boostlook(soup)
-    soup = remove_embedded_boostlook(soup)
+        visitors.append(RemoveLibraryBoostlook())
+    visitors.append(RemoveEmbeddedBoostlook())
+    soup = HtmlRewriter(*visitors).rewrite(soup)
 
     # Use the base HTML to later extract the <head> and (part of) the <body>
     placeholder = BeautifulSoup(base_html, "html.parser")
@@ -241,18 +401,22 @@ def minimize_uris(content: str) -> str:
 
 
 def remove_unwanted(content: BeautifulSoup) -> BeautifulSoup:
-    # Remove the first occurrence of legacy header(s) and other stuff
-    for tag_name, tag_attrs in REMOVE_TAGS:
-        tag = content.find(tag_name, tag_attrs)
-        if tag:
-            tag.decompose()
+    # Remove the first occurrence of legacy header(s) and other stuff, and all
+    # navbar-like divs, if any
+    return HtmlRewriter(
+        RemoveFirstTags(REMOVE_TAGS), RemoveAllTags(REMOVE_ALL)
+    ).rewrite(content)
 
-    # Remove all navbar-like divs, if any
-    for tag_name, tag_attrs in REMOVE_ALL:
-        for tag in content.find_all(tag_name, tag_attrs):
-            tag.decompose()
 
-    return content
+def transform_docs_content(content: str | bytes) -> str:
+    """Apply the library docs transforms that don't depend on the request.
+
+    This is the start of DocLibsTemplateView's processing for libraries that
+    aren't in NO_PROCESS_LIBS or FULLY_MODERNIZED_LIB_VERSIONS. It's run when
+    content is saved to RenderedContent, so requests only assemble the template.
+    """
+    soup = remove_unwanted(BeautifulSoup(content, "html.parser"))
+    return minimize_uris(str(soup))
 
 
 def build_xpath(tag, attrs):
@@ -0,0 +1,33 @@
+import djclick as click
+
+from core.docs_path_index import build_docs_path_index
+from versions.models import Version
+
+
+@click.command()
+@click.option(
+    "--version",
+    "version_slug",
+    help="The version to index, e.g. 1_90_0. Defaults to the most recent version.",
+)
+@click.option("--all", "all_versions", is_flag=True, help="Index every full release.")
+def command(version_slug, all_versions):
+    """Lists the docs archives in S3 and stores them as DocsPathIndex rows, so
+    the path matchers can check docs paths without asking S3."""
+    if all_versions:
+        version_slugs = [
+            version.stripped_boost_url_slug
+            for version in Version.objects.active().filter(
+                full_release=True, beta=False
+            )
+        ]
+    elif version_slug:
+        version_slugs = [version_slug]
+    elif version := Version.objects.most_recent():
+        version_slugs = [version.stripped_boost_url_slug]
+    else:
+        raise click.ClickException("No version found to index.")
+
+    for version_slug in version_slugs:
+        index = build_docs_path_index(version_slug)
+        click.secho(f"Indexed {index.key_count} keys for {version_slug}.", fg="green")
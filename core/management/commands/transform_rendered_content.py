@@ -0,0 +1,11 @@
+import djclick as click
+
+from core.tasks import transform_rendered_content
+
+
+@click.command()
+def command():
+    """Applies the ingest time docs transforms to RenderedContent rows saved before
+    them, or by an older version of them, so requests can skip those transforms."""
+    count = transform_rendered_content()
+    click.secho(f"Transformed {count} rendered content rows.", fg="green")
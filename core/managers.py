@@ -7,6 +7,8 @@ from django.utils import timezone
 import datetime
 from django.conf import settings
 
+from .caching import clear_processed_content
+
 logger = structlog.get_logger()
 
 
@@ -32,6 +34,7 @@ class RenderedContentManager(models.Manager):
         results = self.filter(content_type=content_type)
         for result in results:
             cache.delete(result.cache_key)
+            clear_processed_content(result.cache_key)
 
         logger.info(
             "rendered_content_manager_clear_cache_by_content_type",
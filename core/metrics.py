@@ -0,0 +1,96 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+
+STATIC_CONTENT_REQUESTS = Counter(
+    "static_content_requests_total",
+    "Static content requests, by view and the cache tier that served the content.",
+    ["view", "cache_tier"],
+)
+STATIC_CONTENT_STAGE_SECONDS = Histogram(
+    "static_content_stage_seconds",
+    "Time spent in each stage of a static content request.",
+    ["view", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class RequestTimings:
+    """Per stage durations of a request, and the cache tier that served it.
+
+    A stage can be entered more than once, e.g. two cache lookups, and its
+    durations are added up.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.cache_tier = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.start
+
+    def get_server_timing(self) -> str:
+        """Return the durations as a Server-Timing header value, in milliseconds."""
+        metrics = [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()
+        ]
+        if self.cache_tier:
+            metrics.append(f'tier;desc="{self.cache_tier}"')
+        metrics.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def get_log_fields(self) -> dict:
+        """Return the durations as structlog fields, in milliseconds."""
+        fields = {
+            f"{name}_ms": round(seconds * 1000, 1)
+            for name, seconds in self.stages.items()
+        }
+        fields["cache_tier"] = self.cache_tier
+        fields["total_ms"] = round(self.total * 1000, 1)
+        return fields
+
+    def observe(self, view: str):
+        """Record the request in the static content metrics."""
+        STATIC_CONTENT_REQUESTS.labels(
+            view=view, cache_tier=self.cache_tier or "none"
+        ).inc()
+        for name, seconds in self.stages.items():
+            STATIC_CONTENT_STAGE_SECONDS.labels(view=view, stage=name).observe(seconds)
+        STATIC_CONTENT_STAGE_SECONDS.labels(view=view, stage="total").observe(
+            self.total
+        )
+
+
+def get_metrics() -> tuple[bytes, str]:
+    """Return the metrics in the Prometheus text format, and its content type.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, metrics are collected from all the
+    processes writing to it, otherwise from this process only.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
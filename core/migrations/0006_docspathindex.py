@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:00
+
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_sitesettings_rendered_content_replacement_start"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocsPathIndex",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                (
+                    "version_slug",
+                    models.CharField(
+                        help_text="The stripped boost url slug of the version, e.g. 1_90_0.",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "keys",
+                    models.BinaryField(help_text="The compressed, sorted S3 keys."),
+                ),
+                ("key_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "docs path index",
+                "verbose_name_plural": "docs path indexes",
+            },
+        ),
+    ]
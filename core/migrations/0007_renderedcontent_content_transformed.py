@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_docspathindex"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="content_transformed",
+            field=models.TextField(
+                blank=True,
+                help_text="The HTML content with the request independent docs transforms applied.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="transform_version",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The version of the transforms content_transformed was made by.",
+                max_length=32,
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_renderedcontent_content_transformed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="content_encoding",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The encoding of the compressed content fields, e.g. zstd.",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="content_html_compressed",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="content_original_compressed",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="renderedcontent",
+            name="content_transformed_compressed",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
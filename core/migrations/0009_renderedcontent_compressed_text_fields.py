@@ -0,0 +1,87 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:16
+
+import core.custom_model_fields
+from django.db import migrations
+
+
+# The content columns become binary, holding utf-8 text or, for the rows written
+# compressed since 0008, the compressed copy that was kept next to them.
+FORWARD_SQL = """
+ALTER TABLE core_renderedcontent
+    ALTER COLUMN {field} TYPE bytea USING convert_to({field}, 'UTF8');
+UPDATE core_renderedcontent SET {field} = {field}_compressed
+    WHERE {field}_compressed IS NOT NULL;
+"""
+# Compressed values, which start with the zstd magic number, go back to the
+# compressed copies
+REVERSE_SQL = """
+UPDATE core_renderedcontent
+    SET {field}_compressed = {field}, {field} = NULL, content_encoding = 'zstd'
+    WHERE substring({field} from 1 for 4) = '\\x28b52ffd'::bytea;
+ALTER TABLE core_renderedcontent
+    ALTER COLUMN {field} TYPE text USING convert_from({field}, 'UTF8');
+"""
+FIELDS = ["content_original", "content_html", "content_transformed"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_renderedcontent_compressed_content"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    FORWARD_SQL.format(field=field),
+                    reverse_sql=REVERSE_SQL.format(field=field),
+                )
+                for field in FIELDS
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="renderedcontent",
+                    name="content_html",
+                    field=core.custom_model_fields.CompressedTextField(
+                        blank=True, help_text="The rendered HTML content.", null=True
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="renderedcontent",
+                    name="content_original",
+                    field=core.custom_model_fields.CompressedTextField(
+                        blank=True, help_text="The original content.", null=True
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="renderedcontent",
+                    name="content_transformed",
+                    field=core.custom_model_fields.CompressedTextField(
+                        blank=True,
+                        help_text=(
+                            "The HTML content with the request independent docs "
+                            "transforms applied."
+                        ),
+                        null=True,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="renderedcontent",
+            name="content_encoding",
+        ),
+        migrations.RemoveField(
+            model_name="renderedcontent",
+            name="content_html_compressed",
+        ),
+        migrations.RemoveField(
+            model_name="renderedcontent",
+            name="content_original_compressed",
+        ),
+        migrations.RemoveField(
+            model_name="renderedcontent",
+            name="content_transformed_compressed",
+        ),
+    ]
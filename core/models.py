@@ -1,11 +1,11 @@
 import re
+import zlib
 
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 
-from libraries.path_matcher.utils import determine_latest_url
-from versions.models import Version
+from .custom_model_fields import CompressedTextField
 from .managers import RenderedContentManager
 
 
@@ -39,12 +39,26 @@ class RenderedContent(TimeStampedModel):
         null=True,
         blank=True,
     )
-    content_original = models.TextField(
+    # Stored compressed with RENDERED_CONTENT_COMPRESSION, see CompressedTextField
+    content_original = CompressedTextField(
         help_text=_("The original content."), null=True, blank=True
     )
-    content_html = models.TextField(
+    content_html = CompressedTextField(
         help_text=_("The rendered HTML content."), null=True, blank=True
     )
+    content_transformed = CompressedTextField(
+        help_text=_(
+            "The HTML content with the request independent docs transforms applied."
+        ),
+        null=True,
+        blank=True,
+    )
+    transform_version = models.CharField(
+        max_length=32,
+        blank=True,
+        default="",
+        help_text=_("The version of the transforms content_transformed was made by."),
+    )
     last_updated_at = models.DateTimeField(
         help_text=_("The last time the content was updated in S3."),
         null=True,
@@ -72,6 +86,8 @@ class RenderedContent(TimeStampedModel):
 
     @property
     def latest_path(self) -> str | None:
+        """Return the equivalent path in the latest docs, or None if it hasn't been
+        determined yet (see core.tasks.resolve_latest_docs_paths)."""
         indicator = self.latest_path_matched_indicator
         if indicator == LatestPathMatchIndicator.DIRECT_MATCH:
             return re.sub(
@@ -81,11 +97,7 @@ class RenderedContent(TimeStampedModel):
             )
         elif indicator == LatestPathMatchIndicator.CUSTOM_MATCH:
             return self.latest_docs_path
-        elif indicator == LatestPathMatchIndicator.UNDETERMINED:
-            return determine_latest_url(
-                self.cache_key.replace("static_content_", ""),
-                Version.objects.most_recent(),
-            )
+        return None
 
     def save(self, *args, **kwargs):
         if isinstance(self.content_original, bytes):
@@ -98,6 +110,42 @@ class RenderedContent(TimeStampedModel):
         super().save(*args, **kwargs)
 
 
+class DocsPathIndex(TimeStampedModel):
+    """A sorted index of every S3 key in a version's docs archive.
+
+    Used to answer "does this docs path exist" without asking S3. Keys are
+    stored relative to the version's archive prefix (e.g. "libs/json/index.html"
+    for "archives/boost_1_90_0/libs/json/index.html"), newline separated and
+    zlib compressed.
+    """
+
+    version_slug = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text=_("The stripped boost url slug of the version, e.g. 1_90_0."),
+    )
+    keys = models.BinaryField(help_text=_("The compressed, sorted S3 keys."))
+    key_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("docs path index")
+        verbose_name_plural = _("docs path indexes")
+
+    def __str__(self):
+        return self.version_slug
+
+    def get_keys(self) -> list[str]:
+        """Return the sorted keys."""
+        keys = zlib.decompress(bytes(self.keys)).decode("utf-8")
+        return keys.split("\n") if keys else []
+
+    def set_keys(self, keys):
+        """Store the given keys, sorted and compressed."""
+        keys = sorted(set(keys))
+        self.keys = zlib.compress("\n".join(keys).encode("utf-8"), 9)
+        self.key_count = len(keys)
+
+
 class SiteSettings(models.Model):
     wordcloud_ignore = models.TextField(
         default="",
@@ -3,18 +3,88 @@ import structlog
 from celery import shared_task
 from dateutil.parser import parse
 
+from django.conf import settings
 from django.core.cache import caches
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
 from core.asciidoc import convert_adoc_to_html
-from libraries.path_matcher.utils import get_path_match_from_chain
+from core.caching import (
+    clear_all_missing_s3_keys,
+    clear_missing_s3_keys,
+    clear_processed_content,
+    set_with_soft_expiry,
+)
+from libraries.path_matcher.base_path_matcher import PathMatchResult
+from libraries.path_matcher.utils import (
+    get_path_match_from_chain,
+    get_path_matches_from_chain,
+)
 from versions.models import Version
-from .boostrenderer import get_content_from_s3
-from .constants import RENDERED_CONTENT_BATCH_DELETE_SIZE
+from .boostrenderer import get_candidate_s3_keys, get_content_from_s3
+from .constants import (
+    DOCS_TRANSFORM_VERSION,
+    RENDERED_CONTENT_BATCH_DELETE_SIZE,
+    RENDERED_CONTENT_LATEST_PATH_BATCH_SIZE,
+    RENDERED_CONTENT_TRANSFORM_BATCH_SIZE,
+)
+from .docs_path_index import build_docs_path_index as _build_docs_path_index
+from .fastly import get_content_surrogate_key, purge_surrogate_keys
+from .htmlhelper import (
+    is_in_no_process_libs,
+    is_managed_content_type,
+    transform_docs_content,
+)
 from .models import RenderedContent, LatestPathMatchIndicator
 
 logger = structlog.get_logger()
 
+LATEST_PATH_FIELDS = [
+    "latest_path_matched_indicator",
+    "latest_docs_path",
+    "latest_path_match_class",
+]
+
+
+def get_latest_path_fields(match_result: PathMatchResult) -> dict:
+    """Return the RenderedContent latest path field values for a match result."""
+    indicator = (
+        LatestPathMatchIndicator.DIRECT_MATCH
+        if match_result.is_direct_equivalent
+        else LatestPathMatchIndicator.CUSTOM_MATCH
+    )
+    # we don't set the latest_docs_path if it's a direct match, for db size reduction
+    return {
+        "latest_path_matched_indicator": indicator,
+        "latest_docs_path": (
+            match_result.latest_path if not match_result.is_direct_equivalent else ""
+        ),
+        "latest_path_match_class": match_result.matcher,
+    }
+
+
+def get_transformed_content_fields(cache_key, content_type, content_html) -> dict:
+    """Return the RenderedContent transformed content field values for content.
+
+    Only library docs html is transformed, libraries in NO_PROCESS_LIBS are
+    served as they are. The version is set either way, so the backfill in
+    transform_rendered_content skips the content next time.
+    """
+    content_path = cache_key.replace("static_content_", "")
+    if (
+        not content_html
+        or not is_managed_content_type(content_type or "")
+        or is_in_no_process_libs(f"/doc/libs/{content_path}")
+    ):
+        return {
+            "content_transformed": None,
+            "transform_version": DOCS_TRANSFORM_VERSION,
+        }
+    return {
+        "content_transformed": transform_docs_content(content_html),
+        "transform_version": DOCS_TRANSFORM_VERSION,
+    }
+
 
 @shared_task
 def clear_rendered_content_cache_by_cache_key(cache_key):
@@ -22,6 +92,7 @@ def clear_rendered_content_cache_by_cache_key(cache_key):
     database."""
     cache = caches["static_content"]
     cache.delete(cache_key)
+    clear_processed_content(cache_key)
     RenderedContent.objects.delete_by_cache_key(cache_key)
 
 
@@ -41,10 +112,40 @@ def clear_static_content_cache():
     )
 
 
+@shared_task
+def clear_missing_s3_key_cache():
+    """Forgets every S3 key recorded as missing, so newly uploaded content is
+    picked up immediately."""
+    clear_all_missing_s3_keys()
+
+
+@shared_task
+def purge_fastly_surrogate_keys(keys):
+    """Purges the pages tagged with any of the surrogate keys from Fastly."""
+    purge_surrogate_keys(keys)
+
+
+@shared_task
+def build_docs_path_index(version_slug):
+    """Lists a version's docs archive in S3 and stores it as a DocsPathIndex."""
+    _build_docs_path_index(version_slug)
+
+
+@shared_task
+def build_latest_docs_path_index():
+    """Rebuilds the docs path index of the most recent version."""
+    if version := Version.objects.most_recent():
+        _build_docs_path_index(version.stripped_boost_url_slug)
+
+
 @shared_task
 def refresh_content_from_s3(s3_key, cache_key):
     """Calls S3 with the s3_key, then saves the result to the
     RenderedContent object with the given cache_key."""
+    # The content may have been (re)uploaded, so don't trust earlier misses.
+    clear_missing_s3_keys(
+        settings.STATIC_CONTENT_BUCKET_NAME, get_candidate_s3_keys(s3_key)
+    )
     content_dict = get_content_from_s3(key=s3_key)
 
     content = content_dict.get("content")
@@ -54,6 +155,11 @@ def refresh_content_from_s3(s3_key, cache_key):
             content = convert_adoc_to_html(content)
         last_updated_at_raw = content_dict.get("last_updated_at")
         last_updated_at = parse(last_updated_at_raw) if last_updated_at_raw else None
+        previous = (
+            RenderedContent.objects.filter(cache_key=cache_key)
+            .only("content_html")
+            .first()
+        )
         # Clear the cache because we're going to update it.
         clear_rendered_content_cache_by_cache_key(cache_key)
 
@@ -63,7 +169,25 @@ def refresh_content_from_s3(s3_key, cache_key):
         )
         # Cache the refreshed rendered content
         cache = caches["static_content"]
-        cache.set(cache_key, {"content": content, "content_type": content_type})
+        set_with_soft_expiry(
+            cache, cache_key, {"content": content, "content_type": content_type}
+        )
+        # Only purge the CDN when the page changed, most refreshes find it as it was
+        content_html = (
+            content.decode("utf-8") if isinstance(content, bytes) else content
+        )
+        if not previous or previous.content_html != content_html:
+            purge_fastly_surrogate_keys.delay(
+                [get_content_surrogate_key(cache_key.replace("static_content_", ""))]
+            )
+
+
+@shared_task
+def refresh_static_content(view_class_path, content_path, cache_key):
+    """Fetches content from S3 again the way the static content view at
+    view_class_path does, replacing its cached result and RenderedContent object."""
+    view_class = import_string(view_class_path)
+    view_class().refresh_content(content_path, cache_key)
 
 
 @shared_task
@@ -74,21 +198,11 @@ def save_rendered_content(cache_key, content_type, content_html, last_updated_at
         cache_key.replace("static_content_", ""), Version.objects.most_recent()
     )
 
-    indicator = (
-        LatestPathMatchIndicator.DIRECT_MATCH
-        if match_result.is_direct_equivalent
-        else LatestPathMatchIndicator.CUSTOM_MATCH
-    )
-
-    # we don't set the latest_docs_path if it's a direct match, for db size reduction
     defaults = {
         "content_type": content_type,
         "content_html": content_html,
-        "latest_path_matched_indicator": indicator,
-        "latest_docs_path": (
-            match_result.latest_path if not match_result.is_direct_equivalent else None
-        ),
-        "latest_path_match_class": match_result.matcher,
+        **get_latest_path_fields(match_result),
+        **get_transformed_content_fields(cache_key, content_type, content_html),
         "modified": timezone.now(),
     }
 
@@ -98,6 +212,8 @@ def save_rendered_content(cache_key, content_type, content_html, last_updated_at
     obj, created = RenderedContent.objects.update_or_create(
         cache_key=cache_key[:255], defaults=defaults
     )
+    # The source changed, so any processed variants of it are now stale.
+    clear_processed_content(cache_key)
     logger.info(
         "content_saved_to_rendered_content",
         cache_key=cache_key,
@@ -108,6 +224,93 @@ def save_rendered_content(cache_key, content_type, content_html, last_updated_at
     )
 
 
+@shared_task
+def resolve_latest_docs_paths():
+    """Determines the latest docs path of every RenderedContent row that doesn't
+    have one yet, in batches, and saves them with bulk_update."""
+    version = Version.objects.most_recent()
+    if version is None:
+        return 0
+
+    resolved_count = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            RenderedContent.objects.filter(
+                pk__gt=last_pk,
+                cache_key__startswith="static_content_",
+                latest_path_matched_indicator=LatestPathMatchIndicator.UNDETERMINED,
+            )
+            .only("pk", "cache_key")
+            .order_by("pk")[:RENDERED_CONTENT_LATEST_PATH_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        urls = {
+            content.pk: content.cache_key.replace("static_content_", "")
+            for content in batch
+        }
+        matches = get_path_matches_from_chain(
+            list(urls.values()),
+            version,
+            max_workers=settings.LATEST_DOCS_PATH_RESOLVE_WORKERS,
+        )
+        resolved = []
+        for content in batch:
+            if (match_result := matches.get(urls[content.pk])) is None:
+                continue
+            for field, value in get_latest_path_fields(match_result).items():
+                setattr(content, field, value)
+            resolved.append(content)
+        RenderedContent.objects.bulk_update(resolved, LATEST_PATH_FIELDS)
+
+        resolved_count += len(resolved)
+        logger.info(f"batch resolved {len(resolved)=} {resolved_count=}")
+
+    logger.info("latest_docs_paths_resolved", total_count=resolved_count)
+    return resolved_count
+
+
+@shared_task
+def transform_rendered_content():
+    """Applies the ingest time docs transforms to RenderedContent html rows that
+    were saved before them, or by an older DOCS_TRANSFORM_VERSION, in batches."""
+    transformed_count = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            RenderedContent.objects.filter(
+                pk__gt=last_pk,
+                cache_key__startswith="static_content_",
+                content_type__startswith="text/html",
+            )
+            .exclude(transform_version=DOCS_TRANSFORM_VERSION)
+            .only("pk", "cache_key", "content_type", "content_html")
+            .order_by("pk")[:RENDERED_CONTENT_TRANSFORM_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        for content in batch:
+            fields = get_transformed_content_fields(
+                content.cache_key, content.content_type, content.content_html
+            )
+            for field, value in fields.items():
+                setattr(content, field, value)
+        RenderedContent.objects.bulk_update(
+            batch, ["content_transformed", "transform_version"]
+        )
+
+        transformed_count += len(batch)
+        logger.info(f"batch transformed {len(batch)=} {transformed_count=}")
+
+    logger.info("rendered_content_transformed", total_count=transformed_count)
+    return transformed_count
+
+
 @shared_task
 def delete_all_rendered_content():
     """
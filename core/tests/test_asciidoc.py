@@ -1,10 +1,55 @@
+import sys
 from os import getcwd, makedirs
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
+from django.core.cache import caches
+from django.test import override_settings
 
+from core.asciidoc import (
+    AsciidoctorError,
+    AsciidoctorPoolFull,
+    AsciidoctorWorkerPool,
+    convert_adoc_to_html,
+    get_asciidoctor_version,
+)
+from core.constants import ASCIIDOCTOR_VERSION_RETRY_INTERVAL
 
-from core.asciidoc import convert_adoc_to_html
+# Speaks the asciidoctor_worker.rb protocol, upper casing documents
+FAKE_WORKER = """
+import sys
+import time
+for header in iter(sys.stdin.buffer.readline, b""):
+    source = sys.stdin.buffer.read(int(header)).decode()
+    if source == "crash":
+        sys.exit(1)
+    if source == "stall":
+        # the header and part of the body, then nothing
+        sys.stdout.buffer.write(b"ok 10\\nSTA")
+        sys.stdout.buffer.flush()
+        time.sleep(60)
+    status, body = ("error", "bad") if source == "error" else ("ok", source.upper())
+    body = body.encode()
+    sys.stdout.buffer.write(f"{status} {len(body)}\\n".encode() + body)
+    sys.stdout.buffer.flush()
+"""
+FAKE_WORKER_COMMAND = [sys.executable, "-c", FAKE_WORKER]
+
+TEST_CACHES = {
+    "static_content": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "asciidoc-snowflake",
+    },
+}
+
+
+@pytest.fixture
+def pool():
+    pool = AsciidoctorWorkerPool(
+        FAKE_WORKER_COMMAND, size=1, max_queue=0, timeout=10, max_conversions=3
+    )
+    yield pool
+    pool.close()
 
 
 def test_convert_adoc_to_html_subprocess():
@@ -18,6 +63,124 @@ def test_convert_adoc_to_html_subprocess():
     assert result == "html_content"
 
 
+def test_asciidoctor_pool_reuses_workers(pool):
+    assert pool.convert("sample") == "SAMPLE"
+    worker = pool.idle[0]
+    assert pool.convert("ünïcode") == "ÜNÏCODE"
+    assert pool.idle == [worker]
+
+
+def test_asciidoctor_pool_conversion_error(pool):
+    pool.convert("sample")
+    worker = pool.idle[0]
+    with pytest.raises(AsciidoctorError, match="bad"):
+        pool.convert("error")
+    # the worker is fine, only the document was bad
+    assert pool.idle == [worker]
+
+
+def test_asciidoctor_pool_replaces_dead_workers(pool):
+    pool.convert("sample")
+    pool.idle[0].process.kill()
+    pool.idle[0].process.wait()
+    assert pool.convert("sample") == "SAMPLE"
+
+    with pytest.raises(AsciidoctorError):
+        pool.convert("crash")
+    assert pool.convert("sample") == "SAMPLE"
+
+
+def test_asciidoctor_pool_replaces_stalled_workers():
+    pool = AsciidoctorWorkerPool(
+        FAKE_WORKER_COMMAND, size=1, max_queue=0, timeout=0.5, max_conversions=3
+    )
+    try:
+        pool.convert("sample")
+        worker = pool.idle[0]
+        with pytest.raises(AsciidoctorError, match="longer than"):
+            pool.convert("stall")
+        assert not worker.is_alive()
+        assert pool.convert("sample") == "SAMPLE"
+    finally:
+        pool.close()
+
+
+def test_asciidoctor_pool_recycles_workers(pool):
+    for _ in range(3):
+        pool.convert("sample")
+    assert pool.idle == []
+    assert pool.convert("sample") == "SAMPLE"
+
+
+def test_asciidoctor_pool_full(pool):
+    pool.workers.acquire()
+    try:
+        with pytest.raises(AsciidoctorPoolFull):
+            pool.convert("sample")
+    finally:
+        pool.workers.release()
+
+
+@override_settings(
+    ASCIIDOCTOR_POOL_SIZE=1, ASCIIDOCTOR_WORKER_COMMAND=FAKE_WORKER_COMMAND
+)
+def test_convert_adoc_to_html_pool():
+    with patch("core.asciidoc._asciidoctor_pool", (None, None)), patch(
+        "core.asciidoc.subprocess.run"
+    ) as mock_run:
+        assert convert_adoc_to_html("sample") == "SAMPLE"
+    mock_run.assert_not_called()
+
+
+@override_settings(CACHES=TEST_CACHES, ASCIIDOC_CACHE_TIMEOUT=60)
+def test_convert_adoc_to_html_cached():
+    caches["static_content"].clear()
+    with patch(
+        "core.asciidoc.get_asciidoctor_version", return_value="asciidoctor (2.0.23)"
+    ), patch("core.asciidoc.run_asciidoctor", return_value="html") as mock_run:
+        assert convert_adoc_to_html("sample") == "html"
+        assert convert_adoc_to_html("sample") == "html"
+        assert mock_run.call_count == 1
+
+        assert convert_adoc_to_html("other") == "html"
+        assert mock_run.call_count == 2
+
+    # upgrading asciidoctor invalidates the cache
+    with patch(
+        "core.asciidoc.get_asciidoctor_version", return_value="asciidoctor (2.0.24)"
+    ), patch("core.asciidoc.run_asciidoctor", return_value="new html") as mock_run:
+        assert convert_adoc_to_html("sample") == "new html"
+
+
+@override_settings(CACHES=TEST_CACHES, ASCIIDOC_CACHE_TIMEOUT=60)
+def test_convert_adoc_to_html_unknown_version_not_cached():
+    with patch("core.asciidoc.get_asciidoctor_version", return_value=None), patch(
+        "core.asciidoc.run_asciidoctor", return_value="html"
+    ) as mock_run:
+        convert_adoc_to_html("sample")
+        convert_adoc_to_html("sample")
+    assert mock_run.call_count == 2
+
+
+def test_get_asciidoctor_version_retries_failures():
+    gem_list = MagicMock(stdout="asciidoctor (2.0.23)\n")
+    with patch("core.asciidoc._asciidoctor_version", (None, None)), patch(
+        "core.asciidoc.subprocess.run", side_effect=[OSError("no gem"), gem_list]
+    ) as mock_run, patch("core.asciidoc.time.monotonic", return_value=1000):
+        assert get_asciidoctor_version() is None
+        # the failure is remembered for a while
+        assert get_asciidoctor_version() is None
+        assert mock_run.call_count == 1
+
+        with patch(
+            "core.asciidoc.time.monotonic",
+            return_value=1000 + ASCIIDOCTOR_VERSION_RETRY_INTERVAL,
+        ):
+            assert get_asciidoctor_version() == "asciidoctor (2.0.23)"
+            assert get_asciidoctor_version() == "asciidoctor (2.0.23)"
+        assert mock_run.call_count == 2
+
+
 @pytest.mark.asciidoctor
 def test_convert_adoc_to_html_content():
     """Test the process_adoc_to_html_content function."""
@@ -40,3 +203,12 @@ def test_convert_adoc_to_html_content_file():
         makedirs("/tmp/asciidocs", exist_ok=True)
         open("/tmp/asciidocs/tmp.html", "w").write(output)
     assert output == expected_output
+
+
+@pytest.mark.asciidoctor
+@override_settings(ASCIIDOCTOR_POOL_SIZE=1)
+def test_convert_adoc_to_html_pool_matches_command():
+    content = open(f"{getcwd()}/core/tests/content/asciidoc.adoc").read()
+    expected_output = open(f"{getcwd()}/core/tests/content/asciidoc.html").read()
+    with patch("core.asciidoc._asciidoctor_pool", (None, None)):
+        assert convert_adoc_to_html(content) == expected_output
@@ -0,0 +1,332 @@
+"""Micro-benchmarks for request path hot spots.
+
+These are skipped by default, run them with `pytest -m benchmark -s`.
+
+The docs rendering benchmarks run the views on pages from the corpus in
+core/tests/content, with S3 stubbed so they run offline, and print the per stage
+timings the views record. To catch regressions, save the timings of a known good
+build with DOCS_BENCHMARK_SAVE=<file> and compare later runs against it with
+DOCS_BENCHMARK_BASELINE=<file>; a stage slower than the baseline by more than
+DOCS_BENCHMARK_TOLERANCE (default 1.5x) fails.
+"""
+
+import json
+import os
+import re
+import time
+import timeit
+from collections import defaultdict
+from unittest.mock import patch
+
+import pytest
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from core.boostrenderer import get_s3_keys
+from core.htmlhelper import (
+    REMOVE_ALL,
+    REMOVE_CSS_CLASSES,
+    REMOVE_TAGS,
+    ConvertNameToId,
+    HtmlRewriter,
+    RemoveAllTags,
+    RemoveCssClasses,
+    RemoveEmbeddedBoostlook,
+    RemoveFirstTags,
+    RemoveLibraryBoostlook,
+)
+from core.views import (
+    DocLibsTemplateView,
+    ModernizedDocsView,
+    StaticContentTemplateView,
+    UserGuideTemplateView,
+)
+
+pytestmark = pytest.mark.benchmark
+
+SAMPLE_CONTENT_PATHS = [
+    "/doc/user-guide/index.html",
+    "/doc/contributor-guide/index.html",
+    "/doc/libs/1_84_0/libs/algorithm/doc/html/index.html",
+    "/archives/boost_1_84_0/libs/json/doc/html/index.html",
+    "/help/",
+    "/page/community",
+    "/some/unmapped/path.html",
+]
+
+
+def legacy_get_s3_keys(content_path):
+    """get_s3_keys as it was before the mapping was compiled into a trie, reading
+    and scanning the mapping file on every call."""
+    config_file_path = os.path.join(settings.BASE_DIR, settings.STATIC_CONTENT_MAPPING)
+    if not content_path.startswith("/"):
+        content_path = f"/{content_path}"
+    with open(config_file_path, "r") as f:
+        config_data = json.load(f)
+    s3_keys = []
+    for item in config_data:
+        site_path = item["site_path"]
+        s3_path = item["s3_path"]
+        if site_path == "/" and content_path.startswith(site_path):
+            if s3_path in content_path:
+                s3_keys.append(content_path)
+            else:
+                s3_keys.append(os.path.join(s3_path, content_path.lstrip("/")))
+        elif content_path.startswith(site_path):
+            s3_keys.append(content_path.replace(site_path, s3_path))
+    return s3_keys
+
+
+def test_get_s3_keys_benchmark():
+    for path in SAMPLE_CONTENT_PATHS:
+        assert get_s3_keys(path) == legacy_get_s3_keys(path)
+
+    number = 2000
+    legacy = timeit.timeit(
+        lambda: [legacy_get_s3_keys(p) for p in SAMPLE_CONTENT_PATHS], number=number
+    )
+    current = timeit.timeit(
+        lambda: [get_s3_keys(p) for p in SAMPLE_CONTENT_PATHS], number=number
+    )
+    print(f"get_s3_keys: legacy={legacy:.4f}s current={current:.4f}s")
+    assert current < legacy
+
+
+def legacy_rewrite(soup):
+    """remove_unwanted() and modernize_legacy_page()'s transforms as they were,
+    with one find() or find_all() per transform."""
+    for tag_name, tag_attrs in REMOVE_TAGS:
+        tag = soup.find(tag_name, tag_attrs)
+        if tag:
+            tag.decompose()
+    for tag_name, tag_attrs in REMOVE_ALL:
+        for tag in soup.find_all(tag_name, tag_attrs):
+            tag.decompose()
+    for tag_name, tag_attrs in REMOVE_CSS_CLASSES:
+        for tag in soup.find_all(tag_name, tag_attrs):
+            tag.attrs.pop("class")
+    for tag in soup.find_all(attrs={"name": True}):
+        tag["id"] = tag["name"]
+        del tag["name"]
+    for tag in soup.find_all("link"):
+        if (
+            tag.get("href").endswith("boostlook.css")
+            and tag.get("href") != "/static/css/boostlook.css"
+        ):
+            tag.decompose()
+    for style in soup.find_all("style", string=re.compile(r"\.boostlook")):
+        style.decompose()
+    return soup
+
+
+def rewrite(soup):
+    soup = HtmlRewriter(
+        RemoveFirstTags(REMOVE_TAGS), RemoveAllTags(REMOVE_ALL)
+    ).rewrite(soup)
+    return HtmlRewriter(
+        RemoveCssClasses(REMOVE_CSS_CLASSES),
+        ConvertNameToId(),
+        RemoveLibraryBoostlook(),
+        RemoveEmbeddedBoostlook(),
+    ).rewrite(soup)
+
+
+@pytest.mark.parametrize("filename", ["leaf.html", "accumulators.html"])
+def test_html_rewriter_benchmark(filename):
+    path = os.path.join(settings.BASE_DIR, "core/tests/content", filename)
+    with open(path) as f:
+        html = f.read()
+
+    assert str(rewrite(BeautifulSoup(html, "html.parser"))) == str(
+        legacy_rewrite(BeautifulSoup(html, "html.parser"))
+    )
+
+    # parse up front, and time only the transforms
+    number = 5
+    soups = [BeautifulSoup(html, "html.parser") for _ in range(number * 2)]
+    legacy = timeit.timeit(lambda: legacy_rewrite(soups.pop()), number=number)
+    current = timeit.timeit(lambda: rewrite(soups.pop()), number=number)
+    print(f"{filename} rewrite: legacy={legacy:.4f}s current={current:.4f}s")
+    assert current < legacy
+
+
+ROUNDS = 5
+
+# Real Boost pages, from a large generated reference page to a short one
+CORPUS = [
+    "leaf.html",
+    "accumulators.html",
+    "boost_release_notes_sample.html",
+]
+
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "static_content": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+BASELINE_PATH = os.environ.get("DOCS_BENCHMARK_BASELINE")
+SAVE_PATH = os.environ.get("DOCS_BENCHMARK_SAVE")
+TOLERANCE = float(os.environ.get("DOCS_BENCHMARK_TOLERANCE", "1.5"))
+
+# benchmark name -> stage -> mean seconds, for DOCS_BENCHMARK_SAVE
+results = {}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_results():
+    yield results
+    if SAVE_PATH and results:
+        with open(SAVE_PATH, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+def read_corpus_page(filename):
+    path = os.path.join(settings.BASE_DIR, "core/tests/content", filename)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def make_view(view_class, path, content_dict=None):
+    """Return a view set up to handle a GET of path, as dispatch() would."""
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(path)
+    view = view_class()
+    view.setup(request, **request.resolver_match.kwargs)
+    view.content_dict = content_dict or {}
+    return view
+
+
+def s3_result(content, content_key, content_type="text/html"):
+    """Return content the way get_content_from_s3() would."""
+    return {
+        "content": content,
+        "content_key": content_key,
+        "content_type": content_type,
+        "charset": "utf-8",
+        "last_modified": None,
+    }
+
+
+def time_view(name, new_view, call, rounds=ROUNDS):
+    """Call call(view) on rounds views from new_view(), then report the mean time
+    of each stage the views recorded in their RequestTimings, and of the call."""
+    totals = defaultdict(float)
+    for _ in range(rounds):
+        view = new_view()
+        start = time.perf_counter()
+        call(view)
+        totals["total"] += time.perf_counter() - start
+        if timings := getattr(view, "timings", None):
+            for stage, seconds in timings.stages.items():
+                totals[stage] += seconds
+    report(name, {stage: total / rounds for stage, total in totals.items()})
+
+
+def report(name, means):
+    """Print the stage means, and compare them with DOCS_BENCHMARK_BASELINE."""
+    results[name] = means
+    stages = " ".join(
+        f"{stage}={seconds * 1000:.2f}ms" for stage, seconds in means.items()
+    )
+    print(f"\n{name}: {stages}")
+
+    if not BASELINE_PATH:
+        return
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f).get(name, {})
+    slower = {
+        stage: f"{seconds * 1000:.2f}ms vs {baseline[stage] * 1000:.2f}ms"
+        for stage, seconds in means.items()
+        if stage in baseline and seconds > baseline[stage] * TOLERANCE
+    }
+    assert not slower, f"{name} is slower than the baseline: {slower}"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("filename", CORPUS)
+def test_doc_libs_process_content_benchmark(filename, version):
+    """DocLibsTemplateView.process_content() without the processed content cache,
+    i.e. build_processed_content()."""
+    content = read_corpus_page(filename)
+    path = f"/doc/libs/1_79_0/libs/foo/doc/html/{filename}"
+
+    def process(view):
+        assert view.process_content(content)
+
+    # the version alert looks up the latest docs path in S3
+    with patch("libraries.mixins.determine_latest_url", return_value="/latest/"):
+        time_view(
+            f"doc_libs_process_content[{filename}]",
+            lambda: make_view(
+                DocLibsTemplateView,
+                path,
+                content_dict={"content": content, "content_type": "text/html"},
+            ),
+            process,
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("filename", CORPUS)
+def test_user_guide_process_content_benchmark(filename, version):
+    content = read_corpus_page(filename)
+
+    def process(view):
+        assert view.process_content(content)
+
+    time_view(
+        f"user_guide_process_content[{filename}]",
+        lambda: make_view(
+            UserGuideTemplateView,
+            f"/doc/user-guide/{filename}",
+            content_dict={"content": content, "content_type": "text/html"},
+        ),
+        process,
+    )
+
+
+@pytest.mark.parametrize("filename", CORPUS)
+def test_static_content_process_content_benchmark(filename):
+    """StaticContentTemplateView.process_content(), i.e. convert_img_paths()."""
+    content = read_corpus_page(filename)
+    content_dict = s3_result(content, f"/site-pages/develop/{filename}")
+    time_view(
+        f"static_content_process_content[{filename}]",
+        lambda: make_view(StaticContentTemplateView, f"/{filename}", content_dict),
+        lambda view: view.process_content(content),
+    )
+
+
+@pytest.mark.parametrize("filename", ["preprocessor_index.html", *CORPUS])
+def test_modernized_docs_get_benchmark(filename):
+    content = read_corpus_page(filename)
+    content_path = f"1_90_0/libs/preprocessor/doc/{filename}"
+
+    def get(view):
+        response = view.get(view.request, content_path)
+        assert response.status_code == 200
+
+    def new_view():
+        caches["static_content"].clear()
+        return make_view(
+            ModernizedDocsView, f"/internal/modernized-docs/{content_path}"
+        )
+
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value=s3_result(content, f"/archives/boost_{content_path}"),
+    ), override_settings(CACHES=TEST_CACHES):
+        time_view(f"modernized_docs_get[{filename}]", new_view, get)
+        # the HTMX swaps of the same page are served from the cache
+        time_view(
+            f"modernized_docs_get_cached[{filename}]",
+            lambda: make_view(
+                ModernizedDocsView, f"/internal/modernized-docs/{content_path}"
+            ),
+            get,
+        )
@@ -0,0 +1,237 @@
+import os
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from core.caching import (
+    DiskLRUCache,
+    claim_revalidation,
+    clear_all_missing_s3_keys,
+    clear_missing_s3_keys,
+    get_missing_s3_keys,
+    set_missing_s3_key,
+    clear_processed_content,
+    get_processed_content,
+    get_processed_content_variant,
+    get_single_flight,
+    get_with_soft_expiry,
+    set_processed_content,
+    set_with_soft_expiry,
+)
+
+TEST_CACHES = {
+    "static_content": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "processed-content-snowflake",
+    },
+}
+
+
+def test_get_processed_content_variant():
+    variant = get_processed_content_variant(
+        "med", "no_wrapper", "boost-1-90-0", "https://www.boost.org/doc/libs/x"
+    )
+    other = get_processed_content_variant(
+        "min", "no_wrapper", "boost-1-90-0", "https://www.boost.org/doc/libs/x"
+    )
+    assert variant != other
+    assert ":med:no_wrapper:boost-1-90-0:" in variant
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_set_and_clear_processed_content():
+    caches["static_content"].clear()
+    set_processed_content("static_content_a", "v1", {"html": "one"})
+    set_processed_content("static_content_a", "v2", {"html": "two"})
+
+    assert get_processed_content("static_content_a", "v1") == {"html": "one"}
+    assert get_processed_content("static_content_a", "v2") == {"html": "two"}
+    assert get_processed_content("static_content_b", "v1") is None
+
+    clear_processed_content("static_content_a")
+    assert get_processed_content("static_content_a", "v1") is None
+    assert get_processed_content("static_content_a", "v2") is None
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_clear_processed_content_drops_earlier_variants():
+    caches["static_content"].clear()
+    set_processed_content("static_content_a", "v1", {"html": "one"})
+    # the source changed, earlier variants are dropped
+    clear_processed_content("static_content_a")
+    set_processed_content("static_content_a", "v2", {"html": "two"})
+    set_processed_content("static_content_a", "v3", {"html": "three"})
+
+    assert get_processed_content("static_content_a", "v1") is None
+    assert get_processed_content("static_content_a", "v2") == {"html": "two"}
+    assert get_processed_content("static_content_a", "v3") == {"html": "three"}
+
+
+def test_disk_lru_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size=25, max_item_size=10)
+    for key in ("a", "b"):
+        writer = cache.writer(key, {"etag": key})
+        writer.write(b"x" * 10)
+        writer.commit()
+    # make "a" older than "b", then touch it so "b" is the least recently used
+    os.utime(cache._path("a"), (0, 0))
+    os.utime(cache._path("b"), (1, 1))
+    cache.get("a")[0].close()
+
+    writer = cache.writer("c", {"etag": "c"})
+    writer.write(b"x" * 10)
+    writer.commit()
+
+    assert cache.get("b") is None
+    f, metadata, is_stale = cache.get("a")
+    f.close()
+    assert metadata["etag"] == "a"
+    assert metadata["size"] == 10
+    assert not is_stale
+    assert cache.get("c") is not None
+
+
+def test_disk_lru_cache_get_survives_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size=100, max_item_size=10)
+    writer = cache.writer("a", {})
+    writer.write(b"abc")
+    writer.commit()
+
+    f, metadata, is_stale = cache.get("a")
+    cache.delete("a")
+    with f:
+        assert f.read() == b"abc"
+    assert cache.get("a") is None
+
+
+def test_disk_lru_cache_max_age(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size=100, max_item_size=10, max_age=60)
+    with patch("core.caching.time.time", return_value=1000):
+        writer = cache.writer("a", {"etag": "a"})
+        writer.write(b"abc")
+        writer.commit()
+    with patch("core.caching.time.time", return_value=1060):
+        f, metadata, is_stale = cache.get("a")
+        f.close()
+        assert is_stale
+        cache.touch("a", metadata)
+        f, metadata, is_stale = cache.get("a")
+        f.close()
+        assert not is_stale
+    assert metadata["etag"] == "a"
+
+
+def test_disk_lru_cache_skips_large_items(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size=100, max_item_size=10)
+    writer = cache.writer("a", {})
+    writer.write(b"x" * 11)
+    writer.commit()
+    assert cache.get("a") is None
+    assert os.listdir(tmp_path) == []
+
+
+@override_settings(CACHES=TEST_CACHES, MISSING_S3_KEY_CACHE_TIMEOUT=60)
+def test_missing_s3_keys():
+    caches["static_content"].clear()
+    set_missing_s3_key("bucket", "/archives/missing.html")
+
+    assert get_missing_s3_keys(
+        "bucket", ["archives/missing.html", "/archives/found.html"]
+    ) == {"archives/missing.html"}
+    assert get_missing_s3_keys("other-bucket", ["archives/missing.html"]) == set()
+
+    clear_missing_s3_keys("bucket", ["archives/missing.html"])
+    assert get_missing_s3_keys("bucket", ["archives/missing.html"]) == set()
+
+
+@override_settings(CACHES=TEST_CACHES, MISSING_S3_KEY_CACHE_TIMEOUT=60)
+def test_clear_all_missing_s3_keys():
+    caches["static_content"].clear()
+    with patch("core.caching.time.time", return_value=100):
+        set_missing_s3_key("bucket", "archives/missing.html")
+    with patch("core.caching.time.time", return_value=200):
+        clear_all_missing_s3_keys()
+    assert get_missing_s3_keys("bucket", ["archives/missing.html"]) == set()
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_get_single_flight_leader_fetches():
+    cache = caches["static_content"]
+    cache.clear()
+
+    def fetch():
+        # the lock is held while the leader fetches
+        assert cache.get("single_flight_lock_key") == 1
+        cache.set("key", "fetched")
+        return "fetched"
+
+    assert get_single_flight(cache, "key", fetch, lambda: cache.get("key")) == (
+        "fetched"
+    )
+    assert cache.get("single_flight_lock_key") is None
+
+
+@override_settings(
+    CACHES=TEST_CACHES, SINGLE_FLIGHT_POLL_INTERVAL=0, SINGLE_FLIGHT_WAIT_TIMEOUT=5
+)
+def test_get_single_flight_follower_waits_for_leader():
+    cache = caches["static_content"]
+    cache.clear()
+    cache.add("single_flight_lock_key", 1)
+    polls = []
+
+    def get_cached():
+        polls.append(1)
+        if len(polls) == 3:
+            # the leader finishes and caches its result
+            cache.set("key", "leader result")
+        return cache.get("key")
+
+    def fetch():
+        raise AssertionError("the follower should not fetch")
+
+    assert get_single_flight(cache, "key", fetch, get_cached) == "leader result"
+
+
+@override_settings(
+    CACHES=TEST_CACHES, SINGLE_FLIGHT_POLL_INTERVAL=0, SINGLE_FLIGHT_WAIT_TIMEOUT=5
+)
+def test_get_single_flight_follower_fetches_when_leader_has_no_result():
+    cache = caches["static_content"]
+    cache.clear()
+    cache.add("single_flight_lock_key", 1)
+
+    def get_cached():
+        # the leader finished without a result
+        cache.delete("single_flight_lock_key")
+        return None
+
+    assert get_single_flight(cache, "key", lambda: "fetched", get_cached) == "fetched"
+
+
+@override_settings(
+    CACHES=TEST_CACHES, STATIC_CONTENT_SOFT_TIMEOUT=60, STATIC_CONTENT_HARD_TIMEOUT=600
+)
+def test_get_with_soft_expiry():
+    cache = caches["static_content"]
+    cache.clear()
+    with patch("core.caching.time.time", return_value=1000):
+        set_with_soft_expiry(cache, "key", {"content": "a"})
+        assert get_with_soft_expiry(cache, "key") == ({"content": "a"}, False)
+    with patch("core.caching.time.time", return_value=1060):
+        assert get_with_soft_expiry(cache, "key") == ({"content": "a"}, True)
+
+    # values set directly are never stale
+    cache.set("raw", {"content": "b"})
+    assert get_with_soft_expiry(cache, "raw") == ({"content": "b"}, False)
+    assert get_with_soft_expiry(cache, "missing") == (None, False)
+
+
+@override_settings(CACHES=TEST_CACHES, STATIC_CONTENT_REVALIDATE_TIMEOUT=60)
+def test_claim_revalidation_once():
+    cache = caches["static_content"]
+    cache.clear()
+    assert claim_revalidation(cache, "key")
+    assert not claim_revalidation(cache, "key")
+    assert claim_revalidation(cache, "other")
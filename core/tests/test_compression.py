@@ -0,0 +1,85 @@
+import gzip
+
+import brotli
+import pytest
+
+from core.compression import (
+    ZSTD_MAGIC,
+    ZstdCompressor,
+    accepts_encoding,
+    choose_encoding,
+    get_encoded_etag,
+    get_etag,
+    get_precompressed,
+    zstd_compress,
+    zstd_decompress,
+)
+
+
+def test_zstd_round_trip():
+    data = b"<p>Boost</p>" * 100
+    compressed = zstd_compress(data)
+    assert compressed.startswith(ZSTD_MAGIC)
+    assert len(compressed) < len(data)
+    assert zstd_decompress(compressed) == data
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", False),
+        ("gzip, deflate, br", False),
+        ("gzip, deflate, br, zstd", True),
+        ("ZSTD", True),
+        ("zstd;q=0.5, gzip", True),
+        ("zstd;q=0, gzip", False),
+        ("zstd;q=bad", False),
+    ],
+)
+def test_accepts_encoding(rf, header, expected):
+    request = rf.get("/", HTTP_ACCEPT_ENCODING=header)
+    assert accepts_encoding(request, "zstd") is expected
+
+
+def test_zstd_compressor():
+    compressor = ZstdCompressor({})
+    small = b"x" * 10
+    large = b"x" * 2048
+
+    assert compressor.compress(small) == small
+    assert compressor.compress(large).startswith(ZSTD_MAGIC)
+    assert compressor.decompress(compressor.compress(large)) == large
+    # values cached before compression was enabled are read as they are
+    assert compressor.decompress(large) == large
+
+
+def test_get_precompressed():
+    body = b"<p>Boost</p>" * 100
+    precompressed = get_precompressed(body)
+    assert brotli.decompress(precompressed["br"]) == body
+    assert gzip.decompress(precompressed["gzip"]) == body
+    # the output is stable, so cached copies match
+    assert get_precompressed(body) == precompressed
+    assert get_precompressed(b"<p>Boost</p>") == {}
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br, zstd", "br"),
+        ("gzip, zstd", "zstd"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("deflate", None),
+    ],
+)
+def test_choose_encoding(rf, header, expected):
+    request = rf.get("/", HTTP_ACCEPT_ENCODING=header)
+    assert choose_encoding(request, {"br": b"", "zstd": b"", "gzip": b""}) == expected
+
+
+def test_get_encoded_etag():
+    etag = get_etag(b"<p>Boost</p>")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert get_encoded_etag(etag, None) == etag
+    assert get_encoded_etag(etag, "br") == etag[:-1] + '-br"'
@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test import override_settings
+from model_bakery import baker
+
+from core.docs_path_index import (
+    SortedKeyIndex,
+    build_docs_path_index,
+    get_docs_path_index,
+)
+from core.models import DocsPathIndex
+
+
+@pytest.fixture(autouse=True)
+def clear_docs_path_indexes():
+    with patch("core.docs_path_index._docs_path_indexes", {}):
+        yield
+
+
+def test_docs_path_index_keys_round_trip():
+    index = DocsPathIndex(version_slug="1_90_0")
+    index.set_keys(
+        ["libs/json/index.html", "doc/html/index.html", "doc/html/index.html"]
+    )
+    assert index.key_count == 2
+    assert index.get_keys() == ["doc/html/index.html", "libs/json/index.html"]
+
+
+def test_docs_path_index_empty_keys():
+    index = DocsPathIndex(version_slug="1_90_0")
+    index.set_keys([])
+    assert index.get_keys() == []
+
+
+def test_sorted_key_index():
+    index = SortedKeyIndex(["doc/html/index.html", "libs/json/index.html"])
+    assert "libs/json/index.html" in index
+    assert "libs/json" not in index
+    assert "libs/zzz.html" not in index
+    assert len(index) == 2
+
+
+@pytest.mark.django_db
+def test_build_docs_path_index():
+    mock_client = MagicMock()
+    mock_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "archives/boost_1_90_0/libs/json/index.html"}]},
+        {"Contents": [{"Key": "archives/boost_1_90_0/doc/html/index.html"}]},
+        {},
+    ]
+    with patch("core.docs_path_index.get_s3_client", return_value=mock_client):
+        build_docs_path_index("1_90_0")
+
+    mock_client.get_paginator.assert_called_once_with("list_objects_v2")
+    assert (
+        mock_client.get_paginator.return_value.paginate.call_args.kwargs["Prefix"]
+        == "archives/boost_1_90_0/"
+    )
+    index = DocsPathIndex.objects.get(version_slug="1_90_0")
+    assert index.key_count == 2
+    assert index.get_keys() == ["doc/html/index.html", "libs/json/index.html"]
+
+
+@pytest.mark.django_db
+def test_get_docs_path_index_missing():
+    assert get_docs_path_index("1_90_0") is None
+
+
+@pytest.mark.django_db
+@override_settings(DOCS_PATH_INDEX_CHECK_INTERVAL=0)
+def test_get_docs_path_index_reloads_when_rebuilt():
+    stored = baker.prepare("core.DocsPathIndex", version_slug="1_90_0")
+    stored.set_keys(["libs/json/index.html"])
+    stored.save()
+
+    index = get_docs_path_index("1_90_0")
+    assert "libs/json/index.html" in index
+    # unchanged indexes are reused
+    assert get_docs_path_index("1_90_0") is index
+
+    stored.set_keys(["libs/url/index.html"])
+    stored.save()
+    index = get_docs_path_index("1_90_0")
+    assert "libs/url/index.html" in index
+    assert "libs/json/index.html" not in index
+
+
+@pytest.mark.django_db
+def test_get_docs_path_index_checks_interval():
+    assert get_docs_path_index("1_90_0") is None
+    baker.make("core.DocsPathIndex", version_slug="1_90_0", keys=b"")
+    # still within the check interval, so the new index isn't seen yet
+    assert get_docs_path_index("1_90_0") is None
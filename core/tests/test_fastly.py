@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import override_settings
+
+from core.fastly import (
+    add_surrogate_keys,
+    get_content_surrogate_key,
+    get_content_surrogate_keys,
+    purge_surrogate_keys,
+)
+
+FASTLY_SETTINGS = {
+    "FASTLY_API_TOKEN": "token",
+    "FASTLY_SERVICE": "service1",
+    "FASTLY_SERVICE2": "empty",
+}
+
+
+def test_get_content_surrogate_keys_docs():
+    content_path = "1_84_0/libs/array/doc/html/index.html"
+    assert get_content_surrogate_keys(content_path) == [
+        get_content_surrogate_key(content_path),
+        "path-1_84_0",
+        "version-boost-1-84-0",
+        "library-array",
+    ]
+
+
+def test_get_content_surrogate_keys_static_content():
+    assert get_content_surrogate_keys("/develop/libs/rst.css") == [
+        get_content_surrogate_key("develop/libs/rst.css"),
+        "path-develop",
+        "version-develop",
+    ]
+    assert get_content_surrogate_keys("help/index.html") == [
+        get_content_surrogate_key("help/index.html"),
+        "path-help",
+    ]
+
+
+def test_get_content_surrogate_key_is_short():
+    key = get_content_surrogate_key("1_84_0/" + "a/" * 1000 + "index.html")
+    assert key.startswith("content-")
+    assert len(key) < 32
+
+
+def test_add_surrogate_keys():
+    response = HttpResponse()
+    add_surrogate_keys(response, ["a", "b"])
+    add_surrogate_keys(response, ["b", "c", "c"])
+    assert response["Surrogate-Key"] == "a b c"
+
+
+@override_settings(**FASTLY_SETTINGS)
+def test_purge_surrogate_keys():
+    keys = [f"key-{i}" for i in range(300)]
+    with patch("core.fastly.FASTLY_PURGE_BATCH_SIZE", 256), patch(
+        "core.fastly.requests.post"
+    ) as mock_post:
+        purge_surrogate_keys(keys)
+
+    assert mock_post.call_count == 2
+    url = mock_post.call_args_list[0].args[0]
+    assert url == "https://api.fastly.com/service/service1/purge"
+    headers = mock_post.call_args_list[0].kwargs["headers"]
+    assert headers["Surrogate-Key"].split() == keys[:256]
+    assert headers["Fastly-Soft-Purge"] == "1"
+
+
+@override_settings(FASTLY_API_TOKEN="empty")
+def test_purge_surrogate_keys_without_token():
+    with patch("core.fastly.requests.post") as mock_post:
+        purge_surrogate_keys(["version-develop"])
+    mock_post.assert_not_called()
@@ -6,6 +6,12 @@ from core.htmlhelper import (
     REMOVE_ALL,
     REMOVE_CSS_CLASSES,
     REMOVE_TAGS,
+    ConvertNameToId,
+    HtmlRewriter,
+    RemoveAllTags,
+    RemoveEmbeddedBoostlook,
+    RemoveFirstTags,
+    RemoveLibraryBoostlook,
     convert_h1_to_h2,
     get_library_documentation_urls,
     modernize_legacy_page,
@@ -330,6 +336,71 @@ def test_modernize_legacy_page_remove_only_css_class(tag_name, tag_attrs):
     assertHTMLEqual(result, expected)
 
 
+def test_remove_first_tags_skips_tags_inside_removed_tags():
+    # The td is the first match for its spec, but is removed with the table by the
+    # earlier spec, so the next td is removed instead, as if run one by one
+    html = """
+    <table width="100%"><tr><td width="300">Header</td></tr></table>
+    <p>Text</p>
+    <table><tr><td width="300">Side</td><td width="300">Other</td></tr></table>
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    result = HtmlRewriter(
+        RemoveFirstTags([("table", {"width": "100%"}), ("td", {"width": "300"})])
+    ).rewrite(soup)
+    assertHTMLEqual(
+        str(result),
+        '<p>Text</p><table><tr><td width="300">Other</td></tr></table>',
+    )
+
+
+def test_remove_first_tags_equal_tags():
+    soup = BeautifulSoup("<hr><p>Text</p><hr>", "html.parser")
+    result = HtmlRewriter(RemoveFirstTags([("hr", {})])).rewrite(soup)
+    assert str(result) == "<p>Text</p><hr/>"
+
+
+def test_remove_all_tags_nested():
+    html = '<div class="nav"><div class="nav">Inner</div></div><p>Text</p>'
+    soup = BeautifulSoup(html, "html.parser")
+    result = HtmlRewriter(RemoveAllTags([("div", {"class": "nav"})])).rewrite(soup)
+    assert str(result) == "<p>Text</p>"
+
+
+def test_html_rewriter_convert_name_to_id():
+    soup = BeautifulSoup(
+        '<a name="intro"></a><a href="#intro">Intro</a>', "html.parser"
+    )
+    result = HtmlRewriter(ConvertNameToId()).rewrite(soup)
+    assert str(result) == '<a id="intro"></a><a href="#intro">Intro</a>'
+
+
+def test_html_rewriter_remove_boostlook():
+    html = """
+    <head>
+      <link rel="stylesheet" href="../../boostlook.css">
+      <link rel="stylesheet" href="/static/css/boostlook.css">
+      <link rel="icon">
+      <style>.boostlook { color: red; }</style>
+      <style>p { color: red; }</style>
+    </head>
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    result = HtmlRewriter(RemoveLibraryBoostlook(), RemoveEmbeddedBoostlook()).rewrite(
+        soup
+    )
+    assertHTMLEqual(
+        str(result),
+        """
+        <head>
+          <link rel="stylesheet" href="/static/css/boostlook.css">
+          <link rel="icon">
+          <style>p { color: red; }</style>
+        </head>
+        """,
+    )
+
+
 def test_get_library_documentation_urls():
     # HTML string for testing
     test_content = """
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+
+from core.metrics import STATIC_CONTENT_REQUESTS, RequestTimings
+from core.views import StaticContentTemplateView
+
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "static_content": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+def test_request_timings_stages_add_up():
+    timings = RequestTimings()
+    with patch("core.metrics.time.perf_counter", side_effect=[1.0, 1.5, 2.0, 2.25]):
+        with timings.stage("s3"):
+            pass
+        with timings.stage("s3"):
+            pass
+    assert timings.stages == {"s3": 0.75}
+
+
+def test_request_timings_server_timing():
+    timings = RequestTimings()
+    timings.stages = {"cache": 0.0012, "parse": 0.25}
+    timings.cache_tier = "database"
+
+    header = timings.get_server_timing()
+
+    assert header.startswith('cache;dur=1.2, parse;dur=250.0, tier;desc="database"')
+    assert ", total;dur=" in header
+
+
+def test_request_timings_log_fields():
+    timings = RequestTimings()
+    timings.stages = {"s3": 0.1234}
+    timings.cache_tier = "s3"
+
+    fields = timings.get_log_fields()
+
+    assert fields["s3_ms"] == 123.4
+    assert fields["cache_tier"] == "s3"
+    assert "total_ms" in fields
+
+
+def test_request_timings_observe():
+    counter = STATIC_CONTENT_REQUESTS.labels(view="TestView", cache_tier="cache")
+    before = counter._value.get()
+    timings = RequestTimings()
+    timings.cache_tier = "cache"
+    timings.observe("TestView")
+    assert counter._value.get() == before + 1
+
+
+@override_settings(CACHES=TEST_CACHES, SERVER_TIMING_HEADER=True)
+def test_static_content_server_timing(rf):
+    request = rf.get("/develop/libs/rst.css")
+    request.user = AnonymousUser()
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={"content": b"fake content", "content_type": "text/plain"},
+    ):
+        response = StaticContentTemplateView.as_view()(
+            request, content_path="/develop/libs/rst.css"
+        )
+    assert response.status_code == 200
+    assert "s3;dur=" in response["Server-Timing"]
+    assert 'tier;desc="s3"' in response["Server-Timing"]
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_server_timing_disabled(rf):
+    request = rf.get("/develop/libs/rst.css")
+    request.user = AnonymousUser()
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={"content": b"fake content", "content_type": "text/plain"},
+    ):
+        response = StaticContentTemplateView.as_view()(
+            request, content_path="/develop/libs/rst.css"
+        )
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
+
+
+def test_metrics_anonymous_user(tp):
+    res = tp.get("metrics")
+    tp.response_403(res)
+
+
+def test_metrics_staff_user(tp, staff_user):
+    tp.login(staff_user)
+    res = tp.get("metrics")
+    tp.response_200(res)
+    assert b"static_content_requests_total" in res.content
+
+
+@override_settings(METRICS_TOKEN="secret")
+def test_metrics_token(tp):
+    res = tp.get("metrics", extra={"HTTP_AUTHORIZATION": "Bearer secret"})
+    tp.response_200(res)
+
+    res = tp.get("metrics", extra={"HTTP_AUTHORIZATION": "Bearer wrong"})
+    tp.response_403(res)
@@ -1,5 +1,12 @@
+import pytest
+from django.db.models import BinaryField
+from django.db.models.functions import Cast
+from django.test import override_settings
 from model_bakery import baker
 
+from core.compression import ZSTD_MAGIC
+from core.models import RenderedContent
+
 
 def test_rendered_content_creation(rendered_content):
     assert rendered_content.cache_key is not None
@@ -17,3 +24,77 @@ def test_rendered_content_save():
     assert isinstance(content.content_original, str)
     assert isinstance(content.content_html, str)
     assert isinstance(content.content_type, str)
+
+
+def test_rendered_content_latest_path_undetermined():
+    content = baker.make(
+        "core.RenderedContent", cache_key="static_content_1_84_0/doc/html/index.html"
+    )
+    assert content.latest_path is None
+
+
+def get_stored(pk, field):
+    """Return the bytes stored in a RenderedContent content column."""
+    return bytes(
+        RenderedContent.objects.annotate(stored=Cast(field, BinaryField()))
+        .values_list("stored", flat=True)
+        .get(pk=pk)
+    )
+
+
+@pytest.mark.django_db
+@override_settings(RENDERED_CONTENT_COMPRESSION="zstd")
+def test_rendered_content_save_compressed():
+    content = baker.make(
+        "core.RenderedContent",
+        content_original="# Sample",
+        content_html="<p>Sample HTML content</p>",
+        content_type="text/html",
+    )
+    assert content.content_html == "<p>Sample HTML content</p>"
+    assert get_stored(content.pk, "content_html").startswith(ZSTD_MAGIC)
+
+    content = RenderedContent.objects.get(pk=content.pk)
+    assert content.content_original == "# Sample"
+    assert content.content_html == "<p>Sample HTML content</p>"
+    assert content.content_transformed is None
+
+
+@pytest.mark.django_db
+@override_settings(RENDERED_CONTENT_COMPRESSION="zstd")
+def test_rendered_content_compressed_values():
+    """Every ORM path reads and writes the content as text."""
+    content = baker.make("core.RenderedContent", content_html="<p>old</p>")
+    queryset = RenderedContent.objects.filter(pk=content.pk)
+
+    assert queryset.values("content_html").get() == {"content_html": "<p>old</p>"}
+    assert list(queryset.values_list("content_html", flat=True)) == ["<p>old</p>"]
+    assert queryset.only("content_html").get().content_html == "<p>old</p>"
+    assert queryset.defer("content_html").get().content_html == "<p>old</p>"
+
+    queryset.update(content_html="<p>updated</p>")
+    assert queryset.values_list("content_html", flat=True).get() == "<p>updated</p>"
+    assert get_stored(content.pk, "content_html").startswith(ZSTD_MAGIC)
+
+    RenderedContent.objects.update_or_create(
+        cache_key=content.cache_key, defaults={"content_html": "<p>new</p>"}
+    )
+    assert queryset.get().content_html == "<p>new</p>"
+
+
+@pytest.mark.django_db
+def test_rendered_content_save_uncompressed():
+    with override_settings(RENDERED_CONTENT_COMPRESSION="zstd"):
+        content = baker.make(
+            "core.RenderedContent", content_original="# old", content_html="<p>old</p>"
+        )
+    with override_settings(RENDERED_CONTENT_COMPRESSION=""):
+        content.content_html = "<p>new</p>"
+        content.save(update_fields=["content_html"])
+
+    # each value is read by how it was stored, not by a setting for the row
+    assert get_stored(content.pk, "content_html") == b"<p>new</p>"
+    row = RenderedContent.objects.values("content_original", "content_html").get(
+        pk=content.pk
+    )
+    assert row == {"content_original": "# old", "content_html": "<p>new</p>"}
@@ -1,20 +1,39 @@
+import json
+import os
+
+from botocore.exceptions import ClientError
 from bs4 import BeautifulSoup
-from unittest.mock import Mock, patch
+from django.core.cache import caches
+from django.test import override_settings
+from unittest.mock import MagicMock, Mock, patch
 import datetime
 from io import BytesIO
 import pytest
 
+from .. import boostrenderer
 from ..boostrenderer import (
+    detect_charset,
     extract_file_data,
     get_body_from_html,
+    get_content_from_s3,
     get_content_type,
     get_file_data,
     get_s3_keys,
+    get_static_content_mapping,
+    StaticContentMapping,
     convert_img_paths,
     get_meta_redirect_from_html,
 )
 
 
+TEST_CACHES = {
+    "static_content": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "renderer-snowflake",
+    },
+}
+
+
 @pytest.fixture
 def mock_s3_client():
     return "mock_s3_client"
@@ -32,6 +51,7 @@ def test_extract_file_data():
         "content": b"file content",
         "content_key": s3_key,
         "content_type": "text/plain",
+        "charset": "utf-8",
         "last_modified": datetime.datetime(2023, 6, 8, 12, 0, 0),
     }
 
@@ -86,6 +106,37 @@ def test_extract_file_data_non_utf8_reencoded():
     assert b"\xc3\xa9" in result["content"]
     # Original Latin-1 byte should not be present
     assert result["content"] != latin1_content
+    assert result["charset"] == "utf-8"
+
+
+@pytest.mark.parametrize(
+    "content, content_type, expected",
+    [
+        (b"<p>plain</p>", "text/html", "utf-8"),
+        ("<p>caf\u00e9</p>".encode("utf-8"), "text/html", "utf-8"),
+        (b"<p>caf\xe9</p>", "text/html; charset=ISO-8859-1", "iso-8859-1"),
+        (b'<meta charset="windows-1252"><p>caf\xe9</p>', "text/html", "windows-1252"),
+        (
+            b'<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">'
+            b"<p>caf\xe9</p>",
+            "text/html",
+            "iso-8859-1",
+        ),
+    ],
+)
+def test_detect_charset(content, content_type, expected):
+    with patch("core.boostrenderer.chardet.detect") as mock_detect:
+        assert detect_charset(content, content_type) == expected
+    mock_detect.assert_not_called()
+
+
+def test_detect_charset_wrong_declaration_falls_back_to_chardet():
+    content = b"<p>caf\xe9</p>"
+    with patch(
+        "core.boostrenderer.chardet.detect", return_value={"encoding": "latin-1"}
+    ) as mock_detect:
+        assert detect_charset(content, "text/html; charset=bogus") == "latin-1"
+    mock_detect.assert_called_once_with(content)
 
 
 def test_get_body_from_html():
@@ -230,3 +281,71 @@ def test_convert_img_paths():
     expected_soup = BeautifulSoup(expected_html, "html.parser")
     result_soup = BeautifulSoup(result, "html.parser")
     assert result_soup == expected_soup
+
+
+def test_get_s3_client_is_shared():
+    with patch("core.boostrenderer.create_s3_client") as mock_create, patch(
+        "core.boostrenderer._s3_client", None
+    ):
+        mock_create.side_effect = lambda: MagicMock()
+        first = boostrenderer.get_s3_client()
+        second = boostrenderer.get_s3_client()
+        assert first is second
+        mock_create.assert_called_once()
+
+        # a forked worker gets its own client
+        with patch("core.boostrenderer.os.getpid", return_value=-1):
+            assert boostrenderer.get_s3_client() is not first
+        assert mock_create.call_count == 2
+
+
+def test_static_content_mapping_matches_in_file_order():
+    mapping = StaticContentMapping(
+        [
+            {"site_path": "/doc/libs/", "s3_path": "/archives/"},
+            {"site_path": "/", "s3_path": "/site/develop/"},
+            {"site_path": "/doc/", "s3_path": "/site-docs/develop/"},
+            {"site_path": "/help/", "s3_path": "/site-pages/help.adoc"},
+        ]
+    )
+    assert mapping.get_s3_keys("/doc/libs/index.html") == [
+        "/archives/index.html",
+        "/site/develop/doc/libs/index.html",
+        "/site-docs/develop/libs/index.html",
+    ]
+    assert mapping.get_s3_keys("/site/develop/rst.css") == ["/site/develop/rst.css"]
+    assert mapping.get_s3_keys("/help/") == [
+        "/site/develop/help/",
+        "/site-pages/help.adoc",
+    ]
+
+
+def test_get_static_content_mapping_reloads_on_mtime_change(tmp_path, settings):
+    settings.STATIC_CONTENT_MAPPING_CHECK_INTERVAL = 0
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps([{"site_path": "/a/", "s3_path": "/b/"}]))
+    mapping = get_static_content_mapping(str(config_file))
+    assert get_static_content_mapping(str(config_file)) is mapping
+    assert mapping.get_s3_keys("/a/x.html") == ["/b/x.html"]
+
+    config_file.write_text(json.dumps([{"site_path": "/a/", "s3_path": "/c/"}]))
+    os.utime(config_file, (0, os.path.getmtime(config_file) + 10))
+    reloaded = get_static_content_mapping(str(config_file))
+    assert reloaded is not mapping
+    assert reloaded.get_s3_keys("/a/x.html") == ["/c/x.html"]
+
+
+@override_settings(CACHES=TEST_CACHES, MISSING_S3_KEY_CACHE_TIMEOUT=60)
+def test_get_content_from_s3_skips_missing_keys():
+    caches["static_content"].clear()
+    client = Mock()
+    client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+    with patch("core.boostrenderer.get_s3_client", return_value=client):
+        assert get_content_from_s3("/doc/user-guide/missing.html") == {}
+        calls = client.get_object.call_count
+        assert calls > 0
+
+        assert get_content_from_s3("/doc/user-guide/missing.html") == {}
+        assert client.get_object.call_count == calls
@@ -1,14 +1,30 @@
+from unittest.mock import patch
+
+import pytest
+
 from model_bakery import baker
 
 from django.core.cache import caches
 from django.test import override_settings
 
-from core.models import RenderedContent
+from core.caching import get_processed_content, set_processed_content
+from core.constants import DOCS_TRANSFORM_VERSION
+from core.fastly import get_content_surrogate_key
+from core.htmlhelper import transform_docs_content
+from core.models import DocsPathIndex, LatestPathMatchIndicator, RenderedContent
 from core.tasks import (
     clear_rendered_content_cache_by_cache_key,
     clear_rendered_content_cache_by_content_type,
+    get_transformed_content_fields,
+    refresh_content_from_s3,
+    resolve_latest_docs_paths,
+    transform_rendered_content,
 )
 
+DOCS_HTML = """<html><head><link rel="canonical" href="/old"></head>
+<body><hr><p><a href="https://www.boost.org/doc/libs/1_84_0/">Docs</a></p></body>
+</html>"""
+
 
 TEST_CACHES = {
     "static_content": {
@@ -51,3 +67,172 @@ def test_clear_rendered_content_by_cache_key():
     clear_rendered_content_cache_by_cache_key(cache_key)
     assert not cache.get(cache_key)
     assert not RenderedContent.objects.filter(cache_key=cache_key).exists()
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_clear_rendered_content_by_cache_key_clears_processed_content():
+    obj = baker.make("core.RenderedContent", cache_key="clear")
+    set_processed_content(obj.cache_key, "variant", {"html": "processed"})
+    assert get_processed_content(obj.cache_key, "variant") == {"html": "processed"}
+
+    clear_rendered_content_cache_by_cache_key(obj.cache_key)
+    assert get_processed_content(obj.cache_key, "variant") is None
+
+
+@override_settings(LATEST_DOCS_PATH_RESOLVE_WORKERS=1)
+def test_resolve_latest_docs_paths(version):
+    index = DocsPathIndex(version_slug=version.stripped_boost_url_slug)
+    index.set_keys(["libs/algorithm/doc/html/index.html"])
+    index.save()
+    direct = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_84_0/libs/algorithm/doc/html/index.html",
+    )
+    fallback = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_78_0/libs/json/doc/html/missing.html",
+    )
+    determined = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_78_0/libs/json/index.html",
+        latest_path_matched_indicator=LatestPathMatchIndicator.CUSTOM_MATCH,
+        latest_docs_path="doc/libs/latest/libs/json/index.html",
+    )
+    other = baker.make("core.RenderedContent", cache_key="release_notes_1_84_0")
+
+    with patch("core.docs_path_index._docs_path_indexes", {}):
+        assert resolve_latest_docs_paths() == 2
+
+    direct.refresh_from_db()
+    assert direct.latest_path_matched_indicator == LatestPathMatchIndicator.DIRECT_MATCH
+    assert direct.latest_path_match_class == "DirectMatcher"
+    assert direct.latest_path == "doc/libs/latest/libs/algorithm/doc/html/index.html"
+
+    fallback.refresh_from_db()
+    assert (
+        fallback.latest_path_matched_indicator == LatestPathMatchIndicator.CUSTOM_MATCH
+    )
+    assert fallback.latest_path == "doc/libs/latest/libs/json/index.html"
+
+    determined.refresh_from_db()
+    assert determined.latest_path_match_class == ""
+    other.refresh_from_db()
+    assert other.latest_path is None
+
+
+def test_transform_docs_content():
+    html = transform_docs_content(DOCS_HTML)
+    assert "canonical" not in html
+    assert "<hr" not in html
+    assert 'href="/doc/libs/1_84_0/"' in html
+
+
+def test_get_transformed_content_fields():
+    fields = get_transformed_content_fields(
+        "static_content_1_84_0/libs/json/index.html", "text/html", DOCS_HTML
+    )
+    assert fields == {
+        "content_transformed": transform_docs_content(DOCS_HTML),
+        "transform_version": DOCS_TRANSFORM_VERSION,
+    }
+
+
+def test_get_transformed_content_fields_not_transformed():
+    for cache_key, content_type in [
+        ("static_content_1_84_0/libs/wave/index.html", "text/html"),
+        ("static_content_1_84_0/libs/json/index.adoc", "text/asciidoc"),
+    ]:
+        fields = get_transformed_content_fields(cache_key, content_type, DOCS_HTML)
+        assert fields == {
+            "content_transformed": None,
+            "transform_version": DOCS_TRANSFORM_VERSION,
+        }
+
+
+def test_transform_rendered_content():
+    stale = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_84_0/libs/json/index.html",
+        content_type="text/html",
+        content_html=DOCS_HTML,
+        transform_version="0",
+    )
+    no_process = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_84_0/libs/wave/index.html",
+        content_type="text/html",
+        content_html=DOCS_HTML,
+    )
+    current = baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_84_0/libs/json/other.html",
+        content_type="text/html",
+        content_html=DOCS_HTML,
+        content_transformed="already transformed",
+        transform_version=DOCS_TRANSFORM_VERSION,
+    )
+    baker.make(
+        "core.RenderedContent",
+        cache_key="static_content_1_84_0/libs/json/doc.adoc",
+        content_type="text/asciidoc",
+    )
+
+    assert transform_rendered_content() == 2
+    assert transform_rendered_content() == 0
+
+    stale.refresh_from_db()
+    assert stale.content_transformed == transform_docs_content(DOCS_HTML)
+    assert stale.transform_version == DOCS_TRANSFORM_VERSION
+    no_process.refresh_from_db()
+    assert no_process.content_transformed is None
+    assert no_process.transform_version == DOCS_TRANSFORM_VERSION
+    current.refresh_from_db()
+    assert current.content_transformed == "already transformed"
+
+
+@pytest.mark.django_db
+def test_transform_rendered_content_compressed():
+    """Rows saved uncompressed stay readable when the backfill compresses the
+    transformed content."""
+    with override_settings(RENDERED_CONTENT_COMPRESSION=""):
+        content = baker.make(
+            "core.RenderedContent",
+            cache_key="static_content_1_84_0/libs/json/index.html",
+            content_type="text/html",
+            content_html=DOCS_HTML,
+        )
+    with override_settings(RENDERED_CONTENT_COMPRESSION="zstd"):
+        assert transform_rendered_content() == 1
+
+    row = RenderedContent.objects.values("content_html", "content_transformed").get(
+        pk=content.pk
+    )
+    assert row == {
+        "content_html": DOCS_HTML,
+        "content_transformed": transform_docs_content(DOCS_HTML),
+    }
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_refresh_content_from_s3_purges_changed_content(version):
+    # the latest docs path is looked up in the index rather than S3
+    index = DocsPathIndex(version_slug=version.stripped_boost_url_slug)
+    index.set_keys(["libs/array/index.html"])
+    index.save()
+    cache_key = "static_content_1_84_0/libs/array/index.html"
+    baker.make("core.RenderedContent", cache_key=cache_key, content_html="<p>old</p>")
+
+    def refresh(content):
+        with patch(
+            "core.tasks.get_content_from_s3",
+            return_value={"content": content, "content_type": "text/html"},
+        ), patch("core.tasks.purge_fastly_surrogate_keys") as mock_purge:
+            refresh_content_from_s3("/archives/boost_1_84_0/index.html", cache_key)
+        return mock_purge
+
+    mock_purge = refresh(b"<p>new</p>")
+    mock_purge.delay.assert_called_once_with(
+        [get_content_surrogate_key("1_84_0/libs/array/index.html")]
+    )
+    # refreshing with the same content leaves the CDN alone
+    refresh(b"<p>new</p>").delay.assert_not_called()
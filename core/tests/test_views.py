@@ -1,12 +1,18 @@
-from unittest.mock import patch
+import datetime
+from unittest.mock import MagicMock, patch
 
 import pytest
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import caches
+from django.urls import resolve
 from django.test import RequestFactory
 from django.test.utils import override_settings
 from django.http import Http404
 
-from core.views import StaticContentTemplateView
+from core.caching import get_with_soft_expiry, set_processed_content
+from core.fastly import get_content_surrogate_key
+from core.models import RenderedContent
+from core.views import StaticContentTemplateView, UserGuideTemplateView
 
 TEST_CACHES = {
     "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
@@ -39,6 +45,7 @@ def content_path():
 def call_view(request_factory, content_path):
     """Calls the view with the given request_factory and content path."""
     request = request_factory.get(content_path)
+    request.user = AnonymousUser()
     view = StaticContentTemplateView.as_view()
     response = view(request, content_path=content_path)
     return response
@@ -535,3 +542,528 @@ def test_redirect_to_library_detail_view_with_cookie(tp):
     response = tp.get("redirect-to-library-view", library_slug="algorithm")
     tp.response_302(response)
     assert response["Location"] == "/library/1.86.0/algorithm/"
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_doc_libs_process_content_uses_processed_cache(request_factory, version):
+    """Test DocLibsTemplateView.process_content caches the processed html."""
+    from core.views import DocLibsTemplateView
+
+    caches["static_content"].clear()
+    view = DocLibsTemplateView()
+    view.request = request_factory.get("/doc/libs/1_79_0/libs/array/index.html")
+    view.kwargs = {"content_path": "1_79_0/libs/array/index.html"}
+    view.cache_key = "static_content_1_79_0/libs/array/index.html"
+    view.content_dict = {"content_type": "text/html"}
+
+    with patch(
+        "core.views.DocLibsTemplateView.build_processed_content",
+        return_value={"html": "<html>processed</html>"},
+    ) as mock_build:
+        first = view.process_content(b"<html>raw</html>")
+        # query strings other than modernize don't make a new variant
+        view.request = request_factory.get(
+            "/doc/libs/1_79_0/libs/array/index.html?utm_source=x"
+        )
+        second = view.process_content(b"<html>raw</html>")
+
+    assert first == second == "<html>processed</html>"
+    mock_build.assert_called_once()
+
+    # a different modernize level is a different variant
+    view.request = request_factory.get(
+        "/doc/libs/1_79_0/libs/array/index.html?modernize=min"
+    )
+    with patch(
+        "core.views.DocLibsTemplateView.build_processed_content",
+        return_value={"html": "<html>min</html>"},
+    ) as mock_build:
+        assert view.process_content(b"<html>raw</html>") == "<html>min</html>"
+    mock_build.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_doc_libs_build_processed_content_uses_transformed_content(
+    request_factory, version
+):
+    """Test content transformed at ingest renders the same as raw content."""
+    from core.htmlhelper import transform_docs_content
+    from core.views import DocLibsTemplateView
+
+    content = (
+        b'<html><head><link rel="canonical" href="/x"></head><body><hr>'
+        b'<a href="https://www.boost.org/doc/libs/1_79_0/">Docs</a></body></html>'
+    )
+    view = DocLibsTemplateView()
+    view.request = request_factory.get("/doc/libs/1_79_0/libs/array/index.html")
+    view.request.resolver_match = resolve(view.request.path)
+    view.request.user = AnonymousUser()
+    view.kwargs = {"content_path": "1_79_0/libs/array/index.html"}
+    req_uri = view.request.build_absolute_uri()
+
+    view.content_dict = {"content_type": "text/html"}
+    # the version alert looks up the latest docs path in S3
+    with patch("libraries.mixins.determine_latest_url", return_value="/latest/"):
+        expected = view.build_processed_content(content, req_uri)
+
+        view.content_dict["content_transformed"] = transform_docs_content(content)
+        with patch("core.views.BeautifulSoup") as mock_soup:
+            assert view.build_processed_content(content, req_uri) == expected
+    mock_soup.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, content_encoding", [("gzip, zstd", "zstd"), ("gzip", None)]
+)
+def test_doc_libs_serves_precompressed_content(
+    request_factory, accept_encoding, content_encoding
+):
+    """Test unprocessed content stored compressed is sent as it is."""
+    from core.compression import zstd_compress, zstd_decompress
+    from core.views import DocLibsTemplateView
+
+    content = b"body { color: red; }"
+    view = DocLibsTemplateView()
+    view.request = request_factory.get(
+        "/doc/libs/1_79_0/libs/array/doc/boostbook.css",
+        HTTP_ACCEPT_ENCODING=accept_encoding,
+    )
+    view.content_dict = {
+        "content": content,
+        "content_type": "text/css; charset=utf-8",
+        "content_zstd": zstd_compress(content),
+    }
+
+    response = view.render_to_response(
+        {"content": content, "content_type": "text/css; charset=utf-8"}
+    )
+
+    assert response.get("Content-Encoding") == content_encoding
+    assert response["Vary"] == "Accept-Encoding"
+    if content_encoding:
+        assert zstd_decompress(response.content) == content
+    else:
+        assert response.content == content
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+@pytest.mark.parametrize(
+    "accept_encoding, content_encoding",
+    [("gzip, deflate, br", "br"), ("gzip", "gzip"), ("", None)],
+)
+def test_doc_libs_serves_precompressed_processed_content(
+    request_factory, version, accept_encoding, content_encoding
+):
+    """Test processed pages are cached compressed and sent in an accepted encoding."""
+    import brotli
+    import gzip
+
+    from core.views import DocLibsTemplateView
+
+    html = "<html>" + "<p>processed</p>" * 100 + "</html>"
+    decompress = {"br": brotli.decompress, "gzip": gzip.decompress}
+    caches["static_content"].clear()
+    etags = set()
+    for _ in range(2):
+        view = DocLibsTemplateView()
+        view.request = request_factory.get(
+            "/doc/libs/1_79_0/libs/array/index.html",
+            HTTP_ACCEPT_ENCODING=accept_encoding,
+        )
+        view.kwargs = {"content_path": "1_79_0/libs/array/index.html"}
+        view.cache_key = "static_content_1_79_0/libs/array/index.html"
+        view.content_dict = {"content_type": "text/html"}
+        with patch(
+            "core.views.DocLibsTemplateView.build_processed_content",
+            return_value={"html": html},
+        ):
+            response = view.render_to_response(
+                {"content": b"<html>raw</html>", "content_type": "text/html"}
+            )
+
+        assert response.get("Content-Encoding") == content_encoding
+        assert response["Vary"] == "Accept-Encoding"
+        assert response["Content-Length"] == str(len(response.content))
+        body = response.content
+        if content_encoding:
+            body = decompress[content_encoding](body)
+        assert body.decode() == html
+        etags.add(response["ETag"])
+
+    # the second response comes from the cache, with the same ETag
+    assert len(etags) == 1
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+@pytest.mark.parametrize(
+    "view_class", [StaticContentTemplateView, UserGuideTemplateView]
+)
+def test_static_content_serves_precompressed_content(request_factory, view_class, user):
+    """Test html responses of the other static content views are compressed once,
+    and only for anonymous users."""
+    import brotli
+
+    from core import caching
+
+    content_path = "develop/doc/html/index.html"
+    html = b"<html><body>" + b"<p>static content</p>" * 100 + b"</body></html>"
+    caches["static_content"].clear()
+
+    def get_response(request_user):
+        request = request_factory.get(
+            f"/{content_path}", HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        request.user = request_user
+        return view_class.as_view()(request, content_path=content_path)
+
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={"content": html, "content_type": "text/html"},
+    ), patch(
+        "core.caching.get_precompressed", wraps=caching.get_precompressed
+    ) as mock_precompressed:
+        first = get_response(AnonymousUser())
+        second = get_response(AnonymousUser())
+        signed_in = get_response(user)
+
+    mock_precompressed.assert_called_once()
+    assert first["Content-Encoding"] == second["Content-Encoding"] == "br"
+    assert first["Vary"] == "Accept-Encoding"
+    assert first["ETag"] == second["ETag"]
+    assert first["ETag"].endswith('-br"')
+    assert b"static content" in brotli.decompress(first.content)
+    assert not signed_in.has_header("Content-Encoding")
+    assert b"static content" in signed_in.content
+
+
+@pytest.fixture
+def image_s3_client():
+    """Returns a mock S3 client serving a small png."""
+    from io import BytesIO
+    from botocore.response import StreamingBody
+
+    body = b"\x89PNG" + b"x" * 96
+    client = MagicMock()
+    client.get_object.side_effect = lambda **kwargs: {
+        "Body": StreamingBody(BytesIO(body), len(body)),
+        "ContentLength": len(body),
+        "ContentType": "image/png",
+        "ETag": '"abc123"',
+        "LastModified": datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+    }
+    return client
+
+
+@pytest.fixture
+def image_cache_settings(settings, tmp_path):
+    """Points the image disk cache at a temporary directory."""
+    settings.IMAGE_CACHE_DIR = str(tmp_path / "images")
+    settings.IMAGE_CACHE_MAX_SIZE = 1024 * 1024
+    settings.IMAGE_CACHE_MAX_ITEM_SIZE = 1024
+    with patch("core.caching._image_cache", None):
+        yield settings
+
+
+def call_image_view(request_factory, content_path, **headers):
+    """Calls the ImageView for the given content path and request headers."""
+    from core.views import ImageView
+
+    request = request_factory.get(f"/images/{content_path}", headers=headers)
+    return ImageView.as_view()(request, content_path=content_path)
+
+
+def test_image_view_streams_and_caches(
+    request_factory, image_s3_client, image_cache_settings
+):
+    """Test ImageView streams from S3 once, then serves from the disk cache."""
+    with patch("core.views.get_s3_client", return_value=image_s3_client):
+        response = call_image_view(request_factory, "site/develop/logo.png")
+        assert response.status_code == 200
+        assert response.streaming
+        first_body = b"".join(response.streaming_content)
+        assert response["ETag"] == '"abc123"'
+        assert response["Content-Length"] == "100"
+        assert "max-age" in response["Cache-Control"]
+
+        response = call_image_view(request_factory, "site/develop/logo.png")
+        assert b"".join(response.streaming_content) == first_body
+    image_s3_client.get_object.assert_called_once()
+
+
+def test_image_view_conditional_and_range_from_cache(
+    request_factory, image_s3_client, image_cache_settings
+):
+    """Test ImageView answers conditional and range requests from the cache."""
+    with patch("core.views.get_s3_client", return_value=image_s3_client):
+        response = call_image_view(request_factory, "site/develop/logo.png")
+        b"".join(response.streaming_content)
+
+        response = call_image_view(
+            request_factory, "site/develop/logo.png", if_none_match='"abc123"'
+        )
+        assert response.status_code == 304
+
+        response = call_image_view(
+            request_factory, "site/develop/logo.png", range="bytes=0-3"
+        )
+        assert response.status_code == 206
+        assert b"".join(response.streaming_content) == b"\x89PNG"
+        assert response["Content-Range"] == "bytes 0-3/100"
+    image_s3_client.get_object.assert_called_once()
+
+
+@pytest.mark.parametrize("changed", [False, True])
+def test_image_view_revalidates_stale_cache(
+    request_factory, image_s3_client, image_cache_settings, changed
+):
+    """Test ImageView checks a stale cached image with a conditional HEAD request,
+    serving it from the cache if unchanged and fetching it again otherwise."""
+    from botocore.exceptions import ClientError
+
+    image_cache_settings.IMAGE_CACHE_MAX_AGE = 0
+    if not changed:
+        image_s3_client.head_object.side_effect = ClientError(
+            {"Error": {"Code": "304"}}, "HeadObject"
+        )
+    with patch("core.views.get_s3_client", return_value=image_s3_client):
+        response = call_image_view(request_factory, "site/develop/logo.png")
+        first_body = b"".join(response.streaming_content)
+
+        response = call_image_view(request_factory, "site/develop/logo.png")
+        assert b"".join(response.streaming_content) == first_body
+
+    image_s3_client.head_object.assert_called_once_with(
+        Bucket=image_cache_settings.STATIC_CONTENT_BUCKET_NAME,
+        Key="site/develop/logo.png",
+        IfNoneMatch='"abc123"',
+    )
+    assert image_s3_client.get_object.call_count == (2 if changed else 1)
+
+
+def test_image_view_not_found(request_factory, image_cache_settings):
+    """Test ImageView returns a 404 for missing S3 keys."""
+    from botocore.exceptions import ClientError
+
+    client = MagicMock()
+    client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+    with patch("core.views.get_s3_client", return_value=client):
+        with pytest.raises(Http404):
+            call_image_view(request_factory, "site/develop/missing.png")
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=90-200", (90, 99)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_range_header(header, expected):
+    from core.views import parse_range_header
+
+    assert parse_range_header(header, 100) == expected
+
+
+def test_parse_range_header_not_satisfiable():
+    from core.views import parse_range_header
+
+    with pytest.raises(ValueError):
+        parse_range_header("bytes=200-", 100)
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_serves_stale_and_refreshes_once(request_factory):
+    """Test stale cached content is served while one refresh is scheduled."""
+    content_path = "/develop/libs/rst.css"
+    cache = caches["static_content"]
+    cache.set(
+        f"static_content_{content_path}",
+        {
+            "value": {"content": b"stale content", "content_type": "text/plain"},
+            "soft_expires_at": 0,
+        },
+    )
+
+    with patch("core.views.refresh_static_content") as mock_refresh, patch(
+        "core.views.get_content_from_s3"
+    ) as mock_get_content_from_s3:
+        first = call_view(request_factory, content_path)
+        second = call_view(request_factory, content_path)
+
+    assert first.content == second.content == b"stale content"
+    mock_get_content_from_s3.assert_not_called()
+    mock_refresh.delay.assert_called_once_with(
+        "core.views.StaticContentTemplateView",
+        content_path,
+        f"static_content_{content_path}",
+    )
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_refresh_keeps_content_key(request_factory):
+    """Test a refreshed entry has the fields the view needs to process it."""
+    content_path = "/help/index.html"
+    cache_key = f"static_content_{content_path}"
+    caches["static_content"].set(
+        cache_key,
+        {
+            "value": {"content": b"<p>stale</p>", "content_type": "text/html"},
+            "soft_expires_at": 0,
+        },
+    )
+    s3_result = {
+        "content": b'<img src="logo.png">',
+        "content_key": "/site-pages/help/index.html",
+        "content_type": "text/html",
+        "last_modified": datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc),
+    }
+    with patch(
+        "core.views.get_content_from_s3", return_value=s3_result
+    ) as mock_get_content_from_s3, patch("core.views.purge_fastly_surrogate_keys"):
+        # the stale page is served, and refreshed by the (eager) task
+        assert b"stale" in call_view(request_factory, content_path).content
+        response = call_view(request_factory, content_path)
+
+    mock_get_content_from_s3.assert_called_once_with(key=content_path)
+    assert b'src="/images/site-pages/help/logo.png"' in response.content
+    refreshed, _ = get_with_soft_expiry(caches["static_content"], cache_key)
+    assert refreshed["content_key"] == s3_result["content_key"]
+    assert refreshed["last_modified"] == s3_result["last_modified"]
+    # only the view's allowed_db_save_types are saved to the database
+    assert not RenderedContent.objects.filter(cache_key=cache_key).exists()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_refresh_purges_changed_content():
+    content_path = "/help/index.html"
+    cache_key = f"static_content_{content_path}"
+    caches["static_content"].clear()
+    view = StaticContentTemplateView()
+
+    def refresh(content):
+        with patch(
+            "core.views.get_content_from_s3",
+            return_value={"content": content, "content_type": "text/html"},
+        ), patch("core.views.purge_fastly_surrogate_keys") as mock_purge:
+            view.refresh_content(content_path, cache_key)
+        return mock_purge
+
+    refresh(b"<p>new</p>").delay.assert_called_once_with(
+        [get_content_surrogate_key(content_path)]
+    )
+    # refreshing with the same content leaves the CDN alone
+    refresh(b"<p>new</p>").delay.assert_not_called()
+
+
+@override_settings(CACHES=TEST_CACHES, MODERNIZED_DOCS_CACHE_TIMEOUT=60)
+def test_modernized_docs_view_caches_transformed_page(tp):
+    caches["static_content"].clear()
+    content = (
+        b'<html><head><meta charset="iso-8859-1"></head>'
+        b'<body><a href="a.html" target="desc">caf\xc3\xa9</a></body></html>'
+    )
+    url = "/internal/modernized-docs/1_90_0/libs/preprocessor/doc/contents.html"
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={
+            "content": content,
+            "content_type": "text/html",
+            "charset": "utf-8",
+        },
+    ) as mock_get_content, patch("core.views.detect_charset") as mock_detect, patch(
+        "core.views.set_processed_content", wraps=set_processed_content
+    ) as mock_set:
+        first = tp.get(url)
+        second = tp.get(url)
+
+    tp.response_200(first)
+    assert first.content == second.content
+    assert "café" in first.content.decode()
+    assert b'hx-target="#main"' in first.content
+    mock_get_content.assert_called_once()
+    # the page isn't invalidated when S3 changes, so it's only cached briefly
+    assert mock_set.call_args.kwargs["timeout"] == 60
+    # the charset comes from the fetched content, no detection needed
+    mock_detect.assert_not_called()
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_conditional_get(request_factory):
+    """Test static content has validators, and matching requests get a 304."""
+    content_path = "develop/libs/rst.css"
+    last_modified = datetime.datetime(2025, 1, 2, tzinfo=datetime.timezone.utc)
+    view = StaticContentTemplateView.as_view()
+
+    def get_request(**headers):
+        request = request_factory.get(content_path, **headers)
+        request.user = AnonymousUser()
+        return request
+
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={
+            "content": b"body { color: red; }",
+            "content_type": "text/css",
+            "last_modified": last_modified,
+        },
+    ):
+        response = view(get_request(), content_path=content_path)
+        assert response.status_code == 200
+        etag = response["ETag"]
+        assert response["Last-Modified"] == "Thu, 02 Jan 2025 00:00:00 GMT"
+
+        request = get_request(HTTP_IF_NONE_MATCH=etag)
+        response = view(request, content_path=content_path)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+        request = get_request(HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        assert view(request, content_path=content_path).status_code == 304
+
+        request = get_request(HTTP_IF_NONE_MATCH='"stale"')
+        assert view(request, content_path=content_path).status_code == 200
+
+
+@override_settings(CACHES=TEST_CACHES)
+def test_modernized_docs_view_conditional_get(tp):
+    url = "/internal/modernized-docs/1_90_0/libs/preprocessor/doc/contents.html"
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={
+            "content": b"<html><body></body></html>",
+            "content_type": "text/html",
+        },
+    ):
+        response = tp.get(url)
+        tp.response_200(response)
+        response = tp.get(url, extra={"HTTP_IF_NONE_MATCH": response["ETag"]})
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=TEST_CACHES)
+def test_static_content_surrogate_keys(request_factory):
+    from core.fastly import get_content_surrogate_keys
+
+    with patch(
+        "core.views.get_content_from_s3",
+        return_value={"content": b"body {}", "content_type": "text/css"},
+    ):
+        response = call_view(request_factory, "develop/libs/rst.css")
+    assert response["Surrogate-Key"].split() == get_content_surrogate_keys(
+        "develop/libs/rst.css"
+    )
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from core.caching import get_processed_content, get_processed_content_variant
+from core.views import DocLibsTemplateView
+from core.warming import warm_docs_page, warm_docs_pages
+
+TEST_CACHES = {
+    "static_content": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "warming-snowflake",
+    },
+}
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    ALLOWED_HOSTS=["www.example.com"],
+    DOCS_CACHE_WARM_BASE_URI="https://www.example.com",
+)
+def test_warm_docs_page(version):
+    caches["static_content"].clear()
+    content_path = "1_79_0/libs/json/index.html"
+    s3_result = {
+        "content": b"<html><head></head><body><p>json</p></body></html>",
+        "content_type": "text/html",
+        "last_modified": None,
+    }
+
+    with patch.object(
+        DocLibsTemplateView, "get_from_s3", return_value=s3_result
+    ) as mock_get_from_s3, patch(
+        "libraries.mixins.determine_latest_url", return_value="/latest/"
+    ), patch(
+        "core.views.purge_fastly_surrogate_keys"
+    ) as mock_purge:
+        assert warm_docs_page(content_path) is True
+
+    mock_get_from_s3.assert_called_once_with(content_path)
+    mock_purge.delay.assert_not_called()
+    # cached for the uri visitors of the site request
+    variant = get_processed_content_variant(
+        "med",
+        DocLibsTemplateView.get_content_classification(f"/doc/libs/{content_path}"),
+        version.slug,
+        f"https://www.example.com/doc/libs/{content_path}",
+    )
+    processed = get_processed_content(f"static_content_{content_path}", variant)
+    assert "json" in processed["html"]
+
+
+@override_settings(CACHES=TEST_CACHES, ALLOWED_HOSTS=["www.boost.org"])
+def test_warm_docs_page_not_found(db):
+    with patch.object(DocLibsTemplateView, "get_from_s3", return_value=None):
+        assert warm_docs_page("1_79_0/libs/missing/index.html") is False
+
+
+@override_settings(DOCS_CACHE_WARM_WORKERS=2)
+def test_warm_docs_pages():
+    content_paths = ["1_79_0/libs/a/index.html", "1_79_0/libs/b/index.html", "c"]
+    with patch(
+        "core.warming.warm_docs_page", side_effect=[True, False, ValueError]
+    ) as mock_warm:
+        assert warm_docs_pages(content_paths) == 1
+    assert mock_warm.call_count == 3
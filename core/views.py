@@ -2,29 +2,42 @@ import os
 import re
 
 import requests
+from botocore.exceptions import ClientError
 from django.utils import timezone
 
+from datetime import datetime, timezone as dt_timezone
 from textwrap import dedent
 from urllib.parse import urljoin
 
 import structlog
 from bs4 import BeautifulSoup
-import chardet
 from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.core.cache import caches
+from django.db.models import BinaryField
+from django.db.models.functions import Cast
 from django.http import (
     Http404,
     HttpResponse,
     HttpResponseNotFound,
+    HttpResponseNotModified,
     HttpResponseRedirect,
     HttpRequest,
+    StreamingHttpResponse,
 )
 from django.shortcuts import redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, parse_http_date_safe
 from django.views import View
 from django.views.decorators.cache import never_cache
 from django.views.generic import TemplateView
@@ -44,19 +57,49 @@ from versions.models import Version, docs_path_to_boost_name
 
 from .mixins import V3Mixin, iter_v3_views
 from .asciidoc import convert_adoc_to_html
+from .compression import (
+    ZSTD_ENCODING,
+    ZSTD_MAGIC,
+    choose_encoding,
+    decompress_text,
+    get_encoded_etag,
+    get_etag,
+    get_precompressed,
+)
+from .caching import (
+    claim_revalidation,
+    clear_missing_s3_keys,
+    get_image_cache,
+    get_precompressed_content,
+    get_processed_content,
+    get_processed_content_variant,
+    get_single_flight,
+    get_with_soft_expiry,
+    set_processed_content,
+    set_with_soft_expiry,
+)
 from .boostrenderer import (
     convert_img_paths,
-    extract_file_data,
+    get_candidate_s3_keys,
     get_content_from_s3,
+    detect_charset,
+    get_content_type,
     get_meta_redirect_from_html,
     get_s3_client,
 )
 from .constants import (
+    DOCS_TRANSFORM_VERSION,
     SourceDocType,
     BOOST_LIB_PATH_RE,
     BOOST_VERSION_REGEX,
     STATIC_CONTENT_EARLY_EXIT_PATH_PREFIXES,
 )
+from .fastly import (
+    LATEST_SURROGATE_KEY,
+    add_surrogate_keys,
+    get_content_surrogate_key,
+    get_content_surrogate_keys,
+)
 from .htmlhelper import (
     modernize_legacy_page,
     convert_name_to_id,
@@ -73,11 +116,14 @@ from .htmlhelper import (
     add_canonical_link,
 )
 from .markdown import process_md
+from .metrics import RequestTimings, get_metrics
 from .models import RenderedContent, SiteSettings
 from .tasks import (
     clear_rendered_content_cache_by_cache_key,
     clear_rendered_content_cache_by_content_type,
+    purge_fastly_surrogate_keys,
     refresh_content_from_s3,
+    refresh_static_content,
     save_rendered_content,
 )
 
@@ -128,7 +174,8 @@ class ClearCacheView(UserPassesTestMixin, View):
     login_url = "/login/"
 
     def get(self, request, *args, **kwargs):
-        """Clears the redis and database cache for given parameters.
+        """Clears the redis and database cache for given parameters. A cleared
+        cache key's page is purged from Fastly too.
 
         Params (must pass one):
             content_type: The content type to clear. Example: "text/asciidoc"
@@ -144,6 +191,9 @@ class ClearCacheView(UserPassesTestMixin, View):
 
         if cache_key:
             clear_rendered_content_cache_by_cache_key.delay(cache_key)
+            purge_fastly_surrogate_keys.delay(
+                [get_content_surrogate_key(cache_key.replace("static_content_", ""))]
+            )
 
         return HttpResponse("Cache cleared")
 
@@ -158,6 +208,29 @@ class ClearCacheView(UserPassesTestMixin, View):
         return self.request.user.is_staff
 
 
+@method_decorator(never_cache, name="dispatch")
+class MetricsView(UserPassesTestMixin, View):
+    """Expose the application metrics in the Prometheus text format.
+
+    Staff members can view them, scrapers send "Authorization: Bearer <token>"
+    with the METRICS_TOKEN setting.
+    """
+
+    http_method_names = ["get"]
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        content, content_type = get_metrics()
+        return HttpResponse(content, content_type=content_type)
+
+    def test_func(self):
+        token = settings.METRICS_TOKEN
+        authorization = self.request.headers.get("Authorization", "")
+        if token and constant_time_compare(authorization, f"Bearer {token}"):
+            return True
+        return self.request.user.is_staff
+
+
 class MarkdownTemplateView(TemplateView):
     template_name = "markdown_template.html"
     content_dir = settings.BASE_CONTENT
@@ -451,6 +524,52 @@ class BaseStaticContentTemplateView(TemplateView):
     template_name = "adoc_content.html"
     allowed_db_save_types = {"text/asciidoc"}
     html_content_types = {"text/html", "text/html; charset=utf-8"}
+    # Serve content stored compressed in the database as it is, to clients that
+    # accept its encoding. Only for views that don't cache database results in redis.
+    serve_precompressed = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timings = RequestTimings()
+        # compressed versions of the content by encoding, and the content's ETag,
+        # set by process_content when they're available, see get_content_response
+        self.precompressed = {}
+        self.etag = None
+        # set when the response is the stored content as it is, see render_to_response
+        self.last_modified = None
+        # the content path with the "latest" alias resolved, see get()
+        self.content_path = None
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        response = get_validated_response(request, response, self.last_modified)
+        add_surrogate_keys(response, self.get_surrogate_keys())
+        self.record_timings(response)
+        return response
+
+    def get_surrogate_keys(self) -> list[str]:
+        """Return the Fastly surrogate keys to tag the response with."""
+        content_path = self.kwargs.get("content_path", "")
+        keys = get_content_surrogate_keys(self.content_path or content_path)
+        if content_path.startswith(f"{LATEST_RELEASE_URL_PATH_STR}/"):
+            keys.append(LATEST_SURROGATE_KEY)
+        return keys
+
+    def record_timings(self, response):
+        """Report where the request spent its time, in the logs and the static
+        content metrics, and in a Server-Timing header if SERVER_TIMING_HEADER is
+        set."""
+        view = self.__class__.__name__
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = self.timings.get_server_timing()
+        logger.info(
+            "static_content_timings",
+            view=view,
+            path=self.request.path,
+            status_code=response.status_code,
+            **self.timings.get_log_fields(),
+        )
+        self.timings.observe(view)
 
     def get(self, request, *args, **kwargs):
         """Return static content that originates in S3.
@@ -489,6 +608,7 @@ class BaseStaticContentTemplateView(TemplateView):
 
         try:
             content_path = self.get_library_content_path(content_path)
+            self.content_path = content_path
             self.content_dict = self.get_content(content_path)
             # If the content is an HTML file with a meta redirect, redirect the user.
             if self.content_dict.get("redirect"):
@@ -509,27 +629,34 @@ class BaseStaticContentTemplateView(TemplateView):
         return content_path
 
     def cache_result(self, static_content_cache, cache_key, result):
-        static_content_cache.set(cache_key, result)
+        set_with_soft_expiry(static_content_cache, cache_key, result)
 
     def get_content(self, content_path):
         """Return content from cache, database, or S3."""
         static_content_cache = caches["static_content"]
         cache_key = f"static_content_{content_path}"
-        result = self.get_from_cache(static_content_cache, cache_key)
+        with self.timings.stage("cache"):
+            result, is_stale = get_with_soft_expiry(static_content_cache, cache_key)
+        result = result or None
+        if result:
+            self.timings.cache_tier = "cache_stale" if is_stale else "cache"
+        if result and is_stale and claim_revalidation(static_content_cache, cache_key):
+            # Serve the stale content now, and refresh it in the background
+            self.schedule_refresh(content_path, cache_key)
 
         if result is None:
-            result = self.get_from_database(cache_key)
-            if result:
-                # When we get a result from the database, we refresh its content
-                refresh_content_from_s3.delay(content_path, cache_key)
-
-        if result is None:
-            result = self.get_from_s3(content_path)
-            if result:
-                # Save to database
-                self.save_to_database(cache_key, result)
-                # Cache the result
-                self.cache_result(static_content_cache, cache_key, result)
+            # Only one request fetches a missing page, the others wait for it
+            result = get_single_flight(
+                static_content_cache,
+                cache_key,
+                fetch=lambda: self.fetch_content(
+                    static_content_cache, cache_key, content_path
+                ),
+                get_cached=lambda: self.get_from_cache(static_content_cache, cache_key),
+            )
+            if result and not self.timings.cache_tier:
+                # another request fetched it while this one waited
+                self.timings.cache_tier = "cache"
 
         if result is None:
             logger.info(
@@ -541,6 +668,63 @@ class BaseStaticContentTemplateView(TemplateView):
 
         return result
 
+    def fetch_content(self, static_content_cache, cache_key, content_path):
+        """Return content from the database or S3, caching the result."""
+        result = self.get_from_database(cache_key)
+        if result:
+            self.timings.cache_tier = "database"
+            self.cache_result(static_content_cache, cache_key, result)
+            # When we get a result from the database, we refresh its content
+            self.schedule_refresh(content_path, cache_key)
+
+        if result is None:
+            result = self.get_from_s3(content_path)
+            if result:
+                self.timings.cache_tier = "s3"
+                # Save to database
+                self.save_to_database(cache_key, result)
+                # Cache the result
+                self.cache_result(static_content_cache, cache_key, result)
+
+        return result
+
+    def schedule_refresh(self, content_path, cache_key):
+        """Refresh the content from S3 in the background, with refresh_content()."""
+        view_class = type(self)
+        refresh_static_content.delay(
+            f"{view_class.__module__}.{view_class.__qualname__}",
+            content_path,
+            cache_key,
+        )
+
+    def refresh_content(self, content_path, cache_key):
+        """Fetch the content from S3 again and replace the cached result.
+
+        The result is built and saved to the database the same way as on a cache
+        miss, so the refreshed entry has everything process_content() needs.
+        """
+        # The content may have been (re)uploaded, so don't trust earlier misses.
+        clear_missing_s3_keys(
+            settings.STATIC_CONTENT_BUCKET_NAME,
+            get_candidate_s3_keys(self.get_s3_key(content_path)),
+        )
+        result = self.get_from_s3(content_path)
+        if not result or not result.get("content"):
+            return
+        static_content_cache = caches["static_content"]
+        previous, _ = get_with_soft_expiry(static_content_cache, cache_key)
+        if result.get("content_type") in self.allowed_db_save_types:
+            self.save_to_database(cache_key, result)
+        else:
+            # don't let an older saved version outlive the cached one
+            RenderedContent.objects.delete_by_cache_key(cache_key)
+        self.cache_result(static_content_cache, cache_key, result)
+        # Only purge the CDN when the page changed, most refreshes find it as it was
+        if not previous or force_bytes(previous.get("content")) != force_bytes(
+            result["content"]
+        ):
+            purge_fastly_surrogate_keys.delay([get_content_surrogate_key(content_path)])
+
     def get_context_data(self, **kwargs):
         """Return the content and content type for the template.
 
@@ -579,7 +763,7 @@ class BaseStaticContentTemplateView(TemplateView):
         return version
 
     def get_from_cache(self, static_content_cache, cache_key):
-        cached_result = static_content_cache.get(cache_key)
+        cached_result, _ = get_with_soft_expiry(static_content_cache, cache_key)
         return cached_result if cached_result else None
 
     def get_from_database(self, cache_key) -> dict[str, str | bytes] | None:
@@ -590,20 +774,41 @@ class BaseStaticContentTemplateView(TemplateView):
                 rendered_content_cache_time = 3600
         now = timezone.now()
         start_time = now - timezone.timedelta(seconds=rendered_content_cache_time)
-        try:
-            content_obj = RenderedContent.objects.filter(modified__gte=start_time).get(
-                cache_key=cache_key
+        queryset = RenderedContent.objects.filter(modified__gte=start_time)
+        if self.serve_precompressed:
+            # the html as it is stored, to send it on without compressing it again
+            queryset = queryset.defer("content_html").annotate(
+                content_html_stored=Cast("content_html", BinaryField())
             )
-            return {
-                "content": content_obj.content_html.encode("utf-8"),
-                "content_type": content_obj.content_type,
-                "updated": content_obj.modified,
-            }
+        try:
+            with self.timings.stage("db"):
+                content_obj = queryset.get(cache_key=cache_key)
         except RenderedContent.DoesNotExist:
             return None
+        if self.serve_precompressed:
+            stored = bytes(content_obj.content_html_stored)
+            content_obj.content_html = decompress_text(stored)
+        result = {
+            "content": content_obj.content_html.encode("utf-8"),
+            "content_type": content_obj.content_type,
+            "updated": content_obj.modified,
+        }
+        if (
+            content_obj.content_transformed
+            and content_obj.transform_version == DOCS_TRANSFORM_VERSION
+        ):
+            result["content_transformed"] = content_obj.content_transformed
+        if self.serve_precompressed and stored.startswith(ZSTD_MAGIC):
+            result["content_zstd"] = stored
+        return result
+
+    def get_s3_key(self, content_path):
+        """Return the S3 key of the content at content_path."""
+        return content_path
 
     def get_from_s3(self, content_path):
-        result = get_content_from_s3(key=content_path)
+        with self.timings.stage("s3"):
+            result = get_content_from_s3(key=self.get_s3_key(content_path))
         if not result:
             return None
 
@@ -616,7 +821,8 @@ class BaseStaticContentTemplateView(TemplateView):
         #  content type for library docs is set to text/html, maybe descriptions and
         #  release notes
         if content_type == "text/asciidoc":
-            result["content"] = self.convert_adoc_to_html(content)
+            with self.timings.stage("asciidoctor"):
+                result["content"] = self.convert_adoc_to_html(content)
 
         # Check if the content is an HTML file. If so, check for a meta redirect.
         if content_type.startswith("text/html"):
@@ -641,9 +847,60 @@ class BaseStaticContentTemplateView(TemplateView):
         if self.get_template_names():
             content = self.process_content(context["content"])
             context["content"] = content
-            return super().render_to_response(context, **response_kwargs)
+            response = super().render_to_response(context, **response_kwargs)
+            # render now rather than after dispatch, so it's included in the timings
+            with self.timings.stage("render"):
+                response.render()
+            return self.encode_response(response)
         content = self.process_content(context["content"])
-        return HttpResponse(content, content_type=context["content_type"])
+        if content is context["content"]:
+            self.last_modified = self.get_content_last_modified()
+            if "content_zstd" in self.content_dict:
+                # the content is unchanged, so the stored compressed bytes can be sent
+                self.precompressed = {ZSTD_ENCODING: self.content_dict["content_zstd"]}
+        return self.get_content_response(content, context["content_type"])
+
+    def get_content_last_modified(self) -> int | None:
+        """Return when the content was last modified in S3, or saved to the
+        database, as a timestamp."""
+        last_modified = self.content_dict.get("last_modified") or self.content_dict.get(
+            "updated"
+        )
+        return int(last_modified.timestamp()) if last_modified else None
+
+    def get_content_response(self, content, content_type):
+        """Return a response with the content, or with a precompressed version of it
+        in the client's preferred encoding."""
+        return self.encode_response(HttpResponse(content, content_type=content_type))
+
+    def encode_response(self, response):
+        """Send the response body in the client's preferred encoding.
+
+        Uses the compressed versions set by process_content when there are any,
+        otherwise text responses to anonymous users are compressed once and
+        cached by ETag, see get_precompressed_content. Pages for signed in users
+        include their details, so they aren't cached.
+        """
+        if (
+            not self.precompressed
+            and not self.etag
+            and response["Content-Type"].startswith("text/")
+            and not self.request.user.is_authenticated
+        ):
+            with self.timings.stage("compress"):
+                self.etag, self.precompressed = get_precompressed_content(
+                    response.content
+                )
+        encoding = choose_encoding(self.request, self.precompressed)
+        if encoding:
+            response.content = self.precompressed[encoding]
+            response["Content-Encoding"] = encoding
+        if self.precompressed:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        if self.etag:
+            response["ETag"] = get_encoded_etag(self.etag, encoding)
+        response["Content-Length"] = len(response.content)
+        return response
 
     def save_to_database(self, cache_key, result):
         """Saves the rendered asciidoc content to the database."""
@@ -701,7 +958,8 @@ class StaticContentTemplateView(BaseStaticContentTemplateView):
             # Generate the replacement path to the image
             s3_path = "/".join(url_parts)
             # Process the HTML to replace the image paths
-            content = convert_img_paths(str(content_html), s3_path)
+            with self.timings.stage("img_paths"):
+                content = convert_img_paths(str(content_html), s3_path)
         return content
 
 
@@ -727,6 +985,7 @@ def normalize_boost_doc_path(content_path: str) -> str:
 
 
 class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
+    serve_precompressed = True
     allowed_db_save_types = {
         "text/asciidoc",
         "text/html",
@@ -741,13 +1000,18 @@ class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
         set_selected_boost_version(version_slug, response)
         return response
 
-    def get_from_s3(self, content_path):
-        legacy_url = normalize_boost_doc_path(content_path)
-        return super().get_from_s3(legacy_url)
+    def get_s3_key(self, content_path):
+        return normalize_boost_doc_path(content_path)
 
     def process_content(self, content: bytes):
-        """Replace page header with the local one."""
-        context = super().get_context_data()
+        """Replace page header with the local one.
+
+        The processed result is cached per content path and variant (modernize
+        level, library classification, latest version and request uri), so
+        repeat hits skip the parse, rewrite and render work. Final html is cached
+        with its ETag and brotli and gzip compressed versions, for
+        get_content_response.
+        """
         content_type = self.content_dict.get("content_type")
         modernize = self.request.GET.get("modernize", "med").lower()
         if (
@@ -756,42 +1020,116 @@ class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
             or get_is_iframe_destination(self.request.headers)
         ):
             return content
-        # everything from this point should be html
-        req_uri = self.request.build_absolute_uri()
-        canonical_uri = generate_canonical_library_uri(req_uri)
+        # everything from this point should be html, the query string doesn't
+        # change it beyond the modernize level
+        req_uri = self.request.build_absolute_uri(self.request.path)
+        cache_key = getattr(self, "cache_key", None)
+        variant = None
+        if cache_key:
+            latest_version = Version.objects.most_recent()
+            variant = get_processed_content_variant(
+                modernize,
+                self.get_content_classification(self.request.path),
+                latest_version.slug if latest_version else "",
+                req_uri,
+            )
+            with self.timings.stage("processed_cache"):
+                processed = get_processed_content(cache_key, variant)
+            if processed:
+                return self.render_processed_content(processed)
+
+        processed = self.build_processed_content(content, req_uri)
+        if variant:
+            if "html" in processed:
+                with self.timings.stage("compress"):
+                    body = processed["html"].encode("utf-8")
+                    processed["etag"] = get_etag(body)
+                    processed["precompressed"] = get_precompressed(body)
+            set_processed_content(cache_key, variant, processed)
+        return self.render_processed_content(processed)
 
-        soup = BeautifulSoup(content, "html.parser")
+    @staticmethod
+    def get_content_classification(path: str) -> str:
+        """Return how the content at path is processed, for use in cache keys."""
+        if is_in_no_process_libs(path):
+            return "no_process"
+        classification = []
+        if is_in_fully_modernized_libs(path):
+            classification.append("fully_modernized")
+        if is_in_no_wrapper_libs(path):
+            classification.append("no_wrapper")
+        return "-".join(classification) or "default"
+
+    def build_processed_content(self, content: bytes, req_uri: str) -> dict:
+        """Process the html content, returning a cacheable dict.
+
+        The dict has either an "html" key with the final html, or a "context" key
+        with the context update for the docsiframe template, which is rendered per
+        request because it includes user specific parts of the site header.
+        """
+        canonical_uri = generate_canonical_library_uri(req_uri)
 
         # handle libraries that expect no processing
         if is_in_no_process_libs(self.request.path):
+            with self.timings.stage("parse"):
+                soup = BeautifulSoup(content, "html.parser")
             soup = self._required_content_changes(soup, canonical_uri=canonical_uri)
-            return str(soup)
+            with self.timings.stage("serialize"):
+                return {"html": str(soup)}
 
-        soup = self._required_modernization_changes(soup)
-
-        context.update(
-            {
-                "content": str(soup),
-                "canonical_uri": canonical_uri if canonical_uri != req_uri else None,
-            }
-        )
-        template_name = "original_docs.html"
+        transformed = self.content_dict.get("content_transformed")
+        if transformed and not is_in_fully_modernized_libs(self.request.path):
+            # the transforms below already ran at ingest, see transform_docs_content()
+            html = transformed
+        else:
+            with self.timings.stage("parse"):
+                soup = BeautifulSoup(content, "html.parser")
+            with self.timings.stage("modernize"):
+                soup = self._required_modernization_changes(soup)
+            with self.timings.stage("serialize"):
+                html = str(soup)
+
+        context_update = {
+            "content": html,
+            "canonical_uri": canonical_uri if canonical_uri != req_uri else None,
+        }
 
         if is_in_fully_modernized_libs(self.request.path):
             # prepare a fully modernized version in an iframe
             logger.info(f"fully modernized lib {self.request.path=}")
-            context_update = self._fully_modernize_content(
-                soup, self.establish_source_content_type(self.request.path)
-            )
-            context.update(context_update)
-            template_name = "docsiframe.html"
+            with self.timings.stage("modernize"):
+                context_update.update(
+                    self._fully_modernize_content(
+                        soup, self.establish_source_content_type(self.request.path)
+                    )
+                )
 
         if is_in_no_wrapper_libs(self.request.path):
-            context["no_wrapper"] = True
+            context_update["no_wrapper"] = True
+
+        context_update["content"] = self._required_content_string_changes(
+            context_update["content"]
+        )
 
-        context["content"] = self._required_content_string_changes(context["content"])
+        if is_in_fully_modernized_libs(self.request.path):
+            return {"context": context_update}
 
-        return render_to_string(template_name, context, request=self.request)
+        context = super().get_context_data()
+        context.update(context_update)
+        with self.timings.stage("render"):
+            html = render_to_string("original_docs.html", context, request=self.request)
+        return {"html": html}
+
+    def render_processed_content(self, processed: dict) -> str:
+        """Return the final html for a result of build_processed_content."""
+        if "html" in processed:
+            self.precompressed = processed.get("precompressed", {})
+            self.etag = processed.get("etag")
+            return processed["html"]
+        context = super().get_context_data()
+        context.update(processed["context"])
+        with self.timings.stage("render"):
+            return render_to_string("docsiframe.html", context, request=self.request)
 
     def establish_source_content_type(self, path: str) -> SourceDocType:
         source_content_type = self.content_dict.get("source_content_type")
@@ -806,11 +1144,15 @@ class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
         #  will continue to be cached as they were
 
         result = None
+        cache_key = f"static_content_{content_path}"
+        # used by process_content to look up the processed html for this content
+        self.cache_key = cache_key
         if ENABLE_DB_CACHE:
-            cache_key = f"static_content_{content_path}"
             # check to see if in db, if not retrieve from s3 and save to db
-            result = self.get_from_database(cache_key)
-            if not result and (result := self.get_from_s3(content_path)):
+            if result := self.get_from_database(cache_key):
+                self.timings.cache_tier = "database"
+            elif result := self.get_from_s3(content_path):
+                self.timings.cache_tier = "s3"
                 self.save_to_database(cache_key, result)
             if result:
                 refresh_start = SiteSettings.load().rendered_content_replacement_start
@@ -820,10 +1162,12 @@ class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
                         f"/archives/boost_{content_path}", cache_key
                     )
         elif content_data := self.get_from_s3(content_path):
+            self.timings.cache_tier = "s3"
             # structure is to allow for redirect/return to be handled in a unified way
             result = {
                 "content": content_data.get("content"),
                 "content_type": content_data.get("content_type"),
+                "last_modified": content_data.get("last_modified"),
             }
 
         if result is None:
@@ -914,9 +1258,8 @@ class DocLibsTemplateView(VersionAlertMixin, BaseStaticContentTemplateView):
 
 
 class UserGuideTemplateView(BaseStaticContentTemplateView):
-    def get_from_s3(self, content_path):
-        legacy_url = f"/doc/{content_path}"
-        return super().get_from_s3(legacy_url)
+    def get_s3_key(self, content_path):
+        return f"/doc/{content_path}"
 
     def process_content(self, content):
         """Replace page header with the local one."""
@@ -933,9 +1276,10 @@ class UserGuideTemplateView(BaseStaticContentTemplateView):
         context = {"disable_theme_switcher": False}
         # TODO: investigate if this base_html + template can be removed completely,
         #  seems unused
-        base_html = render_to_string(
-            "userguide_placeholder.html", context, request=self.request
-        )
+        with self.timings.stage("render"):
+            base_html = render_to_string(
+                "userguide_placeholder.html", context, request=self.request
+            )
         insert_body = modernize == "max"
         head_selector = (
             "head"
@@ -944,28 +1288,50 @@ class UserGuideTemplateView(BaseStaticContentTemplateView):
         )
         # potentially pass version if needed for HTML modification
         context["skip_use_boostbook_v2"] = True
-        base_html = render_to_string(
-            "docs_libs_placeholder.html", context, request=self.request
-        )
+        with self.timings.stage("render"):
+            base_html = render_to_string(
+                "docs_libs_placeholder.html", context, request=self.request
+            )
         context["hide_footer"] = True
         context["full_width"] = True
-        soup = BeautifulSoup(content, "html.parser")
-        context["content"] = modernize_legacy_page(
-            soup,
-            base_html,
-            insert_body=insert_body,
-            head_selector=head_selector,
-            original_docs_type=SourceDocType.ANTORA,
-            show_footer=False,
-            show_navbar=False,
-        )
-        return render_to_string("docsiframe.html", context, request=self.request)
+        with self.timings.stage("parse"):
+            soup = BeautifulSoup(content, "html.parser")
+        # modernize_legacy_page() also serializes the page
+        with self.timings.stage("modernize"):
+            context["content"] = modernize_legacy_page(
+                soup,
+                base_html,
+                insert_body=insert_body,
+                head_selector=head_selector,
+                original_docs_type=SourceDocType.ANTORA,
+                show_footer=False,
+                show_navbar=False,
+            )
+        with self.timings.stage("render"):
+            return render_to_string("docsiframe.html", context, request=self.request)
 
 
 class ModernizedDocsView(View):
     """Special case view for handling sub-pages of the Boost.Preprocessor docs."""
 
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        response = get_validated_response(request, response)
+        return add_surrogate_keys(
+            response, get_content_surrogate_keys(self.kwargs["content_path"])
+        )
+
     def get(self, request, content_path):
+        # The sidebar and main panes are swapped in by HTMX on every click, so the
+        # transformed pages are cached, per host since the <base> tag includes it.
+        # They come from S3 directly and aren't invalidated, so not for long.
+        cache_key = f"static_content_{content_path}"
+        variant = get_processed_content_variant(
+            "", "modernized_docs", "", request.build_absolute_uri(request.path)
+        )
+        if processed := get_processed_content(cache_key, variant):
+            return HttpResponse(processed["html"], content_type="text/html")
+
         soup, response = self._load_and_transform_html(content_path, request)
         if response:
             return response  # Early return for non-HTML content
@@ -975,6 +1341,12 @@ class ModernizedDocsView(View):
         self._inject_script(soup)
 
         html = str(soup)
+        set_processed_content(
+            cache_key,
+            variant,
+            {"html": html},
+            timeout=settings.MODERNIZED_DOCS_CACHE_TIMEOUT,
+        )
         return HttpResponse(html, content_type="text/html")
 
     def _load_and_transform_html(self, content_path, request):
@@ -992,7 +1364,9 @@ class ModernizedDocsView(View):
                 content or "", content_type=content_type or "text/plain"
             )
 
-        html = content.decode(chardet.detect(content)["encoding"])
+        # S3 content is re-encoded to UTF-8 when it's fetched, see extract_file_data()
+        charset = result.get("charset") or detect_charset(content, content_type)
+        html = content.decode(charset or "utf-8", errors="replace")
 
         if content_type.startswith("text/x-c"):
             soup = self._process_cpp_code(html)
@@ -1067,9 +1441,61 @@ class ModernizedDocsView(View):
                 del a["target"]
 
 
+def get_validated_response(request, response, last_modified=None):
+    """Add an ETag to a full response, and Last-Modified if it's known, then
+    return a 304 instead when the request's conditional headers match them."""
+    if response.status_code != 200 or response.streaming:
+        return response
+    if not response.has_header("ETag"):
+        response["ETag"] = get_etag(response.content)
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    return get_conditional_response(
+        request,
+        etag=response["ETag"],
+        last_modified=last_modified,
+        response=response,
+    )
+
+
+def parse_range_header(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single range "Range: bytes=..." header for a body of `size` bytes.
+
+    Returns the inclusive (start, end) byte offsets, or None if there is no usable
+    range and the whole body should be returned. Raises ValueError when the range
+    can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, sep, end = header[len("bytes=") :].strip().partition("-")
+    if not sep or not (start or end):
+        return None
+    try:
+        if not start:
+            # suffix range, the last `end` bytes
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError(f"Unsatisfiable range {header!r} for {size} bytes")
+    return start, end
+
+
 class ImageView(View):
+    """Serve images from the static content bucket.
+
+    Bodies are streamed in chunks rather than read into memory, Range requests
+    are honoured, and conditional requests are answered with a 304. Full,
+    unconditional responses are also written to a local disk LRU cache so
+    repeat hits on popular images don't go to S3. Cached images older than
+    IMAGE_CACHE_MAX_AGE are revalidated with a conditional HEAD request.
+    """
+
+    chunk_size = 64 * 1024
+
     def get(self, request, *args, **kwargs):
-        # TODO: Add caching logic
         content_path = self.kwargs.get("content_path")
         updated_legacy_path = legacy_path_transform(content_path)
         if updated_legacy_path != content_path:
@@ -1080,18 +1506,162 @@ class ImageView(View):
                 )
             )
 
-        client = get_s3_client()
+        image_cache = get_image_cache()
+        if image_cache and (cached := image_cache.get(content_path)):
+            f, metadata, is_stale = cached
+            if not is_stale or self.revalidate(content_path, image_cache, metadata):
+                return self.get_cached_response(f, metadata)
+            f.close()
+        return self.get_s3_response(content_path, image_cache)
+
+    def revalidate(self, content_path, image_cache, metadata):
+        """Return whether the cached image is still the one in S3, marking it
+        fresh again if it is, and dropping it from the cache if it isn't."""
         try:
-            response = client.get_object(
-                Bucket=settings.STATIC_CONTENT_BUCKET_NAME, Key=content_path
+            get_s3_client().head_object(
+                Bucket=settings.STATIC_CONTENT_BUCKET_NAME,
+                Key=content_path,
+                IfNoneMatch=metadata["etag"],
             )
-            file_data = extract_file_data(response, content_path)
-            content = file_data["content"]
-            content_type = file_data["content_type"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("304", "NotModified"):
+                image_cache.touch(content_path, metadata)
+                return True
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                raise
+        image_cache.delete(content_path)
+        return False
+
+    def get_cached_response(self, f, metadata):
+        """Return the response for an image in the local disk cache, streamed from
+        its open data file f."""
+        response = get_conditional_response(
+            self.request,
+            etag=metadata["etag"],
+            last_modified=metadata["last_modified"],
+        )
+        if response is None:
+            size = metadata["size"]
+            try:
+                byte_range = parse_range_header(self.request.headers.get("Range"), size)
+            except ValueError:
+                f.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+            start, end = byte_range or (0, size - 1)
+            response = StreamingHttpResponse(
+                self.iter_file(f, start, end - start + 1),
+                content_type=metadata["content_type"],
+                status=206 if byte_range else 200,
+            )
+            response["Content-Length"] = end - start + 1
+            if byte_range:
+                response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            f.close()
+        return self.set_image_headers(
+            response, metadata["etag"], metadata["last_modified"]
+        )
 
-            return HttpResponse(content, content_type=content_type)
-        except ContentNotFoundException:
-            raise Http404("Content not found")
+    def get_s3_response(self, content_path, image_cache):
+        """Return a response streaming the image from S3, passing the Range and
+        conditional request headers through to S3."""
+        params = {"Bucket": settings.STATIC_CONTENT_BUCKET_NAME, "Key": content_path}
+        if range_header := self.request.headers.get("Range"):
+            params["Range"] = range_header
+        if if_none_match := self.request.headers.get("If-None-Match"):
+            params["IfNoneMatch"] = if_none_match
+        if if_modified_since := parse_http_date_safe(
+            self.request.headers.get("If-Modified-Since", "")
+        ):
+            params["IfModifiedSince"] = datetime.fromtimestamp(
+                if_modified_since, tz=dt_timezone.utc
+            )
+
+        try:
+            s3_response = get_s3_client().get_object(**params)
+        except ClientError as e:
+            error_code = e.response["Error"]["Code"]
+            if error_code in ("304", "NotModified"):
+                response = HttpResponseNotModified()
+                if (
+                    etag := e.response.get("ResponseMetadata", {})
+                    .get("HTTPHeaders", {})
+                    .get("etag")
+                ):
+                    response["ETag"] = etag
+                return response
+            if error_code == "InvalidRange":
+                return HttpResponse(status=416)
+            if error_code in ("NoSuchKey", "404"):
+                raise Http404("Content not found")
+            raise
+
+        etag = s3_response["ETag"]
+        last_modified = int(s3_response["LastModified"].timestamp())
+        content_type = get_content_type(content_path, s3_response["ContentType"])
+        content_range = s3_response.get("ContentRange")
+
+        writer = None
+        if (
+            image_cache
+            and not content_range
+            and s3_response["ContentLength"] <= image_cache.max_item_size
+        ):
+            writer = image_cache.writer(
+                content_path,
+                {
+                    "content_type": content_type,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                },
+            )
+
+        response = StreamingHttpResponse(
+            self.iter_body(s3_response["Body"], writer),
+            content_type=content_type,
+            status=206 if content_range else 200,
+        )
+        response["Content-Length"] = s3_response["ContentLength"]
+        if content_range:
+            response["Content-Range"] = content_range
+        return self.set_image_headers(response, etag, last_modified)
+
+    def set_image_headers(self, response, etag, last_modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        patch_cache_control(
+            response, public=True, max_age=settings.IMAGE_CACHE_CONTROL_MAX_AGE
+        )
+        return response
+
+    def iter_file(self, f, start, length):
+        with f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(self.chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    def iter_body(self, body, writer=None):
+        """Yield the S3 body in chunks, writing them to the disk cache as they
+        pass if a cache writer is given. The cache entry is only committed once
+        the whole body has been read."""
+        try:
+            for chunk in body.iter_chunks(self.chunk_size):
+                if writer:
+                    writer.write(chunk)
+                yield chunk
+            if writer:
+                writer.commit()
+        finally:
+            if writer:
+                writer.abort()
+            body.close()
 
 
 class BaseRedirectView(View):
@@ -1692,8 +2262,7 @@ class V3ComponentDemoView(V3Mixin, TemplateView):
         ]
         context["markdown_data"] = {
             "title": "Markdown Block",
-            "markdown": dedent(
-                """
+            "markdown": dedent("""
 
             ######Insert anything Required
 
@@ -1703,8 +2272,7 @@ class V3ComponentDemoView(V3Mixin, TemplateView):
             * list
 
             Or **bold** and *italics* and whatever it needs to be formatted or [use links](https://www.example.com)!
-            """
-            ),
+            """),
             "button_url": "#",
             "button_label": "Optional CTA Button",
             "button_style": "primary",
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import structlog
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import HttpRequest
+from django.urls import resolve
+
+from .views import ContentNotFoundException, DocLibsTemplateView
+
+logger = structlog.get_logger()
+
+
+class WarmRequest(HttpRequest):
+    """An anonymous GET of a docs page, as a visitor to DOCS_CACHE_WARM_BASE_URI
+    would make it, so the processed html is cached for the uri visitors use."""
+
+    def __init__(self, path):
+        super().__init__()
+        base_uri = urlsplit(settings.DOCS_CACHE_WARM_BASE_URI)
+        self.method = "GET"
+        self.path = self.path_info = path
+        self.META["HTTP_HOST"] = base_uri.netloc
+        self.base_scheme = base_uri.scheme
+        self.user = AnonymousUser()
+        self.resolver_match = resolve(path)
+
+    def _get_scheme(self):
+        return self.base_scheme
+
+
+def warm_docs_page(content_path: str) -> bool:
+    """Fetch and process a docs page the way DocLibsTemplateView does, so its
+    processed html is cached before the first visitor asks for it.
+
+    Nothing is purged from the CDN, the page is new to it. content_path is relative
+    to /doc/libs/, e.g. "1_90_0/libs/json/doc/html/index.html".
+
+    Returns True if the page was found.
+    """
+    request = WarmRequest(f"/doc/libs/{content_path}")
+    view = DocLibsTemplateView()
+    view.setup(request, **request.resolver_match.kwargs)
+    try:
+        view.content_dict = view.get_content(content_path)
+    except ContentNotFoundException:
+        logger.info("docs_page_warm_not_found", content_path=content_path)
+        return False
+    if not view.content_dict.get("redirect"):
+        view.process_content(view.content_dict["content"])
+    return True
+
+
+def warm_docs_pages(content_paths: list[str]) -> int:
+    """Warm the given docs pages, at most DOCS_CACHE_WARM_WORKERS at a time.
+
+    Returns the number of pages found.
+    """
+
+    def warm(content_path):
+        try:
+            return warm_docs_page(content_path)
+        except Exception:
+            logger.exception("docs_page_warm_failed", content_path=content_path)
+            return False
+        finally:
+            # each thread gets its own database connection
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=settings.DOCS_CACHE_WARM_WORKERS) as executor:
+        warmed = sum(executor.map(warm, content_paths))
+    logger.info("docs_pages_warmed", count=len(content_paths), warmed=warmed)
+    return warmed
@@ -25,3 +25,10 @@ def post_fork(server, worker):
     patch_psycopg()
     worker.log.info("Made Psycopg2 Green")
     monkey.patch_all()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,9 @@
+import fcntl
 import re
+import shutil
 import time
-import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import assert_never
@@ -11,6 +14,7 @@ import structlog
 from ghapi.core import HTTP404NotFoundError
 from fastcore.xtras import obj2dict
 
+from django.conf import settings
 from django.db.models import Exists, OuterRef
 from django.contrib.auth import get_user_model
 from django.db import transaction
@@ -36,6 +40,14 @@ logger = structlog.get_logger()
 
 User = get_user_model()
 
+MIRROR_FETCH_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+# Commit fields read from `git log -z`, NUL delimited: sha, parents, author name,
+# author email (both mailmapped), author date and the raw message.
+GIT_LOG_FIELDS = ["%H", "%P", "%aN", "%aE", "%aI", "%B"]
+GIT_LOG_READ_SIZE = 64 * 1024
+# Emails looked up per query when resolving commit authors
+COMMIT_AUTHOR_EMAIL_BATCH_SIZE = 1000
+
 
 now = timezone.now()
 FIRST_OF_MONTH_ONE_YEAR_AGO = timezone.make_aware(
@@ -66,110 +78,290 @@ class VersionDiffStat:
     deletions: int
 
 
-def get_commit_data_for_repo_versions(key, min_version=""):
+@dataclass
+class ImportedCommitRange:
+    """The commits range read for a version, recorded once its commits are saved.
+
+    rewritten is True when the range was imported before and has since been
+    rewritten, e.g. by a force push, so it was read in full again.
+    """
+
+    version: str
+    start: str
+    sha: str
+    rewritten: bool
+
+
+def get_repo_mirror_dir(github_url: str) -> Path:
+    """Return where the bare clone of the repository at github_url is kept."""
+    repo_name = github_url.rstrip("/").rsplit("/", 1)[-1]
+    return Path(settings.GIT_MIRROR_DIR) / f"{repo_name}.git"
+
+
+@contextmanager
+def mirror_lock(git_dir: Path):
+    """Hold an exclusive lock on the mirror at git_dir.
+
+    git can't run two fetches into the same mirror at once, and libraries may share
+    a repository. The lock is a file lock, so it holds across the threads and
+    processes of every import sharing GIT_MIRROR_DIR.
+    """
+    git_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(git_dir.with_name(f"{git_dir.name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def is_valid_mirror(git_dir: Path) -> bool:
+    """Return True if git_dir is a repository git can read."""
+    completed = subprocess.run(
+        ["git", "--git-dir", str(git_dir), "rev-parse", "--is-bare-repository"],
+        capture_output=True,
+    )
+    return completed.returncode == 0
+
+
+def update_repo_mirror(github_url: str) -> Path | None:
+    """Clone the repository into the mirror directory, or fetch into the clone
+    that's already there. Returns the git directory, or None if it failed.
+
+    Only branches and tags are fetched, the pull request refs GitHub also has
+    would make the clones much larger. A failed fetch is retried into the same
+    mirror, it's only cloned again if it's no longer a valid repository.
+    """
+    git_dir = get_repo_mirror_dir(github_url)
+    with mirror_lock(git_dir):
+        retry_count = 0
+        while retry_count < 5:
+            retry_count += 1
+            if git_dir.exists():
+                completed = subprocess.run(
+                    ["git", "--git-dir", str(git_dir), "fetch", "--prune", "origin"],
+                    capture_output=True,
+                )
+            else:
+                completed = subprocess.run(
+                    ["git", "clone", "--bare", f"{github_url}.git", str(git_dir)],
+                    capture_output=True,
+                )
+                if completed.returncode == 0:
+                    for refspec in MIRROR_FETCH_REFSPECS:
+                        subprocess.run(
+                            [
+                                "git",
+                                "--git-dir",
+                                str(git_dir),
+                                "config",
+                                "--add",
+                                "remote.origin.fetch",
+                                refspec,
+                            ],
+                            check=True,
+                        )
+            if completed.returncode == 0:
+                return git_dir
+            logger.warning(
+                f"{completed.args} failed. Retrying. Retry {retry_count}.",
+                error=completed.stderr.decode(),
+            )
+            if git_dir.exists() and not is_valid_mirror(git_dir):
+                # a broken mirror can't be fetched into, start from a fresh clone
+                shutil.rmtree(git_dir, ignore_errors=True)
+            time.sleep(2**retry_count)
+
+    logger.error(f"Updating the mirror of {github_url} failed.")
+    return None
+
+
+def get_commit_versions(library: Library) -> list[str]:
+    """Return the version names to compare commits between, for the library."""
+    return (
+        [""]
+        + list(
+            Version.objects.minor_versions()
+            .filter(library_version__library__key=library.key)
+            .order_by("version_array")
+            .values_list("name", flat=True)
+        )
+        + ["master"]
+    )
+
+
+def get_imported_commit_ranges(library: Library) -> dict[str, tuple[str, str]]:
+    """Return the start version and last commit of the commits range imported for
+    each of the library's versions, by version name."""
+    return {
+        name: (start, sha)
+        for name, start, sha in LibraryVersion.objects.filter(
+            library=library
+        ).values_list("version__name", "commits_imported_from", "commits_imported_sha")
+    }
+
+
+def get_commit_data_for_repo_versions(key, min_version="", imported=None):
     """Fetch commit data between minor versions (ignore patches).
 
     Get commits from one x.x.0 release to the next x.x.0 release. Commits
     to and from patches or beta versions are ignored.
 
+    imported is the result of get_imported_commit_ranges(), to only read the
+    commits added since the last import.
     """
     library = Library.objects.get(key=key)
-    parser = re.compile(
-        r"^commit (?P<sha>\w+)(?:\n(?P<merge>Merge).*)?\nAuthor: (?P<name>[^\<]+)"
-        r"\s+\<(?P<email>[^\>]+)\>\nDate:\s+(?P<date>.*)\n(?P<message>(.|\n)+?)"
-        r"(?=(commit|\Z))",
-        flags=re.MULTILINE,
+    versions = get_commit_versions(library)
+    git_dir = update_repo_mirror(library.github_url)
+    if not git_dir:
+        return
+    yield from get_commit_data_from_git(git_dir, versions, min_version, imported)
+
+
+def get_commit_sha(git_dir: Path, ref: str) -> str:
+    """Return the sha of the commit ref points to, or "" if it doesn't exist."""
+    completed = subprocess.run(
+        ["git", "--git-dir", str(git_dir), "rev-parse", "--verify", "--quiet"]
+        + [f"{ref}^{{commit}}"],
+        capture_output=True,
     )
-    re.compile(
-        r"(?:(?P<files_changed>\d+) files changed)?.*?"
-        r"(?:(?P<insertions>\d+) insertions)?.*?(?:(?P<deletions>\d+) deletions)?",
+    return completed.stdout.decode().strip()
+
+
+def is_ancestor(git_dir: Path, sha: str, descendant: str) -> bool:
+    completed = subprocess.run(
+        ["git", "--git-dir", str(git_dir), "merge-base", "--is-ancestor"]
+        + [sha, descendant],
+        capture_output=True,
     )
+    return completed.returncode == 0
 
-    retry_count = 0
-    with tempfile.TemporaryDirectory() as temp_dir:
-        git_dir = Path(temp_dir) / f"{library.key}.git"
-        is_clone_successful = False
-        while retry_count < 5:
-            retry_count += 1
-            completed = subprocess.run(
-                ["git", "clone", f"{library.github_url}.git", "--bare", str(git_dir)],
-                capture_output=True,
+
+def iter_nul_delimited(stream, read_size=GIT_LOG_READ_SIZE):
+    """Yield the NUL delimited fields of a binary stream as they are read."""
+    pending = b""
+    while chunk := stream.read(read_size):
+        *fields, pending = (pending + chunk).split(b"\0")
+        yield from fields
+    if pending:
+        yield pending
+
+
+def iter_git_log(git_dir: Path, revisions: list[str], version: str):
+    """Yield the commits git log selects with revisions, parsed while git writes
+    them.
+
+    Raises CalledProcessError after the last commit if git failed, in which case
+    the commits yielded may not be all of them.
+    """
+    process = subprocess.Popen(
+        [
+            "git",
+            "--git-dir",
+            str(git_dir),
+            "log",
+            "-z",
+            f"--format={'%x00'.join(GIT_LOG_FIELDS)}",
+            *revisions,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        fields = iter_nul_delimited(process.stdout)
+        # each commit is GIT_LOG_FIELDS consecutive fields
+        for values in zip(*[fields] * len(GIT_LOG_FIELDS)):
+            sha, parents, name, email, date, message = (
+                value.decode(errors="replace") for value in values
             )
-            message = completed.stdout.decode()
-            error = completed.stderr.decode()
-            # successful output always startswith 'Cloning into bare repository'
-            # Clone message comes out from stderr, not stdout
-            if not error.startswith("Cloning into bare repository"):
-                logger.warning(
-                    f"{completed.args} failed. Retrying git clone. Retry {retry_count}."
-                )
-                time.sleep(2**retry_count)
-                continue
-            else:
-                is_clone_successful = True
-                break
-        if not is_clone_successful:
-            logger.error(f"Clone failed for {library.key}. {message=} {error=}")
-            return
-        versions = (
-            [""]
-            + list(
-                Version.objects.minor_versions()
-                .filter(library_version__library__key=library.key)
-                .order_by("version_array")
-                .values_list("name", flat=True)
+            committed_at = dateparse.parse_datetime(date)
+            assert committed_at  # should always exist
+            yield ParsedCommit(
+                email=email.strip(),
+                name=name.strip(),
+                message=message.strip("\n"),
+                sha=sha,
+                committed_at=committed_at,
+                is_merge=len(parents.split()) > 1,
+                version=version,
             )
-            + ["master"]
+    finally:
+        process.stdout.close()
+        # git only writes errors, which fit in the pipe while stdout is read
+        stderr = process.stderr.read()
+        process.stderr.close()
+        process.wait()
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, process.args, stderr=stderr
         )
-        for a, b in zip(versions, versions[1:]):
-            if a < min_version and b < min_version:
-                # Don't bother comparing two versions we don't care about
+
+
+def get_commit_data_from_git(
+    git_dir: Path, versions: list[str], min_version="", imported=None
+):
+    """Yield the diff stats and commits between each pair of versions.
+
+    A range imported before, per imported, is skipped when it hasn't changed,
+    and only its new commits are read when commits were added. If the range was
+    rewritten, e.g. by a force push, it's read in full again.
+    """
+    imported = imported or {}
+    for a, b in zip(versions, versions[1:]):
+        if a < min_version and b < min_version:
+            # Don't bother comparing two versions we don't care about
+            continue
+        sha = get_commit_sha(git_dir, b)
+        start, imported_sha = imported.get(b, ("", ""))
+        revisions = [f"{a}..{b}"]
+        rewritten = False
+        if start == a and imported_sha and sha:
+            if imported_sha == sha:
+                # nothing was added since the last import
                 continue
-            shortstat = subprocess.run(
-                ["git", "--git-dir", str(git_dir), "diff", f"{a}..{b}", "--shortstat"],
-                capture_output=True,
-            )
-            stat_output = shortstat.stdout.decode()
-            files_changed = insertions = deletions = 0
-            if m := re.search(r"(\d+) files? changed", stat_output):
-                files_changed = int(m.group(1))
-            if m := re.search(r"(\d+) insertions?", stat_output):
-                insertions = int(m.group(1))
-            if m := re.search(r"(\d+) deletions?", stat_output):
-                deletions = int(m.group(1))
-            yield VersionDiffStat(
-                version=b,
-                insertions=insertions,
-                deletions=deletions,
-                files_changed=files_changed,
+            if is_ancestor(git_dir, imported_sha, sha):
+                # the commits in a..b that weren't in it at the last import
+                revisions.append(f"^{imported_sha}")
+            else:
+                logger.info(f"Commits range {a}..{b} was rewritten, reading it all.")
+                rewritten = True
+        shortstat = subprocess.run(
+            ["git", "--git-dir", str(git_dir), "diff", f"{a}..{b}", "--shortstat"],
+            capture_output=True,
+        )
+        if shortstat.returncode:
+            logger.warning(
+                f"Comparing {a}..{b} failed, skipping it.",
+                error=shortstat.stderr.decode(errors="replace"),
             )
+            continue
+        stat_output = shortstat.stdout.decode()
+        files_changed = insertions = deletions = 0
+        if m := re.search(r"(\d+) files? changed", stat_output):
+            files_changed = int(m.group(1))
+        if m := re.search(r"(\d+) insertions?", stat_output):
+            insertions = int(m.group(1))
+        if m := re.search(r"(\d+) deletions?", stat_output):
+            deletions = int(m.group(1))
+        yield VersionDiffStat(
+            version=b,
+            insertions=insertions,
+            deletions=deletions,
+            files_changed=files_changed,
+        )
 
-            log_output = subprocess.run(
-                ["git", "--git-dir", str(git_dir), "log", f"{a}..{b}", "--date", "iso"],
-                capture_output=True,
+        try:
+            yield from iter_git_log(git_dir, revisions, version=b)
+        except subprocess.CalledProcessError as e:
+            # Without all the commits, the range must not be recorded as imported,
+            # or as rewritten, which would remove the commits that weren't read.
+            logger.warning(
+                f"Reading the commits in {' '.join(revisions)} failed.",
+                error=e.stderr.decode(errors="replace"),
             )
-            commits = log_output.stdout.decode()
-            for match in parser.finditer(commits):
-                groups = match.groupdict()
-                name = groups["name"].strip()
-                email = groups["email"].strip()
-                sha = groups["sha"].strip()
-                is_merge = bool(groups.get("merge", False))
-                message = groups["message"].strip("\n")
-                message = "\n".join(
-                    [m[4:] if m.startswith("    ") else m for m in message.split("\n")]
-                )
-                committed_at = dateparse.parse_datetime(groups["date"])
-                assert committed_at  # should always exist
-                yield ParsedCommit(
-                    email=email,
-                    name=name,
-                    message=message,
-                    sha=sha,
-                    committed_at=committed_at,
-                    is_merge=is_merge,
-                    version=b,
-                )
+            continue
+        if sha:
+            yield ImportedCommitRange(version=b, start=a, sha=sha, rewritten=rewritten)
 
 
 class LibraryUpdater:
@@ -464,49 +656,27 @@ class LibraryUpdater:
                     exc_msg=str(e),
                 )
 
-    def update_commits(self, library: Library, clean=False, min_version=""):
-        """Import a record of all commits between LibraryVersions."""
-        authors = {}
-        commits = []
+    def update_commits(
+        self, library: Library, clean=False, min_version="", commit_data=None
+    ):
+        """Import a record of all commits between LibraryVersions.
+
+        commit_data is the library's commit data, from get_commit_data_from_git(),
+        when its mirror was already updated. Otherwise the mirror is updated and
+        read here.
+        """
+        parsed_commits = []
         library_versions = {
             x.version.name: x
             for x in LibraryVersion.objects.filter(
                 library=library, version__name__gte=min_version
             ).select_related("version")
         }
-        library_version_updates = []
-
-        def handle_commit(commit: ParsedCommit):
-            author = authors.get(commit.email, None)
-            if not author:
-                if (
-                    commit_author_email := CommitAuthorEmail.objects.filter(
-                        email=commit.email,
-                    )
-                    .select_related("author")
-                    .first()
-                ):
-                    author = commit_author_email.author
-                else:
-                    author = CommitAuthor.objects.create(
-                        name=commit.name, avatar_url=commit.avatar_url
-                    )
-                    CommitAuthorEmail.objects.create(email=commit.email, author=author)
-                authors[commit.email] = author
-
-            try:
-                library_version = library_versions[commit.version]
-                return Commit(
-                    author=author,
-                    library_version=library_version,
-                    sha=commit.sha,
-                    message=commit.message,
-                    committed_at=commit.committed_at,
-                    is_merge=commit.is_merge,
-                )
-
-            except KeyError:
-                return None
+        library_version_updates = {}
+        # the commits read for each version, and the versions whose imported range
+        # was rewritten since
+        version_shas = defaultdict(set)
+        rewritten_ranges = []
 
         def handle_version_diff_stat(diff: VersionDiffStat):
             try:
@@ -520,24 +690,63 @@ class LibraryUpdater:
             lv.files_changed = diff.files_changed
             return lv
 
+        def handle_imported_range(imported_range: ImportedCommitRange):
+            lv = library_versions.get(imported_range.version)
+            if not lv:
+                return None
+            lv.commits_imported_from = imported_range.start
+            lv.commits_imported_sha = imported_range.sha
+            if imported_range.rewritten:
+                rewritten_ranges.append(lv)
+            return lv
+
+        if commit_data is None:
+            commit_data = get_commit_data_for_repo_versions(
+                library.key,
+                min_version,
+                imported={} if clean else get_imported_commit_ranges(library),
+            )
         commits_handled = 0
-        for item in get_commit_data_for_repo_versions(library.key, min_version):
+        for item in commit_data:
             match item:
                 case ParsedCommit():
-                    commit_item = handle_commit(item)
-                    if commit_item:
-                        commits.append(commit_item)
+                    if item.version in library_versions:
+                        parsed_commits.append(item)
+                        version_shas[item.version].add(item.sha)
                         commits_handled += 1
                 case VersionDiffStat():
                     lv_update = handle_version_diff_stat(item)
                     if lv_update:
-                        library_version_updates.append(lv_update)
+                        library_version_updates[lv_update.pk] = lv_update
+                case ImportedCommitRange():
+                    lv_update = handle_imported_range(item)
+                    if lv_update:
+                        library_version_updates[lv_update.pk] = lv_update
                 case _:
                     assert_never()
 
         with transaction.atomic():
+            authors = self.get_commit_authors(parsed_commits)
+            commits = [
+                Commit(
+                    author=authors[commit.email],
+                    library_version=library_versions[commit.version],
+                    sha=commit.sha,
+                    message=commit.message,
+                    committed_at=commit.committed_at,
+                    is_merge=commit.is_merge,
+                )
+                for commit in parsed_commits
+            ]
             if clean:
                 Commit.objects.filter(library_version__library=library).delete()
+            else:
+                # a rewritten range was read again in full, the commits it no
+                # longer has were dropped from it, e.g. by a force push
+                for lv in rewritten_ranges:
+                    Commit.objects.filter(library_version=lv).exclude(
+                        sha__in=version_shas[lv.version.name]
+                    ).delete()
             Commit.objects.bulk_create(
                 commits,
                 update_conflicts=True,
@@ -545,11 +754,52 @@ class LibraryUpdater:
                 unique_fields=["library_version", "sha"],
             )
             LibraryVersion.objects.bulk_update(
-                library_version_updates,
-                ["insertions", "deletions", "files_changed"],
+                library_version_updates.values(),
+                [
+                    "insertions",
+                    "deletions",
+                    "files_changed",
+                    "commits_imported_from",
+                    "commits_imported_sha",
+                ],
             )
         return commits_handled
 
+    def get_commit_authors(
+        self, commits: list[ParsedCommit]
+    ) -> dict[str, CommitAuthor]:
+        """Return the CommitAuthor of each email in commits, by email.
+
+        Authors are looked up in batches, and the ones not seen before are
+        created together, named after the first of their commits.
+        """
+        commits_by_email = {}
+        for commit in commits:
+            commits_by_email.setdefault(commit.email, commit)
+        emails = list(commits_by_email)
+
+        authors = {}
+        for i in range(0, len(emails), COMMIT_AUTHOR_EMAIL_BATCH_SIZE):
+            for commit_author_email in CommitAuthorEmail.objects.filter(
+                email__in=emails[i : i + COMMIT_AUTHOR_EMAIL_BATCH_SIZE]
+            ).select_related("author"):
+                authors[commit_author_email.email] = commit_author_email.author
+
+        missing = [commits_by_email[e] for e in emails if e not in authors]
+        new_authors = CommitAuthor.objects.bulk_create(
+            [CommitAuthor(name=c.name, avatar_url=c.avatar_url) for c in missing]
+        )
+        CommitAuthorEmail.objects.bulk_create(
+            [
+                CommitAuthorEmail(email=commit.email, author=author)
+                for commit, author in zip(missing, new_authors)
+            ]
+        )
+        authors.update(
+            (commit.email, author) for commit, author in zip(missing, new_authors)
+        )
+        return authors
+
     def update_commit_author_github_data(self, obj=None, email=None, overwrite=False):
         """Update CommitAuthor data by parsing data on their most recent commit."""
         if email:
@@ -1,6 +1,7 @@
 import djclick as click
 from libraries.github import LibraryUpdater
 from libraries.models import Library
+from libraries.tasks import update_commits
 
 
 @click.command()
@@ -10,9 +11,7 @@ def command(key, clean):
     updater = LibraryUpdater()
     click.secho("Importing individual library commits...", fg="green")
     if key is None:
-        for library in Library.objects.all():
-            click.secho(f"Importing commits for {library}")
-            updater.update_commits(library, clean=clean)
+        update_commits(clean=clean)
         updater.update_commit_author_github_data()
     else:
         library = Library.objects.get(key=key)
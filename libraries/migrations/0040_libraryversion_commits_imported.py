@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("libraries", "0039_flag_known_bot_commit_authors"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="libraryversion",
+            name="commits_imported_from",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The version the imported commits range starts at.",
+                max_length=100,
+            ),
+        ),
+        migrations.AddField(
+            model_name="libraryversion",
+            name="commits_imported_sha",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The last commit of the imported commits range.",
+                max_length=40,
+            ),
+        ),
+    ]
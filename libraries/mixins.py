@@ -50,7 +50,7 @@ class VersionAlertMixin:
 
                 version_alert_url = (
                     content.latest_path
-                    if content
+                    if content and content.latest_path is not None
                     else determine_latest_url(
                         content_path,
                         Version.objects.most_recent(),
@@ -490,6 +490,20 @@ class LibraryVersion(models.Model):
     insertions = models.IntegerField(default=0)
     deletions = models.IntegerField(default=0)
     files_changed = models.IntegerField(default=0)
+    # the range of commits last imported for this library-version, so the next
+    # import only walks the commits added since
+    commits_imported_from = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="The version the imported commits range starts at.",
+    )
+    commits_imported_sha = models.CharField(
+        max_length=40,
+        blank=True,
+        default="",
+        help_text="The last commit of the imported commits range.",
+    )
     cpp_standard_minimum = models.CharField(max_length=50, blank=True, null=True)
     cpp20_module_support = models.BooleanField(default=False)
     dependencies = models.ManyToManyField(
@@ -6,6 +6,7 @@ from botocore.client import BaseClient
 from botocore.exceptions import ClientError
 from django.conf import settings
 
+from core.docs_path_index import SortedKeyIndex
 from versions.models import Version
 import structlog
 
@@ -37,7 +38,8 @@ class BasePathMatcher(metaclass=ABCMeta):
         1. we check to see if the provided path matches the Extended class's path_re regex.
         2. if no regex match we move to the next matcher in the chain
         3. if regex matches we check the DB to see if a matching path is found and fallback to a checking S3 to see if
-         it just hasn't been cached.
+         it just hasn't been cached. When a docs path index of the latest version is available it is checked instead
+         of S3.
         4. if no match on db or s3 and the matcher is flagged as is_index_fallback=True we return that as a match
         5. otherwise we then move on to the next matcher in the chain
 
@@ -61,9 +63,15 @@ class BasePathMatcher(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
-    def __init__(self, latest_version: Version, s3_client: BaseClient):
+    def __init__(
+        self,
+        latest_version: Version,
+        s3_client: BaseClient,
+        docs_index: SortedKeyIndex | None = None,
+    ):
         self.latest_version: Version = latest_version
         self.s3_client: BaseClient = s3_client
+        self.docs_index: SortedKeyIndex | None = docs_index
         self.next: BasePathMatcher | None = None
         self.latest_slug: str = self.latest_version.stripped_boost_url_slug
 
@@ -114,11 +122,23 @@ class BasePathMatcher(metaclass=ABCMeta):
     def confirm_path_exists(self, path: str, segments: PathSegments) -> bool:
         s3_path = self.generate_latest_s3_path(path, segments)
         logger.debug(f"{s3_path=}")
+        if self.docs_index is not None:
+            return (
+                self.confirm_index_path_exists(s3_path)
+                or self.confirm_db_path_exists(s3_path)
+            )  # fmt: skip
         return (
             self.confirm_db_path_exists(s3_path)
             or self.confirm_s3_path_exists(s3_path)
         )  # fmt: skip
 
+    def confirm_index_path_exists(self, path: str) -> bool:
+        # index keys are relative to the archive, e.g. doc/html/accumulators.html
+        key = path.removeprefix(f"static_content_{self.latest_slug}/")
+        exists = key in self.docs_index
+        logger.debug(f"Docs path index {exists=} for {path=}")
+        return exists
+
     def confirm_s3_path_exists(self, path: str) -> bool:
         # s3 stored, e.g. archives/boost_1_90_0/doc/html/accumulators.html
         archive_key = path.replace("static_content_", "archives/boost_")
@@ -1,4 +1,10 @@
-from libraries.path_matcher.base_path_matcher import PathMatchResult
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from core.boostrenderer import get_s3_client
+from core.docs_path_index import get_docs_path_index
+from libraries.path_matcher.base_path_matcher import BasePathMatcher, PathMatchResult
 from libraries.path_matcher.matchers import (
     DirectMatcher,
     LibsPathToLatestDirectMatcher,
@@ -9,12 +15,13 @@ from libraries.path_matcher.matchers import (
     DocHtmlBoostHtmlFallbackPathMatcher,
     ToLibsLatestRootFallbackMatcher,
 )
-from libraries.utils import get_s3_client
 from versions.models import Version
 
 
-def get_path_match_from_chain(url: str, latest_version: Version) -> PathMatchResult:
+def get_matcher_chain(latest_version: Version) -> BasePathMatcher:
+    """Return the first matcher of the chain, sharing one s3 client and docs index."""
     s3_client = get_s3_client()
+    docs_index = get_docs_path_index(latest_version.stripped_boost_url_slug)
 
     # matcher chain in order
     matcher_classes = [
@@ -29,12 +36,52 @@ def get_path_match_from_chain(url: str, latest_version: Version) -> PathMatchRes
     ]
 
     matchers = [
-        matcher_class(latest_version, s3_client) for matcher_class in matcher_classes
+        matcher_class(latest_version, s3_client, docs_index)
+        for matcher_class in matcher_classes
     ]
     for current, next_matcher in zip(matchers, matchers[1:]):
         current.set_next(next_matcher)
-    result = matchers[0].handle(test_path=url)
-    return result
+    return matchers[0]
+
+
+def get_path_match_from_chain(url: str, latest_version: Version) -> PathMatchResult:
+    return get_matcher_chain(latest_version).handle(test_path=url)
+
+
+def get_path_matches_from_chain(
+    urls: list[str], latest_version: Version, max_workers: int = 1
+) -> dict[str, PathMatchResult]:
+    """Match many urls against one matcher chain, using up to max_workers threads.
+
+    Urls without a match are left out of the result.
+    """
+    matcher = get_matcher_chain(latest_version)
+
+    def match_urls(urls_slice):
+        results = {}
+        for url in urls_slice:
+            try:
+                results[url] = matcher.handle(test_path=url)
+            except ValueError:
+                pass
+        return results
+
+    if max_workers <= 1 or len(urls) <= 1:
+        return match_urls(urls)
+
+    def match_urls_in_thread(urls_slice):
+        try:
+            return match_urls(urls_slice)
+        finally:
+            # each thread gets its own database connection
+            connection.close()
+
+    results = {}
+    slices = [urls[i::max_workers] for i in range(max_workers)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for slice_results in executor.map(match_urls_in_thread, slices):
+            results.update(slice_results)
+    return results
 
 
 def determine_latest_url(url: str, latest_version: Version) -> str:
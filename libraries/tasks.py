@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
 
 from celery import shared_task, chain
@@ -11,7 +12,13 @@ from django.conf import settings
 from django.db.models import Q, Count, Sum, OuterRef
 from core.boostrenderer import get_content_from_s3
 from core.htmlhelper import get_library_documentation_urls
-from libraries.github import LibraryUpdater
+from libraries.github import (
+    LibraryUpdater,
+    get_commit_data_from_git,
+    get_commit_versions,
+    get_imported_commit_ranges,
+    update_repo_mirror,
+)
 from libraries.models import (
     Library,
     LibraryVersion,
@@ -51,6 +58,24 @@ def update_library_version_documentation_urls_all_versions():
         get_and_store_library_version_documentation_urls_for_version(version.pk)
 
 
+@app.task
+def warm_library_docs_cache(version_pk):
+    """Process the docs landing page of each library in a version ahead of time,
+    so the first visitors after a release don't pay for it."""
+    from core.warming import warm_docs_pages
+
+    documentation_urls = (
+        LibraryVersion.objects.filter(version_id=version_pk, missing_docs=False)
+        .exclude(Q(documentation_url="") | Q(documentation_url__isnull=True))
+        .values_list("documentation_url", flat=True)
+    )
+    # e.g. /doc/libs/1_90_0/libs/json/index.html#anchor -> 1_90_0/libs/json/index.html
+    content_paths = {
+        url.split("#")[0].removeprefix("/doc/libs/") for url in documentation_urls
+    }
+    return warm_docs_pages(sorted(content_paths))
+
+
 @app.task
 def get_and_store_library_version_documentation_urls_for_version(version_pk):
     """
@@ -221,16 +246,41 @@ def update_authors_and_maintainers():
 
 @app.task
 def update_commits(token=None, clean=False, min_version=""):
+    """Import the commits of all libraries.
+
+    The libraries' mirrors are fetched in a pool of COMMIT_IMPORT_WORKERS threads.
+    As each fetch finishes, its log is streamed and saved from this thread, so the
+    database work isn't concurrent and only one library's commits are in memory.
+    """
     # dictionary of library_key: int
     commits_handled: dict[str, int] = {}
     updater = LibraryUpdater(token=token)
     all_libs = Library.objects.all()
     lib_count = len(all_libs)
-    for idx, library in enumerate(all_libs):
-        logger.info(f"Importing commits for library {library} ({idx}/{lib_count}).")
-        commits_handled[library.key] = updater.update_commits(
-            library=library, clean=clean, min_version=min_version
-        )
+    with ThreadPoolExecutor(max_workers=settings.COMMIT_IMPORT_WORKERS) as executor:
+        futures = {
+            executor.submit(update_repo_mirror, library.github_url): library
+            for library in all_libs
+        }
+        for idx, future in enumerate(as_completed(futures)):
+            library = futures[future]
+            if not (git_dir := future.result()):
+                # without its commits, a clean import would remove them all
+                logger.warning(f"Skipping commits for library {library}.")
+                commits_handled[library.key] = 0
+                continue
+            logger.info(f"Importing commits for library {library} ({idx}/{lib_count}).")
+            commits_handled[library.key] = updater.update_commits(
+                library=library,
+                clean=clean,
+                min_version=min_version,
+                commit_data=get_commit_data_from_git(
+                    git_dir,
+                    get_commit_versions(library),
+                    min_version,
+                    {} if clean else get_imported_commit_ranges(library),
+                ),
+            )
     logger.info("update_commits finished.")
     return commits_handled
 
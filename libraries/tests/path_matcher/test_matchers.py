@@ -12,7 +12,11 @@ from libraries.path_matcher import (
     DocHtmlBoostHtmlFallbackPathMatcher,
     ToLibsLatestRootFallbackMatcher,
 )
-from libraries.path_matcher.utils import get_path_match_from_chain, determine_latest_url
+from libraries.path_matcher.utils import (
+    determine_latest_url,
+    get_path_match_from_chain,
+    get_path_matches_from_chain,
+)
 
 test_params = [
     (
@@ -231,3 +235,37 @@ def test_s3_archive_key_prefix(version):
     assert call_kwargs["Key"] == expected_archive_key
     assert call_kwargs["Key"].startswith("archives/")
     assert "archives/boost_" in call_kwargs["Key"]
+
+
+def test_confirm_path_exists_uses_docs_index(monkeypatch, version):
+    from core.docs_path_index import SortedKeyIndex
+
+    monkeypatch.setattr(BasePathMatcher, "confirm_db_path_exists", lambda x, y: False)
+    mock_s3_client = MagicMock()
+    docs_index = SortedKeyIndex(["doc/html/accumulators.html"])
+    matcher = DirectMatcher(version, mock_s3_client, docs_index)
+
+    assert matcher.handle("1_84_0/doc/html/accumulators.html").matcher == (
+        "DirectMatcher"
+    )
+    segments = matcher.get_group_items("1_84_0/doc/html/missing.html")
+    assert not matcher.confirm_path_exists("1_84_0/doc/html/missing.html", segments)
+    mock_s3_client.head_object.assert_not_called()
+
+
+def test_get_path_matches_from_chain(monkeypatch, version):
+    monkeypatch.setattr(BasePathMatcher, "confirm_db_path_exists", lambda x, y: False)
+    monkeypatch.setattr(BasePathMatcher, "confirm_s3_path_exists", lambda x, y: False)
+    monkeypatch.setattr(
+        DocHtmlBoostHtmlFallbackPathMatcher, "confirm_db_path_exists", lambda x, y: True
+    )
+    urls = ["1_34_0/doc/html/boost_math.html", "1_78_0/libs/json/doc/html/a.html"]
+
+    with patch("libraries.path_matcher.utils.get_s3_client") as mock_get_s3_client:
+        results = get_path_matches_from_chain(urls, version)
+
+    mock_get_s3_client.assert_called_once()
+    assert {url: result.latest_path for url, result in results.items()} == {
+        "1_34_0/doc/html/boost_math.html": "doc/libs/latest/libs/math/doc/html/index.html",
+        "1_78_0/libs/json/doc/html/a.html": "doc/libs/latest/libs/json/index.html",
+    }
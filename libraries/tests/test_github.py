@@ -1,12 +1,33 @@
+import io
+import subprocess
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.utils import timezone
 from ghapi.all import GhApi
 from model_bakery import baker
 
-from libraries.github import LibraryUpdater
+from libraries.github import (
+    ImportedCommitRange,
+    LibraryUpdater,
+    ParsedCommit,
+    VersionDiffStat,
+    get_commit_data_from_git,
+    get_commit_sha,
+    iter_git_log,
+    iter_nul_delimited,
+    update_repo_mirror,
+)
 from core.githubhelper import GithubAPIClient
-from libraries.models import Category, Issue, Library, LibraryVersion, PullRequest
+from libraries.models import (
+    Category,
+    Commit,
+    CommitAuthorEmail,
+    Issue,
+    Library,
+    LibraryVersion,
+    PullRequest,
+)
 
 
 @pytest.fixture
@@ -105,6 +126,76 @@ def test_update_authors(library_updater, user, library_version):
     assert library.authors.filter(email="tester2_testerson2@example.com").exists()
 
 
+def test_update_commits_resolves_authors(library_updater, library_version):
+    existing = baker.make("libraries.CommitAuthor", name="Existing")
+    baker.make("libraries.CommitAuthorEmail", author=existing, email="old@example.com")
+    version = library_version.version.name
+
+    def parsed(sha, email, name, version=version):
+        return ParsedCommit(
+            email=email,
+            name=name,
+            message=f"Commit {sha}",
+            sha=sha,
+            version=version,
+            is_merge=False,
+            committed_at=timezone.now(),
+        )
+
+    commit_data = [
+        parsed("a1", "old@example.com", "Old Name"),
+        parsed("a2", "new@example.com", "New Author"),
+        parsed("a3", "new@example.com", "Renamed Author"),
+        # commits of versions without a LibraryVersion are skipped
+        parsed("a4", "other@example.com", "Other", version="boost-0.0.0"),
+    ]
+    handled = library_updater.update_commits(
+        library_version.library, commit_data=commit_data
+    )
+
+    assert handled == 3
+    commits = {c.sha: c for c in Commit.objects.select_related("author")}
+    assert set(commits) == {"a1", "a2", "a3"}
+    assert commits["a1"].author == existing
+    assert commits["a2"].author == commits["a3"].author
+    assert commits["a2"].author.name == "New Author"
+    assert not CommitAuthorEmail.objects.filter(email="other@example.com").exists()
+
+
+@pytest.mark.parametrize("rewritten", [False, True])
+def test_update_commits_removes_commits_of_rewritten_ranges(
+    library_updater, library_version, rewritten
+):
+    """Commits missing from what was read are only removed when the range was
+    rewritten, not when it is read for the first time."""
+    version = library_version.version.name
+    baker.make("libraries.Commit", library_version=library_version, sha="old")
+    commit_data = [
+        ParsedCommit(
+            email="dev@example.com",
+            name="Dev",
+            message="Commit new",
+            sha="new",
+            version=version,
+            is_merge=False,
+            committed_at=timezone.now(),
+        ),
+        ImportedCommitRange(
+            version=version, start="boost-0.0.0", sha="new", rewritten=rewritten
+        ),
+    ]
+    library_updater.update_commits(library_version.library, commit_data=commit_data)
+
+    shas = set(
+        Commit.objects.filter(library_version=library_version).values_list(
+            "sha", flat=True
+        )
+    )
+    assert shas == ({"new"} if rewritten else {"old", "new"})
+    library_version.refresh_from_db()
+    assert library_version.commits_imported_sha == "new"
+
+
 def test_update_maintainers(library_updater, user, library_version):
     assert library_version.maintainers.exists() is False
     user.claimed = True
@@ -387,3 +478,204 @@ def test_parse_boostdep_artifact(
         library__key="numeric/conversion", version__name="boost-1.85.0"
     )
     assert lv.dependencies.count() == 1
+
+
+def git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=Dev", "-c", "user.email=dev@example.com", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def origin_repo(tmp_path):
+    """A local repository with commits on master and a boost-1.80.0 tag."""
+    repo = tmp_path / "origin" / "algorithm.git"
+    repo.mkdir(parents=True)
+    git("init", "-b", "master", cwd=repo)
+    (repo / "a.txt").write_text("a\n")
+    git("add", "a.txt", cwd=repo)
+    git("commit", "-m", "Add a", cwd=repo)
+    git("tag", "boost-1.80.0", cwd=repo)
+    return repo
+
+
+def test_update_repo_mirror_clones_then_fetches(origin_repo, tmp_path, settings):
+    settings.GIT_MIRROR_DIR = str(tmp_path / "mirrors")
+    github_url = str(origin_repo)[: -len(".git")]
+
+    git_dir = update_repo_mirror(github_url)
+    assert git_dir == tmp_path / "mirrors" / "algorithm.git"
+
+    (origin_repo / "b.txt").write_text("b\nb\n")
+    git("add", "b.txt", cwd=origin_repo)
+    git("commit", "-m", "Add b", cwd=origin_repo)
+    with patch("libraries.github.subprocess.run", wraps=subprocess.run) as mock_run:
+        assert update_repo_mirror(github_url) == git_dir
+    # the existing mirror is fetched into, not cloned again
+    assert mock_run.call_args.args[0][3] == "fetch"
+
+    items = list(get_commit_data_from_git(git_dir, ["boost-1.80.0", "master"]))
+    assert items[0] == VersionDiffStat(
+        version="master", files_changed=1, insertions=2, deletions=0
+    )
+    assert [(c.message, c.email, c.version) for c in items[1:-1]] == [
+        ("Add b", "dev@example.com", "master")
+    ]
+    assert items[-1].version == "master"
+
+
+def test_get_commit_data_from_git_incremental_stays_in_range(origin_repo):
+    """Commits of the previous version merged since the last import are left out,
+    as they are when the range is read in full."""
+    git_dir = origin_repo / ".git"
+    versions = ["boost-1.81.0", "master"]
+
+    def add_commit(name):
+        (origin_repo / name).write_text(name)
+        git("add", name, cwd=origin_repo)
+        git("commit", "-m", f"Add {name}", cwd=origin_repo)
+
+    def read(imported):
+        items = list(get_commit_data_from_git(git_dir, versions, imported=imported))
+        messages = [item.message for item in items if isinstance(item, ParsedCommit)]
+        return messages, items[-1]
+
+    git("checkout", "-b", "release", cwd=origin_repo)
+    add_commit("r")
+    git("tag", "boost-1.81.0", cwd=origin_repo)
+    git("checkout", "master", cwd=origin_repo)
+    add_commit("m")
+    messages, imported_range = read({})
+    assert messages == ["Add m"]
+
+    git("merge", "--no-ff", "-m", "Merge release", "release", cwd=origin_repo)
+    messages, _ = read({"master": (imported_range.start, imported_range.sha)})
+    assert messages == ["Merge release"]
+    assert read({})[0] == ["Merge release", "Add m"]
+
+
+def test_update_repo_mirror_failure(tmp_path, settings):
+    settings.GIT_MIRROR_DIR = str(tmp_path / "mirrors")
+    with patch("libraries.github.time.sleep"):
+        assert update_repo_mirror(str(tmp_path / "missing")) is None
+
+
+def test_get_commit_data_from_git_incremental(origin_repo, tmp_path, settings):
+    settings.GIT_MIRROR_DIR = str(tmp_path / "mirrors")
+    github_url = str(origin_repo)[: -len(".git")]
+    versions = ["boost-1.80.0", "master"]
+
+    def add_commit(name):
+        (origin_repo / name).write_text(name)
+        git("add", name, cwd=origin_repo)
+        git("commit", "-m", f"Add {name}", cwd=origin_repo)
+
+    def read(imported):
+        git_dir = update_repo_mirror(github_url)
+        items = list(get_commit_data_from_git(git_dir, versions, imported=imported))
+        messages = [item.message for item in items if isinstance(item, ParsedCommit)]
+        return messages, items[-1] if items else None
+
+    add_commit("b")
+    messages, imported_range = read({})
+    assert messages == ["Add b"]
+    assert not imported_range.rewritten
+    imported = {"master": (imported_range.start, imported_range.sha)}
+
+    # nothing new
+    assert read(imported) == ([], None)
+
+    # only the new commits are read
+    add_commit("c")
+    messages, imported_range = read(imported)
+    assert messages == ["Add c"]
+    assert not imported_range.rewritten
+
+    # a rewritten range is read again in full
+    git("reset", "--hard", "boost-1.80.0", cwd=origin_repo)
+    add_commit("d")
+    messages, imported_range = read(
+        {"master": (imported_range.start, imported_range.sha)}
+    )
+    assert messages == ["Add d"]
+    assert imported_range.rewritten
+
+
+def test_iter_nul_delimited():
+    stream = io.BytesIO(b"abc\0\0de\nf\0g")
+    assert list(iter_nul_delimited(stream, read_size=2)) == [
+        b"abc",
+        b"",
+        b"de\nf",
+        b"g",
+    ]
+
+
+def test_iter_git_log(origin_repo):
+    git("checkout", "-b", "feature", cwd=origin_repo)
+    (origin_repo / "b.txt").write_text("b\n")
+    git("add", "b.txt", cwd=origin_repo)
+    message = "Fix the commit parser\n\n    Indented details.\ncommit abc"
+    git("commit", "-m", message, cwd=origin_repo)
+    git("checkout", "master", cwd=origin_repo)
+    git("merge", "--no-ff", "-m", "Merge feature", "feature", cwd=origin_repo)
+
+    commits = list(
+        iter_git_log(origin_repo / ".git", ["boost-1.80.0..master"], "master")
+    )
+    assert [(c.message, c.is_merge) for c in commits] == [
+        ("Merge feature", True),
+        (message, False),
+    ]
+    assert commits[1].name == "Dev"
+    assert commits[1].email == "dev@example.com"
+    assert commits[1].version == "master"
+    assert commits[1].committed_at.tzinfo is not None
+
+
+def test_iter_git_log_failure(origin_repo):
+    with pytest.raises(subprocess.CalledProcessError):
+        list(iter_git_log(origin_repo / ".git", ["boost-0.0.0..master"], "master"))
+
+
+def test_get_commit_data_from_git_log_failure(origin_repo):
+    """A range whose commits couldn't all be read isn't recorded as imported."""
+    git_dir = origin_repo / ".git"
+    versions = ["boost-1.80.0", "master"]
+    error = subprocess.CalledProcessError(128, ["git", "log"], stderr=b"fatal")
+    with patch("libraries.github.iter_git_log", side_effect=error):
+        items = list(get_commit_data_from_git(git_dir, versions))
+    assert [type(item) for item in items] == [VersionDiffStat]
+
+    # nor is a range that can't be compared
+    items = list(get_commit_data_from_git(git_dir, ["boost-0.0.0", "master"]))
+    assert items == []
+
+
+def test_update_repo_mirror_keeps_mirror_when_fetch_fails(
+    origin_repo, tmp_path, settings
+):
+    settings.GIT_MIRROR_DIR = str(tmp_path / "mirrors")
+    github_url = str(origin_repo)[: -len(".git")]
+    git_dir = update_repo_mirror(github_url)
+
+    # the origin is unreachable, e.g. a network error
+    origin_repo.rename(tmp_path / "moved.git")
+    with patch("libraries.github.time.sleep"):
+        assert update_repo_mirror(github_url) is None
+    assert get_commit_sha(git_dir, "boost-1.80.0")
+
+
+def test_update_repo_mirror_replaces_broken_mirror(origin_repo, tmp_path, settings):
+    settings.GIT_MIRROR_DIR = str(tmp_path / "mirrors")
+    github_url = str(origin_repo)[: -len(".git")]
+    git_dir = tmp_path / "mirrors" / "algorithm.git"
+    git_dir.mkdir(parents=True)
+    (git_dir / "HEAD").write_text("not a ref")
+
+    with patch("libraries.github.time.sleep"):
+        assert update_repo_mirror(github_url) == git_dir
+    assert get_commit_sha(git_dir, "boost-1.80.0")
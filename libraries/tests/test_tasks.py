@@ -4,7 +4,9 @@ from unittest.mock import MagicMock, patch
 from libraries.tasks import (
     get_and_store_library_version_documentation_urls_for_version,
     library_version_missing_docs,
+    update_commits,
     version_missing_docs,
+    warm_library_docs_cache,
 )
 
 
@@ -111,3 +113,32 @@ def test_version_missing_docs(version, version_name, expected):
     version.save()
     result = version_missing_docs(version)
     assert result == expected
+
+
+def test_warm_library_docs_cache(library_version):
+    library_version.documentation_url = "/doc/libs/1_79_0/libs/json/index.html#intro"
+    library_version.save()
+    with patch("core.warming.warm_docs_pages", return_value=1) as mock_warm:
+        assert warm_library_docs_cache(library_version.version.pk) == 1
+    mock_warm.assert_called_once_with(["1_79_0/libs/json/index.html"])
+
+
+def test_update_commits_streams_fetched_mirrors(library, tmp_path):
+    git_dir = tmp_path / "multi_array.git"
+    with patch("libraries.tasks.update_repo_mirror", return_value=git_dir), patch(
+        "libraries.tasks.get_commit_data_from_git", return_value=iter([])
+    ) as mock_read, patch(
+        "libraries.tasks.LibraryUpdater.update_commits", return_value=3
+    ) as mock_update:
+        assert update_commits() == {library.key: 3}
+    # the log is read as it's saved, not by the worker fetching the mirror
+    assert mock_read.call_args.args[0] == git_dir
+    assert mock_update.call_args.kwargs["commit_data"] is mock_read.return_value
+
+
+def test_update_commits_skips_failed_mirrors(library):
+    with patch("libraries.tasks.update_repo_mirror", return_value=None), patch(
+        "libraries.tasks.LibraryUpdater.update_commits"
+    ) as mock_update:
+        assert update_commits(clean=True) == {library.key: 0}
+    mock_update.assert_not_called()
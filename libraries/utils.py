@@ -4,12 +4,10 @@ import re
 from itertools import islice
 from types import SimpleNamespace
 
-import boto3
 import structlog
 import tempfile
 from datetime import datetime, timezone
 
-from botocore.client import BaseClient
 from dateutil.relativedelta import relativedelta
 
 from dateutil.parser import ParserError, parse
@@ -559,12 +557,3 @@ def generate_release_report_filename(version_slug: str, published_format: bool =
         filename_data.append(datetime.now(timezone.utc).isoformat())
     filename = f"{'-'.join(filename_data)}.pdf"
     return filename
-
-
-def get_s3_client() -> BaseClient:
-    return boto3.client(
-        "s3",
-        aws_access_key_id=settings.STATIC_CONTENT_AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.STATIC_CONTENT_AWS_SECRET_ACCESS_KEY,
-        region_name=settings.STATIC_CONTENT_REGION,
-    )
@@ -12,6 +12,11 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import DetailView, ListView, FormView, TemplateView
 
+from core.fastly import (
+    add_surrogate_keys,
+    get_library_surrogate_key,
+    get_version_surrogate_key,
+)
 from core.githubhelper import GithubAPIClient
 from versions.exceptions import BoostImportedDataException
 from versions.models import Version
@@ -125,6 +130,14 @@ class LibraryListBase(BoostVersionMixin, VersionAlertMixin, ListView):
         """Set the selected version in the cookies."""
         response = super().dispatch(request, *args, **kwargs)
         set_selected_boost_version(self.kwargs.get("version_slug"), response)
+        add_surrogate_keys(
+            response,
+            [
+                get_version_surrogate_key(
+                    self.kwargs.get("version_slug") or LATEST_RELEASE_URL_PATH_STR
+                )
+            ],
+        )
         view = get_prioritized_library_view(request)
         if request.resolver_match.view_name == "libraries":
             # todo: remove the following migration block some time after March 1st 2025
@@ -333,10 +346,15 @@ class LibraryDetail(VersionAlertMixin, BoostVersionMixin, ContributorMixin, Deta
                 )
             )
         response = super().dispatch(request, *args, **kwargs)
-        set_selected_boost_version(
-            self.kwargs.get("version_slug", LATEST_RELEASE_URL_PATH_STR), response
+        version_slug = self.kwargs.get("version_slug", LATEST_RELEASE_URL_PATH_STR)
+        set_selected_boost_version(version_slug, response)
+        return add_surrogate_keys(
+            response,
+            [
+                get_library_surrogate_key(self.kwargs.get("library_slug")),
+                get_version_surrogate_key(version_slug),
+            ],
         )
-        return response
 
 
 class LibraryMissingVersionView(BoostVersionMixin, DetailView):
@@ -9,11 +9,25 @@ from django.conf import settings
 from django.core.management import call_command
 from fastcore.xtras import obj2dict
 
+from core.fastly import (
+    LATEST_SURROGATE_KEY,
+    RELEASE_SURROGATE_KEY,
+    get_version_surrogate_key,
+    purge_surrogate_keys,
+)
 from core.githubhelper import GithubAPIClient, GithubDataParser
+from core.tasks import (
+    build_docs_path_index,
+    clear_missing_s3_key_cache,
+    purge_fastly_surrogate_keys,
+)
 from libraries.constants import SKIP_LIBRARY_VERSIONS
 from libraries.github import LibraryUpdater
 from libraries.models import Library, LibraryVersion
-from libraries.tasks import get_and_store_library_version_documentation_urls_for_version
+from libraries.tasks import (
+    get_and_store_library_version_documentation_urls_for_version,
+    warm_library_docs_cache,
+)
 from libraries.utils import version_within_range
 from versions.models import Version
 from versions.releases import (
@@ -160,6 +174,15 @@ def import_version(
     # Load library-versions
     import_library_versions(version.name, token=token)
 
+    # The version's docs may have been uploaded since they were last looked up
+    clear_missing_s3_key_cache.delay()
+    # Only full releases can become the latest version the path matchers use
+    if full_release and not beta:
+        build_docs_path_index.delay(version.stripped_boost_url_slug)
+        # Warm the docs of a new release before launch day traffic arrives
+        if created and version == Version.objects.with_partials().most_recent():
+            warm_library_docs_cache.delay(version.pk)
+
 
 @app.task
 def import_development_versions():
@@ -415,6 +438,9 @@ def import_library_versions(version_name, token=None, version_type="tag"):
     # Load maintainers for library-versions
     call_command("update_maintainers", "--release", version.name)
 
+    # The version's release and library pages may have changed
+    purge_fastly_surrogate_keys.delay([get_version_surrogate_key(version.slug)])
+
 
 @app.task
 def import_release_downloads(version_pk):
@@ -475,27 +501,10 @@ def get_release_date_for_version(version_pk, commit_sha, token=None):
 
 @app.task
 def purge_fastly_release_cache():
+    """Purges the release pages, and the pages served through the latest version
+    alias, from Fastly."""
     logger.info("Purging Fastly cache for release pages.")
-    if not settings.FASTLY_API_TOKEN or settings.FASTLY_API_TOKEN == "empty":
-        logger.warning("FASTLY_API_TOKEN not found. Not purging cache.")
-        return
-
-    headers = {
-        "Fastly-Key": settings.FASTLY_API_TOKEN,
-        "Fastly-Soft-Purge": "1",
-        "Accept": "application/json",
-    }
-    fastly_services = [settings.FASTLY_SERVICE, settings.FASTLY_SERVICE2]
-    logger.info(f"{fastly_services=}")
-    for service in fastly_services:
-        logger.info(f"Purging Fastly cache for release pages against {service=}")
-        if not service or service == "empty":
-            logger.warning(f"Fastly {service=} not found. Not purging cache.")
-            continue
-        url = f"https://api.fastly.com/service/{service}/purge/release"
-        logger.info(f"Purging Fastly cache for {service=} at {url=}")
-        requests.post(url, headers=headers)
-        logger.info(f"Sent fastly purge request for {service=}.")
+    purge_surrogate_keys([RELEASE_SURROGATE_KEY, LATEST_SURROGATE_KEY])
 
 
 @app.task
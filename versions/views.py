@@ -20,6 +20,7 @@ from django.views.decorators.csrf import csrf_exempt
 
 from waffle import flag_is_active
 
+from core.fastly import add_surrogate_keys, get_version_surrogate_key
 from core.mixins import V3Mixin
 from core.models import RenderedContent
 from libraries.constants import LATEST_RELEASE_URL_PATH_STR
@@ -260,13 +261,16 @@ class VersionDetail(V3Mixin, BoostVersionMixin, VersionAlertMixin, DetailView):
             context.update(self.get_v3_context_data())
             response = self.render_to_response(context)
             set_selected_boost_version(version_slug, response)
-            return response
+            return add_surrogate_keys(
+                response, [get_version_surrogate_key(version_slug)]
+            )
 
         self._v3_active = False
         response = super().dispatch(request, *args, **kwargs)
         # if set in kwargs, update the cookie
         if version_slug:
             set_selected_boost_version(version_slug, response)
+            add_surrogate_keys(response, [get_version_surrogate_key(version_slug)])
         else:
             version_slug = (
                 determine_selected_boost_version(version_slug, self.request)